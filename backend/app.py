@@ -3,22 +3,22 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 import os
+import sqlalchemy as sa
 from dotenv import load_dotenv
 from utils.auth import jwt_error_handler
+from utils.log import init_logging
+from utils.profiler import init_profiler
+from utils.serialization import FastJSONProvider
+from utils.compression import init_compression, DEFAULT_MIMETYPES
+from utils.database import RoutingSession, configure_engines, init_database
+from utils.rate_limit import init_rate_limit
 
 # 加载环境变量
 load_dotenv()
 
-# 初始化Flask应用
-app = Flask(__name__)
-
-# 配置CORS
-CORS(app, resources={"/*": {"origins": "*"}})
-
-# 配置JWT
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default_jwt_secret_key')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 86400  # 24小时
-jwt = JWTManager(app)
+# 扩展实例（在create_app中绑定到应用）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+jwt = JWTManager()
 
 # 注册JWT错误处理器
 @jwt.expired_token_loader
@@ -33,26 +33,242 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return jsonify({"msg": "缺少令牌", "error": "authorization_required"}), 401
 
-# 配置数据库
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///./data/task_system.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
-
-# 导入路由
-from routes import auth, tasks
-from routes import ai_scheduler
-
-# 注册蓝图
-app.register_blueprint(auth.bp, url_prefix='/api/auth')
-app.register_blueprint(tasks.bp, url_prefix='/api/tasks')
-app.register_blueprint(ai_scheduler.bp, url_prefix='/api/ai')
-
-# 创建数据库表
-@app.before_first_request
-def create_tables():
-    # 确保data目录存在
-    os.makedirs('./backend/data', exist_ok=True)
+def load_config(app):
+    """从环境变量加载配置"""
+    # 配置JWT
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default_jwt_secret_key')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 86400  # 24小时
+
+    # 配置数据库
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///./data/task_system.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 只读副本（AI路由和任务查询的GET请求使用）
+    app.config['DATABASE_REPLICA_URL'] = os.getenv('DATABASE_REPLICA_URL')
+
+    # 连接池配置（SQLite不适用）
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 15000))
+
+    # SQLite调优（WAL模式及PRAGMA）
+    app.config['SQLITE_TUNING'] = os.getenv('SQLITE_TUNING', 'true').lower() == 'true'
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv('SQLITE_CACHE_SIZE_KB', 20000))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+
+    # 密码哈希参数与校验线程池
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    app.config['PASSWORD_SALT_LENGTH'] = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+    app.config['PASSWORD_VERIFY_WORKERS'] = int(os.getenv('PASSWORD_VERIFY_WORKERS', os.cpu_count() or 2))
+    app.config['PASSWORD_VERIFY_QUEUE'] = int(os.getenv('PASSWORD_VERIFY_QUEUE', 32))
+    app.config['PASSWORD_VERIFY_TIMEOUT'] = float(os.getenv('PASSWORD_VERIFY_TIMEOUT', 5))
+
+    # 已认证用户缓存
+    app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 10000))
+    app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 60))
+
+    # AI接口限流（令牌桶，格式为 次数/周期；RATE_LIMIT_STORAGE_URL 为空时保存在进程内）
+    app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    app.config['RATE_LIMIT_STORAGE_URL'] = os.getenv('RATE_LIMIT_STORAGE_URL')
+    app.config['RATE_LIMIT_MAX_KEYS'] = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+    app.config['RATE_LIMITS'] = {
+        'ai_schedule': os.getenv('RATE_LIMIT_AI_SCHEDULE', '30/minute'),
+        'ai_llm': os.getenv('RATE_LIMIT_AI_LLM', '5/minute'),
+    }
+    # 同时调用大模型的请求数上限，超过时返回503：配置 RATE_LIMIT_STORAGE_URL 时为所有worker和节点共享的全局上限
+    # （Redis中的租约，LLM_LEASE_TTL 秒后自动到期），否则为每个worker进程的上限
+    app.config['LLM_MAX_CONCURRENCY'] = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+    app.config['LLM_ADMISSION_TIMEOUT'] = float(os.getenv('LLM_ADMISSION_TIMEOUT', 0))
+    app.config['LLM_LEASE_TTL'] = int(os.getenv('LLM_LEASE_TTL', 60))
+    app.config['LLM_RETRY_AFTER'] = int(os.getenv('LLM_RETRY_AFTER', 5))
+
+    # 预计算日程（夜间 precompute-plans 命令的天数；登录时在后台预热的天数）
+    app.config['PLAN_PRECOMPUTE_DAYS'] = int(os.getenv('PLAN_PRECOMPUTE_DAYS', 2))
+    app.config['PLAN_WARM_ON_LOGIN'] = os.getenv('PLAN_WARM_ON_LOGIN', 'true').lower() == 'true'
+    app.config['PLAN_WARM_DAYS'] = int(os.getenv('PLAN_WARM_DAYS', 7))
+    app.config['PLAN_WARM_WORKERS'] = int(os.getenv('PLAN_WARM_WORKERS', 2))
+    app.config['PLAN_WARM_INTERVAL'] = int(os.getenv('PLAN_WARM_INTERVAL', 600))
+
+    # 共享缓存（多个worker、多个节点共用，见 services/shared_cache.py）：CACHE_STORAGE_URL 为 redis://... 时使用Redis，
+    # 为 database 时使用数据库中的 cache_entry 表，为空时只有进程内缓存；键中含用户数据版本，数据变化后旧条目不再命中
+    app.config['CACHE_STORAGE_URL'] = os.getenv('CACHE_STORAGE_URL', '')
+    app.config['CACHE_LOCAL_SIZE'] = int(os.getenv('CACHE_LOCAL_SIZE', 4096))
+    app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', 86400))
+
+    # 任务增量同步（长轮询与SSE）
+    app.config['CHANGES_PAGE_SIZE'] = int(os.getenv('CHANGES_PAGE_SIZE', 500))
+    app.config['CHANGES_MAX_WAIT'] = float(os.getenv('CHANGES_MAX_WAIT', 25))
+    app.config['CHANGES_POLL_INTERVAL'] = float(os.getenv('CHANGES_POLL_INTERVAL', 2))
+    app.config['CHANGES_STREAM_SECONDS'] = int(os.getenv('CHANGES_STREAM_SECONDS', 300))
+    app.config['CHANGES_STREAM_RETRY_MS'] = int(os.getenv('CHANGES_STREAM_RETRY_MS', 3000))
+
+    # ASGI模式（asgi.py）：同步步骤与Flask请求共用的线程数；在事件循环中同时等待大模型的请求数上限
+    app.config['ASGI_THREADS'] = int(os.getenv('ASGI_THREADS', 16))
+    app.config['ASGI_LLM_MAX_CONCURRENCY'] = int(os.getenv('ASGI_LLM_MAX_CONCURRENCY', 256))
+
+    # 日志（utils/log.py）：LOG_FORMAT 为 json 或 text；同一条INFO/DEBUG日志每秒最多输出 LOG_SAMPLE_BURST 次（0为不抽样）；
+    # LOG_QUEUE_SIZE 为待输出日志队列长度，队列满时丢弃；LOG_CONFIGURE 为false时不改动根日志器（由外部配置）
+    app.config['LOG_CONFIGURE'] = os.getenv('LOG_CONFIGURE', 'true').lower() == 'true'
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'json')
+    app.config['LOG_SAMPLE_BURST'] = int(os.getenv('LOG_SAMPLE_BURST', 10))
+    app.config['LOG_QUEUE_SIZE'] = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+    # 任务归档（天数应大于工作模式分析的天数，否则分析会缺少已归档的任务）
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 30))
+    app.config['ARCHIVE_BATCH_SIZE'] = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+    app.config['ARCHIVE_PAGE_SIZE'] = int(os.getenv('ARCHIVE_PAGE_SIZE', 500))
+
+    # 即将到期的动态任务查询（within 的最大天数、单次返回的最大数量）
+    app.config['DUE_MAX_DAYS'] = int(os.getenv('DUE_MAX_DAYS', 365))
+    app.config['DUE_MAX_LIMIT'] = int(os.getenv('DUE_MAX_LIMIT', 500))
+
+    # 常规任务冲突检测（重复任务检测的天数；批量检测允许的最大天数）
+    app.config['CONFLICT_HORIZON_DAYS'] = int(os.getenv('CONFLICT_HORIZON_DAYS', 28))
+    app.config['CONFLICT_MAX_DAYS'] = int(os.getenv('CONFLICT_MAX_DAYS', 366))
+
+    # 任务批量导入导出
+    app.config['IMPORT_CHUNK_SIZE'] = int(os.getenv('IMPORT_CHUNK_SIZE', 5000))
+    app.config['IMPORT_MAX_ROWS'] = int(os.getenv('IMPORT_MAX_ROWS', 200000))
+    app.config['IMPORT_MAX_BYTES'] = int(os.getenv('IMPORT_MAX_BYTES', 64 * 1024 * 1024))
+    app.config['IMPORT_MAX_ERRORS'] = int(os.getenv('IMPORT_MAX_ERRORS', 1000))
+    app.config['IMPORT_SPOOL_BYTES'] = int(os.getenv('IMPORT_SPOOL_BYTES', 8 * 1024 * 1024))
+    app.config['EXPORT_CHUNK_SIZE'] = int(os.getenv('EXPORT_CHUNK_SIZE', 5000))
+
+    # 可用性配置缓存（本进程内的修改立即失效，其他worker依赖TTL过期）
+    app.config['AVAILABILITY_CACHE_SIZE'] = int(os.getenv('AVAILABILITY_CACHE_SIZE', 10000))
+    app.config['AVAILABILITY_CACHE_TTL'] = int(os.getenv('AVAILABILITY_CACHE_TTL', 300))
+
+    # 日程模拟（一次请求评估的方案数量和天数上限）
+    app.config['SIMULATE_MAX_VARIANTS'] = int(os.getenv('SIMULATE_MAX_VARIANTS', 20))
+    app.config['SIMULATE_MAX_DAYS'] = int(os.getenv('SIMULATE_MAX_DAYS', 14))
+
+    # 多人共同空闲时间查找（成员数、天数和返回时间段数的上限）
+    app.config['GROUP_MAX_USERS'] = int(os.getenv('GROUP_MAX_USERS', 500))
+    app.config['GROUP_MAX_DAYS'] = int(os.getenv('GROUP_MAX_DAYS', 14))
+    app.config['GROUP_MAX_SLOTS'] = int(os.getenv('GROUP_MAX_SLOTS', 50))
+
+    # 日历订阅（ICS）：日历名称、包含的AI日程天数、渲染缓存容量、客户端缓存时间（事件时区与调度器一致）
+    app.config['CALENDAR_NAME'] = os.getenv('CALENDAR_NAME', 'AI任务日程')
+    app.config['CALENDAR_PLAN_DAYS'] = int(os.getenv('CALENDAR_PLAN_DAYS', 7))
+    app.config['CALENDAR_CACHE_SIZE'] = int(os.getenv('CALENDAR_CACHE_SIZE', 1024))
+    app.config['CALENDAR_MAX_AGE'] = int(os.getenv('CALENDAR_MAX_AGE', 300))
+
+    # 配置JSON编码器（JSON_BACKEND: auto/orjson/stdlib；JSON_COMPAT_MODE 为 true 时与默认jsonify输出逐字节一致）
+    app.config['JSON_BACKEND'] = os.getenv('JSON_BACKEND', 'auto')
+    app.config['JSON_COMPAT_MODE'] = os.getenv('JSON_COMPAT_MODE', 'false').lower() == 'true'
+
+    # 管理员用户ID（逗号分隔），admin_required 和性能分析请求头只允许这些用户；默认为空，即没有管理员
+    app.config['ADMIN_USER_IDS'] = {int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',')
+                                    if user_id.strip()}
+
+    # 配置性能分析（默认关闭，仅供管理员排查线上worker热点）
+    app.config['PROFILER_ENABLED'] = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+    app.config['PROFILER_OUTPUT_DIR'] = os.getenv('PROFILER_OUTPUT_DIR', './data/profiles')
+    app.config['PROFILER_MAX_SECONDS'] = int(os.getenv('PROFILER_MAX_SECONDS', 60))
+    app.config['PROFILER_INTERVAL'] = float(os.getenv('PROFILER_INTERVAL', 0.01))
+
+    # 配置响应压缩（gzip，安装brotli时优先使用Brotli）
+    app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    app.config['COMPRESS_LEVEL'] = int(os.getenv('COMPRESS_LEVEL', 6))
+    app.config['COMPRESS_BR_LEVEL'] = int(os.getenv('COMPRESS_BR_LEVEL', 5))
+    app.config['COMPRESS_MIMETYPES'] = os.getenv('COMPRESS_MIMETYPES', ','.join(DEFAULT_MIMETYPES)).split(',')
+    app.config['COMPRESS_CACHE_SIZE'] = int(os.getenv('COMPRESS_CACHE_SIZE', 256))
+
+# 结构变化时可直接删除重建的表
+CACHE_TABLES = ('schedule_plan',)
+
+# 创建数据库表（Flask 2.3 已移除 before_first_request，改为启动时创建）
+def create_tables(app):
+    # 确保SQLite数据库所在目录存在（Flask-SQLAlchemy 3 中相对路径基于instance目录）
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if database_uri.startswith('sqlite:///'):
+        database_path = os.path.join(app.instance_path, database_uri[len('sqlite:///'):])
+        os.makedirs(os.path.dirname(database_path), exist_ok=True)
+    # 缓存性质的表（内容可随时重新计算）结构变化时直接重建
+    inspector = sa.inspect(db.engine)
+    for table in CACHE_TABLES:
+        table = db.metadata.tables[table]
+        if inspector.has_table(table.name):
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            if set(table.columns.keys()) - existing:
+                table.drop(db.engine)
     db.create_all()
+    # create_all 只在建表时创建索引，已存在的表需补建后来新增的索引
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def create_app(config=None):
+    """应用工厂
+
+    config 中的键会覆盖环境变量中的配置。AI相关的重量级依赖（openai、pydantic、pytz）
+    不在这里导入，而是在首次访问 /api/ai 时加载；使用 gunicorn --preload 时见 gunicorn.conf.py。
+    """
+    # 初始化Flask应用
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.update(config)
+    init_logging(app)
+
+    app.json = FastJSONProvider(
+        app,
+        backend=app.config['JSON_BACKEND'],
+        compat=app.config['JSON_COMPAT_MODE']
+    )
+
+    # 配置CORS
+    CORS(app, resources={"/*": {"origins": "*"}})
+
+    configure_engines(app)
+    db.init_app(app)
+    init_database(app, db)
+    jwt.init_app(app)
+    init_profiler(app)
+    init_compression(app)
+    init_rate_limit(app)
+
+    from services.user_cache import init_user_cache
+    from services.passwords import init_passwords
+    from services.plan_cache import precompute_plans_command, init_plan_cache
+    from services.change_feed import compact_changes_command
+    from services.archive import archive_tasks_command
+    from services.calendar_feed import init_calendar_feed
+    from services.availability import init_availability
+    init_user_cache(app)
+    init_passwords(app)
+    init_plan_cache(app)
+    init_calendar_feed(app)
+    init_availability(app)
+    app.cli.add_command(precompute_plans_command)
+    app.cli.add_command(compact_changes_command)
+    app.cli.add_command(archive_tasks_command)
+
+    # 导入路由
+    from routes import auth, tasks
+    from routes import ai_scheduler
+    from routes import admin
+    from routes import calendar
+
+    # 注册蓝图
+    app.register_blueprint(auth.bp, url_prefix='/api/auth')
+    app.register_blueprint(tasks.bp, url_prefix='/api/tasks')
+    app.register_blueprint(ai_scheduler.bp, url_prefix='/api/ai')
+    app.register_blueprint(admin.bp, url_prefix='/api/admin')
+    app.register_blueprint(calendar.bp, url_prefix='/api/calendar')
+
+    with app.app_context():
+        create_tables(app)
+        # 释放建表时创建的连接，避免 --preload 时fork出的worker共享同一连接
+        for engine in db.engines.values():
+            engine.dispose()
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,7 @@
+# ASGI入口（可选的服务模式，需要安装uvicorn）:
+#   GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn asgi:application
+# AI建议和任务变更长轮询在事件循环中等待，其余请求在线程池中交给Flask，见 routes/async_api.py
+from app import create_app
+from routes.async_api import create_asgi_app
+
+application = create_asgi_app(create_app())
@@ -0,0 +1,72 @@
+"""通过Flask测试客户端对API路由做端到端基准测试（SQLite）
+
+日程接口的结果按用户数据版本缓存：warm 用例重复请求同一日期，第一次之后都命中缓存；
+cold 用例在每次请求前（不计时）记录一条任务变更使数据版本改变，每次都现场计算日程。
+"""
+import os
+import tempfile
+
+from benchmarks.common import measure, result
+from benchmarks.datagen import generate_user_tasks, populate_user
+from benchmarks.bench_scheduler import BENCH_DATE
+
+SUITE = 'api'
+
+
+def load_app(database_url=None):
+    """通过应用工厂创建应用，默认使用临时SQLite文件；关闭限流，否则同一用户的重复请求会被拒绝（429）"""
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+    from app import create_app, db
+    return create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'RATE_LIMIT_ENABLED': False}), db
+
+
+def login_user(client, name):
+    """注册并登录一个基准测试用户，返回 (用户ID, 认证请求头)"""
+    email = f"{name}@bench.local"
+    client.post('/api/auth/register', json={"username": name, "email": email, "password": "bench-password"})
+    response = client.post('/api/auth/login', json={"email": email, "password": "bench-password"})
+    data = response.get_json()
+    return data["user"]["id"], {"Authorization": f"Bearer {data['access_token']}"}
+
+
+def run(scales, repeat=5, seed=0, database_url=None):
+    app, db = load_app(database_url)
+    from models.task import DynamicTask
+    from services.change_feed import record_changes
+    client = app.test_client()
+
+    results = []
+    for scale in scales:
+        user_id, headers = login_user(client, f"bench_{scale[0]}x{scale[1]}_{seed}")
+        regular, dynamic = generate_user_tasks(scale[0], scale[1], seed=seed)
+        with app.app_context():
+            populate_user(db, user_id, regular, dynamic)
+            task_id = db.session.query(DynamicTask.id).filter_by(user_id=user_id).limit(1).scalar()
+
+        def bust_plans():
+            """记录一条任务变更，使数据版本改变、已缓存和预计算的日程失效"""
+            with app.app_context():
+                record_changes(db.session, [(user_id, 'dynamic', task_id, False)])
+                db.session.commit()
+
+        def call(method, url, **kwargs):
+            def func():
+                response = client.open(url, method=method, headers=headers, **kwargs)
+                assert response.status_code < 400, f"{method} {url} -> {response.status_code}"
+            return func
+
+        generate = call('POST', '/api/ai/generate-schedule', json={"date": BENCH_DATE})
+        weekly = call('POST', '/api/ai/get-weekly-schedule', json={"start_date": BENCH_DATE})
+        cases = [
+            ('GET /api/tasks/regular', call('GET', '/api/tasks/regular'), None),
+            ('GET /api/tasks/dynamic', call('GET', '/api/tasks/dynamic'), None),
+            ('POST /api/ai/generate-schedule (cold)', generate, bust_plans),
+            ('POST /api/ai/generate-schedule (warm)', generate, None),
+            ('POST /api/ai/get-weekly-schedule (cold)', weekly, bust_plans),
+            ('POST /api/ai/get-weekly-schedule (warm)', weekly, None),
+            ('GET /api/ai/analyze-work-patterns', call('GET', '/api/ai/analyze-work-patterns'), None),
+        ]
+        for name, func, setup in cases:
+            results.append(result(SUITE, name, scale, measure(func, repeat=repeat, setup=setup)))
+    return results
@@ -0,0 +1,178 @@
+"""ASGI模式与同步worker的等待型请求容量对比
+
+在同一进程中分别以两种方式同时发起N个等待型请求：
+- 同步：THREADS 个线程（相当于一个 gthread worker 的线程数）各自通过Flask处理请求，
+  每个线程同一时间只能挂起一个请求；
+- ASGI：直接调用 asgi 应用，所有请求作为协程在一个事件循环中等待。
+
+用例为没有变更时等待 WAIT 秒的长轮询，以及大模型替身延迟 LLM_LATENCY_MS 的AI建议。
+held 为平均同时挂起的请求数（N × 单次等待时间 / 总耗时），threads 为测试期间的最大线程数。
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks.common import result
+from benchmarks.loadtest import free_port
+
+SUITE = 'async'
+THREADS = 8
+WAIT = 1.0
+LLM_LATENCY_MS = 500
+SYNC_REQUESTS = 64
+ASGI_REQUESTS = (64, 1000, 5000)
+PASSWORD = 'bench-password'
+
+
+class ThreadPeak:
+    """在后台采样进程的最大线程数"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def start_stub_process(latency_ms):
+    """在子进程中启动大模型替身，避免它的连接线程计入本进程的线程数，返回 (进程, base_url)"""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.stub_llm', '--port', str(port),
+                                '--latency-ms', str(latency_ms)],
+                               stdout=subprocess.DEVNULL, cwd=os.path.dirname(os.path.dirname(__file__)))
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, f"http://127.0.0.1:{port}/v1"
+
+
+async def asgi_request(application, method, url, headers, body=b''):
+    """在进程内调用ASGI应用，返回 (状态码, 响应体)"""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': parts.path, 'root_path': '', 'query_string': parts.query.encode('latin-1'),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+        'server': ('127.0.0.1', 5000), 'client': ('127.0.0.1', 0),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {'body': b''}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] += message.get('body', b'')
+
+    await application(scope, receive, send)
+    return response['status'], response['body']
+
+
+def run_sync(app, requests, threads):
+    """用固定数量的线程依次处理请求，返回 (总耗时, 成功数)"""
+    client = app.test_client()
+
+    def call(request):
+        method, url, headers, body = request
+        return client.open(url, method=method, headers=headers, data=body).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        statuses = list(executor.map(call, requests))
+    return time.perf_counter() - started, sum(status == 200 for status in statuses)
+
+
+def run_asgi(application, requests):
+    """所有请求同时作为协程发起，返回 (总耗时, 成功数)"""
+    async def main():
+        try:
+            return await asyncio.gather(*(asgi_request(application, method, url, headers, body)
+                                          for method, url, headers, body in requests))
+        finally:
+            for hook in application.shutdown_hooks:
+                await hook()
+
+    started = time.perf_counter()
+    responses = asyncio.run(main())
+    return time.perf_counter() - started, sum(status == 200 for status, _ in responses)
+
+
+def _record(name, mode, n, elapsed, ok, unit_seconds, threads):
+    return result(SUITE, name, (0, n), {"elapsed_s": round(elapsed, 3)},
+                  mode=mode, ok=ok, held=round(n * unit_seconds / elapsed, 1), threads=threads)
+
+
+def run(scales=None, repeat=5, seed=0):
+    import openai
+    from app import create_app
+    from routes.async_api import create_asgi_app
+    from services.ai_scheduler import scheduler
+
+    llm_process, llm_base_url = start_stub_process(LLM_LATENCY_MS)
+    # 调度器在导入时读取OpenAI配置，其他测试集可能已经导入过，这里直接指向替身
+    openai.api_key = scheduler.api_key = 'stub'
+    openai.api_base = llm_base_url
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'RATE_LIMIT_ENABLED': False,
+            'LLM_MAX_CONCURRENCY': THREADS,
+            'ASGI_LLM_MAX_CONCURRENCY': max(ASGI_REQUESTS),
+            'CHANGES_POLL_INTERVAL': WAIT,
+        })
+        application = create_asgi_app(app)
+        client = app.test_client()
+        client.post('/api/auth/register', json={"username": "bench", "email": "bench@example.com",
+                                                "password": PASSWORD})
+        token = client.post('/api/auth/login', json={"email": "bench@example.com",
+                                                     "password": PASSWORD}).get_json()['access_token']
+        headers = {'Authorization': f"Bearer {token}", 'Content-Type': 'application/json'}
+        cursor = client.get('/api/tasks/changes', headers=headers).get_json()['cursor']
+
+        cases = [
+            ('long_poll', WAIT, ('GET', f"/api/tasks/changes?since={cursor}&wait={WAIT}", headers, b'')),
+            ('recommendations', LLM_LATENCY_MS / 1000,
+             ('POST', '/api/ai/get-recommendations', headers, json.dumps({"date": "2024-03-04"}).encode())),
+        ]
+        for name, unit_seconds, request in cases:
+            with ThreadPeak() as threads:
+                elapsed, ok = run_sync(app, [request] * SYNC_REQUESTS, THREADS)
+            results.append(_record(name, 'sync', SYNC_REQUESTS, elapsed, ok, unit_seconds, threads.peak))
+            for n in ASGI_REQUESTS:
+                with ThreadPeak() as threads:
+                    elapsed, ok = run_asgi(application, [request] * n)
+                results.append(_record(name, 'asgi', n, elapsed, ok, unit_seconds, threads.peak))
+        application.executor.shutdown()
+    llm_process.terminate()
+    llm_process.wait()
+    return results
@@ -0,0 +1,107 @@
+"""多worker、多节点下的缓存命中率
+
+模拟 节点数 × 每节点worker数 个进程处理同一串日程请求：请求不粘滞，随机落到任意worker；
+用户按Zipf分布访问，每次请求读取某一天的日程，另有 WRITE_RATIO 的请求修改任务（用户数据版本加一，
+旧版本的条目随之失效）。比较三种部署：
+- local：只有各worker进程内的LRU（引入共享缓存之前）；
+- node：每个节点一个共享存储（如各节点本机的SQLite/Redis）；
+- shared：所有节点共用一个共享存储（PostgreSQL表或Redis）。
+cold 为需要现场计算日程的次数，worker越多，local 下重复计算越多，shared 下保持不变。
+共享存储默认为临时SQLite文件中的 cache_entry 表，BENCH_CACHE_STORAGE_URL 指定 redis://... 时使用Redis。
+"""
+import os
+import random
+import tempfile
+import time
+import types
+import uuid
+
+import sqlalchemy as sa
+
+from benchmarks.common import result
+
+SUITE = 'cache'
+USERS = 2000
+DAYS = 7
+REQUESTS = 10000
+WRITE_RATIO = 0.02
+LOCAL_SIZE = 1024
+ZIPF_S = 1.1
+# (节点数, 每个节点的worker数)
+TOPOLOGIES = [(1, 1), (1, 4), (2, 4), (4, 4)]
+MODES = ('local', 'node', 'shared')
+
+
+def _schedule(user_id, day):
+    """与真实日程大小相近的缓存值"""
+    return [{"task_id": user_id * 100 + i, "title": f"任务{i}",
+             "start_time": f"2024-03-{4 + day:02d}T{9 + i:02d}:00:00",
+             "end_time": f"2024-03-{4 + day:02d}T{9 + i:02d}:45:00",
+             "priority_score": 50.0 + i, "confidence": 0.8} for i in range(8)]
+
+
+def workload(seed):
+    """生成请求序列：(worker序号的随机数, 用户, 日期) 或 (None, 用户, None) 表示写入"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** ZIPF_S for rank in range(USERS)]
+    users = rng.choices(range(USERS), weights, k=REQUESTS)
+    return [(None, user, None) if rng.random() < WRITE_RATIO else (rng.random(), user, rng.randrange(DAYS))
+            for user in users]
+
+
+def _make_store(tmp):
+    from models.cache_entry import CacheEntry
+    from utils.cache import DatabaseCacheStore, RedisCacheStore
+
+    url = os.getenv('BENCH_CACHE_STORAGE_URL')
+    if url:
+        return RedisCacheStore(url, prefix=f"bench:{uuid.uuid4().hex}:")
+    engine = sa.create_engine(f"sqlite:///{os.path.join(tmp, uuid.uuid4().hex + '.db')}")
+    CacheEntry.__table__.create(engine)
+    return DatabaseCacheStore(types.SimpleNamespace(engine=engine), CacheEntry.__table__)
+
+
+def simulate(requests, mode, nodes, workers, tmp):
+    """按部署方式处理请求序列，返回 (各worker的缓存, 耗时)"""
+    from services.plan_cache import encode_plan, decode_plan
+    from utils.cache import TieredCache
+
+    shared = _make_store(tmp) if mode == 'shared' else None
+    caches = []
+    for _ in range(nodes):
+        store = _make_store(tmp) if mode == 'node' else shared
+        caches.extend(TieredCache('schedule', encode_plan, decode_plan, LOCAL_SIZE, store=store)
+                      for _ in range(workers))
+
+    versions = [0] * USERS
+    started = time.perf_counter()
+    for pick, user, day in requests:
+        if pick is None:
+            versions[user] += 1
+            continue
+        cache = caches[int(pick * len(caches))]
+        key = (user, versions[user], day)
+        if cache.get(key) is None:
+            cache.set(key, _schedule(user, day))
+    return caches, time.perf_counter() - started
+
+
+def run(scales=None, repeat=5, seed=0):
+    import app  # noqa: F401  模型依赖应用模块中的 db
+
+    requests = workload(seed)
+    reads = sum(pick is not None for pick, _, _ in requests)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for nodes, workers in TOPOLOGIES:
+            for mode in MODES:
+                caches, elapsed = simulate(requests, mode, nodes, workers, tmp)
+                local_hits = sum(cache.local_hits for cache in caches)
+                shared_hits = sum(cache.shared_hits for cache in caches)
+                cold = sum(cache.misses for cache in caches)
+                results.append(result(SUITE, f"{mode}_{nodes}x{workers}", (0, USERS), {"elapsed_s": round(elapsed, 3)},
+                                      mode=mode, nodes=nodes, workers=workers, requests=reads,
+                                      local_hit_rate=round(local_hits / reads, 4),
+                                      shared_hit_rate=round(shared_hits / reads, 4),
+                                      hit_rate=round((local_hits + shared_hits) / reads, 4), cold=cold))
+    return results
@@ -0,0 +1,85 @@
+"""数据库设置吞吐量基准测试
+
+在同一进程内用多个线程并发访问任务读写路由，比较不同数据库设置下的吞吐量：
+SQLite对比默认与WAL/PRAGMA调优；设置 BENCH_DATABASE_URL（如本地Postgres）时
+对比不同连接池大小。
+"""
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.common import result
+from benchmarks.datagen import generate_user_tasks, populate_user
+from benchmarks.bench_api import login_user
+
+SUITE = 'database'
+THREADS = 8
+DURATION = 3.0
+
+
+def database_settings():
+    """返回 [(设置名, 数据库地址, 配置覆盖)]"""
+    url = os.getenv('BENCH_DATABASE_URL')
+    if url:
+        return [(f"pool_size={size}", url, {'DB_POOL_SIZE': size, 'DB_MAX_OVERFLOW': 0})
+                for size in (2, 5, 10, 20)]
+    settings = []
+    for name, tuning in (('sqlite-default', False), ('sqlite-wal-tuned', True)):
+        path = os.path.join(tempfile.mkdtemp(prefix='bench-db-'), 'bench.db')
+        settings.append((name, f"sqlite:///{path}", {'SQLITE_TUNING': tuning}))
+    return settings
+
+
+def run_throughput(app, headers, threads, duration):
+    """读写混合（读:写 = 4:1）的闭环负载，返回 (请求数, 错误数, 秒)"""
+    counts = {"requests": 0, "errors": 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        client = app.test_client()
+        requests = errors = 0
+        while time.monotonic() < stop_at:
+            if requests % 5 == 4:
+                response = client.post('/api/tasks/dynamic', headers=headers,
+                                       json={"title": "bench", "priority": "low", "estimated_time": 30})
+            else:
+                response = client.get('/api/tasks/dynamic?sort_by=priority', headers=headers)
+            requests += 1
+            errors += response.status_code >= 400
+        with lock:
+            counts["requests"] += requests
+            counts["errors"] += errors
+
+    started = time.monotonic()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return counts["requests"], counts["errors"], time.monotonic() - started
+
+
+def run(scales, repeat=5, seed=0):
+    from app import create_app, db
+
+    results = []
+    for scale in scales:
+        for name, url, overrides in database_settings():
+            app = create_app({'SQLALCHEMY_DATABASE_URI': url, **overrides})
+            client = app.test_client()
+            user_id, headers = login_user(client, f"dbbench_{name}_{scale[0]}x{scale[1]}_{seed}")
+            regular, dynamic = generate_user_tasks(scale[0], scale[1], seed=seed)
+            with app.app_context():
+                populate_user(db, user_id, regular, dynamic)
+
+            requests, errors, elapsed = run_throughput(app, headers, THREADS, DURATION)
+            results.append(result(SUITE, name, scale, {
+                "rps": round(requests / elapsed, 2),
+                "mean_ms": round(elapsed * 1000 * THREADS / max(requests, 1), 4),
+                "requests": requests,
+                "errors": errors,
+                "threads": THREADS
+            }))
+    return results
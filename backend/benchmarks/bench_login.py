@@ -0,0 +1,78 @@
+"""登录吞吐量基准测试
+
+对每种哈希参数分别测量：单线程每秒可完成的密码校验次数（即每核登录上限），
+以及多线程并发调用登录路由时的整体吞吐量与503比例。
+"""
+import os
+import tempfile
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from benchmarks.common import result
+
+SUITE = 'login'
+HASH_METHODS = ['pbkdf2:sha256:100000', 'pbkdf2:sha256:260000', 'pbkdf2:sha256:600000', 'scrypt:32768:8:1']
+THREADS = 8
+DURATION = 3.0
+PASSWORD = 'bench-password'
+
+
+def verifications_per_second(method, duration=1.0):
+    password_hash = generate_password_hash(PASSWORD, method=method)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        check_password_hash(password_hash, PASSWORD)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def login_throughput(app, email, threads, duration):
+    counts = {"ok": 0, "busy": 0, "other": 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        client = app.test_client()
+        local = {"ok": 0, "busy": 0, "other": 0}
+        while time.monotonic() < stop_at:
+            status = client.post('/api/auth/login', json={"email": email, "password": PASSWORD}).status_code
+            local["ok" if status == 200 else "busy" if status == 503 else "other"] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    started = time.monotonic()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return counts, time.monotonic() - started
+
+
+def run(scales=None, repeat=5, seed=0):
+    from app import create_app
+
+    results = []
+    for method in HASH_METHODS:
+        per_core = verifications_per_second(method)
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-login-'), 'login.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'PASSWORD_HASH_METHOD': method})
+        client = app.test_client()
+        email = f"login_{seed}@bench.local"
+        client.post('/api/auth/register', json={"username": f"login_{seed}", "email": email, "password": PASSWORD})
+
+        counts, elapsed = login_throughput(app, email, THREADS, DURATION)
+        results.append(result(SUITE, method, (0, 0), {
+            "verifications_per_second_per_core": round(per_core, 2),
+            "login_rps": round(counts["ok"] / elapsed, 2),
+            "rejected_503": counts["busy"],
+            "failed": counts["other"],
+            "threads": THREADS,
+            "verify_workers": app.config['PASSWORD_VERIFY_WORKERS'],
+            "cpu_count": os.cpu_count()
+        }))
+    return results
@@ -0,0 +1,96 @@
+"""调度器内存占用基准测试
+
+用 tracemalloc 统计 10k 个动态任务规模下调度器工作集的内存：每个任务的输入模型、
+生成一天日程时的峰值分配（按任务数平均），以及时间槽、日程项在紧凑表示和字典/pydantic表示下的单条大小。
+结果中的字节数为 Python 对象分配量，不含解释器本身。
+"""
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.bench_scheduler import BENCH_DATE, build_tasks
+from benchmarks.common import result
+
+SUITE = 'memory'
+MEMORY_SCALE = (200, 10000)
+
+
+def allocated(func):
+    """调用 func，返回 (结果, 调用后仍占用的字节数, 调用期间的峰值字节数)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        value = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, current - before, peak - before
+
+
+def _pydantic_schedule_item():
+    """原 ScheduleItem 的pydantic模型，作为日程项大小的对照"""
+    from pydantic import BaseModel
+
+    class ScheduleItemModel(BaseModel):
+        task_id: int
+        title: str
+        start_time: str
+        end_time: str
+        priority_score: float
+        confidence: float
+
+    return ScheduleItemModel
+
+
+def _free_slots(day, count):
+    from services.ai_scheduler import FreeSlots
+
+    slots = FreeSlots(day)
+    for i in range(count):
+        slots.append(i % 1440, i % 1440 + 1)
+    return slots
+
+
+def _schedule_item_fields(tasks, day):
+    for i, task in enumerate(tasks):
+        start = day + timedelta(minutes=i % 1440)
+        yield dict(task_id=task.id, title=task.title,
+                   start_time=start.strftime('%Y-%m-%dT%H:%M:%S'),
+                   end_time=(start + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S'),
+                   priority_score=100.0 + i % 300, confidence=0.5)
+
+
+def run(scales=None, repeat=5, seed=0):
+    from services.ai_scheduler import scheduler, ScheduleItem
+
+    results = []
+    scale = MEMORY_SCALE
+    n_tasks = scale[1]
+
+    (regular_tasks, dynamic_tasks), task_bytes, _ = allocated(lambda: build_tasks(scale, seed))
+    results.append(result(SUITE, 'task_models', scale, {"bytes_total": task_bytes},
+                          bytes_per_task=round(task_bytes / sum(scale), 1)))
+
+    schedule, _, peak = allocated(
+        lambda: scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks, BENCH_DATE))
+    results.append(result(SUITE, 'generate_daily_schedule', scale, {"peak_bytes": peak},
+                          peak_bytes_per_task=round(peak / n_tasks, 1), scheduled=len(schedule)))
+
+    # 时间槽的表示开销：10k 个时间槽分别用紧凑表示和 find_available_time_slots 的字典表示
+    day = datetime.strptime(BENCH_DATE, '%Y-%m-%d')
+    compact, compact_bytes, _ = allocated(lambda: _free_slots(day, n_tasks))
+    _, dict_bytes, _ = allocated(compact.to_dicts)
+    results.append(result(SUITE, 'free_slots', scale, {"bytes_total": compact_bytes},
+                          bytes_per_slot=round(compact_bytes / n_tasks, 1),
+                          dict_bytes_per_slot=round(dict_bytes / n_tasks, 1)))
+
+    # 每个动态任务一个日程项：__slots__ 记录与pydantic模型
+    fields = list(_schedule_item_fields(dynamic_tasks, day))
+    _, item_bytes, _ = allocated(lambda: [ScheduleItem(**item) for item in fields])
+    model = _pydantic_schedule_item()
+    _, model_bytes, _ = allocated(lambda: [model(**item) for item in fields])
+    results.append(result(SUITE, 'schedule_items', scale, {"bytes_total": item_bytes},
+                          bytes_per_item=round(item_bytes / n_tasks, 1),
+                          pydantic_bytes_per_item=round(model_bytes / n_tasks, 1)))
+    return results
@@ -0,0 +1,94 @@
+"""调度器热点路径基准测试"""
+from datetime import datetime, timedelta
+
+from benchmarks.common import measure, result
+from benchmarks.datagen import generate_user_tasks
+
+SUITE = 'scheduler'
+BENCH_DATE = '2024-03-04'
+GROUP_SIZE = 300
+
+
+def build_tasks(scale, seed):
+    from services.ai_scheduler import Task
+
+    regular, dynamic = generate_user_tasks(scale[0], scale[1], seed=seed,
+                                           base_date=datetime.strptime(BENCH_DATE, '%Y-%m-%d'))
+    return [Task(**task) for task in regular], [Task(**task) for task in dynamic]
+
+
+def build_variants(dynamic_tasks, count=10):
+    """模拟请求中的典型方案：调整部分任务的预计时间、优先级，或调整工作时间"""
+    from services.simulation import Variant
+
+    variants = []
+    for i in range(count):
+        overrides = {task.id: {"estimated_time": 30 + 15 * (i % 4), "priority": "high"}
+                     for task in dynamic_tasks[i::count * 5]}
+        variants.append(Variant(f"variant-{i + 1}", (9 - i % 2, 22 - i % 3), overrides))
+    return variants
+
+
+def build_group(scale, seed, size=GROUP_SIZE):
+    """共同空闲时间查找的成员：每人 scale[0] 个常规任务，使用默认可用时间"""
+    from models.task import RepeatType
+    from services.availability import DEFAULT_AVAILABILITY
+    from services.conflicts import TaskTimes
+
+    rules = {'daily': RepeatType.DAILY, 'weekly': RepeatType.WEEKLY, 'once': RepeatType.SINGLE}
+    members = []
+    for member in range(size):
+        regular, _ = generate_user_tasks(scale[0], 0, seed=seed + member,
+                                         base_date=datetime.strptime(BENCH_DATE, '%Y-%m-%d'))
+        tasks = [TaskTimes(task['id'], task['title'], datetime.strptime(task['start_time'], '%Y-%m-%dT%H:%M:%S'),
+                           datetime.strptime(task['end_time'], '%Y-%m-%dT%H:%M:%S'), rules[task['repeat_rule']])
+                 for task in regular]
+        members.append((tasks, DEFAULT_AVAILABILITY))
+    return members
+
+
+def run(scales, repeat=5, seed=0):
+    from services.ai_scheduler import scheduler
+    from services.simulation import simulate
+    from services.group_availability import common_free_slots
+    from services.deadlines import DeadlineIndex
+
+    results = []
+    for scale in scales:
+        regular_tasks, dynamic_tasks = build_tasks(scale, seed)
+        all_tasks = regular_tasks + dynamic_tasks
+
+        def score_all():
+            for task in dynamic_tasks:
+                scheduler.calculate_priority_score(task, BENCH_DATE)
+
+        def weekly():
+            # 与 get-weekly-schedule 路由相同，一周共用一个截止时间索引
+            start = datetime.strptime(BENCH_DATE, '%Y-%m-%d')
+            deadlines = DeadlineIndex(dynamic_tasks)
+            for i in range(7):
+                scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks,
+                                                  (start + timedelta(days=i)).strftime('%Y-%m-%d'),
+                                                  deadlines=deadlines)
+
+        dates = [(datetime.strptime(BENCH_DATE, '%Y-%m-%d') + timedelta(days=i)).strftime('%Y-%m-%d')
+                 for i in range(7)]
+        variants = build_variants(dynamic_tasks)
+        group = build_group(scale, seed)
+        first_day = datetime.strptime(BENCH_DATE, '%Y-%m-%d').date()
+
+        cases = [
+            ('calculate_priority_score', score_all),
+            ('find_available_time_slots', lambda: scheduler.find_available_time_slots(regular_tasks, BENCH_DATE)),
+            ('generate_daily_schedule',
+             lambda: scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks, BENCH_DATE)),
+            ('generate_weekly_schedule', weekly),
+            # 与 generate_weekly_schedule 的11倍（基线+10个方案）比较
+            ('simulate_weekly_10_variants', lambda: simulate(regular_tasks, dynamic_tasks, dates, variants)),
+            # GROUP_SIZE 个成员、两周窗口内的共同空闲时间（数据已加载，只计时位图合并）
+            ('group_common_slots', lambda: common_free_slots(group, first_day, 14, 30, 10)),
+            ('analyze_work_patterns', lambda: scheduler.analyze_work_patterns(all_tasks, days=14)),
+        ]
+        for name, func in cases:
+            results.append(result(SUITE, name, scale, measure(func, repeat=repeat)))
+    return results
@@ -0,0 +1,67 @@
+"""worker启动耗时基准测试
+
+在子进程中以 python -X importtime 导入入口模块，统计总耗时与累计耗时最高的模块，
+并检查重量级依赖（openai、pydantic、pytz、pandas）是否在启动时被导入。
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import result
+
+SUITE = 'startup'
+HEAVY_MODULES = ('openai', 'pydantic', 'pytz', 'pandas')
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$')
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 [(模块, 自身微秒, 累计微秒, 缩进层级)]"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def measure_import(statement, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    code = (f"import sys, time; start = time.perf_counter(); {statement}; "
+            f"print(time.perf_counter() - start); "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                               cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    lines = completed.stdout.splitlines()
+    return float(lines[-2]) * 1000, [m for m in lines[-1].split(',') if m], parse_importtime(completed.stderr)
+
+
+def run(scales=None, repeat=5, seed=0, top=15):
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-startup-'), 'startup.db')
+    cases = [
+        ('import main (create_app)', 'import main'),
+        ('import services.ai_scheduler (deferred)', 'import services.ai_scheduler'),
+    ]
+
+    results = []
+    for name, statement in cases:
+        timings = []
+        heavy, rows = [], []
+        for _ in range(repeat):
+            elapsed_ms, heavy, rows = measure_import(statement, database_url)
+            timings.append(elapsed_ms)
+        timings.sort()
+        top_modules = sorted((row for row in rows if row[3] == 1), key=lambda row: row[2], reverse=True)[:top]
+        results.append(result(SUITE, name, (0, 0), {
+            "min_ms": round(timings[0], 3),
+            "median_ms": round(timings[len(timings) // 2], 3),
+            "max_ms": round(timings[-1], 3),
+            "repeat": repeat
+        }, heavy_modules_loaded=heavy, top_imports_us=[
+            {"module": module, "self_us": self_us, "cumulative_us": cumulative_us}
+            for module, self_us, cumulative_us, _ in top_modules
+        ]))
+    return results
@@ -0,0 +1,60 @@
+"""基准测试公共工具"""
+import gc
+import time
+import statistics
+
+# 默认规模：(常规任务数, 动态任务数)
+DEFAULT_SCALES = [(10, 20), (50, 200), (200, 1000)]
+
+
+def parse_scales(value):
+    """解析 "10x20,50x200" 形式的规模参数"""
+    scales = []
+    for item in value.split(','):
+        n_regular, n_dynamic = item.lower().split('x')
+        scales.append((int(n_regular), int(n_dynamic)))
+    return scales
+
+
+def measure(func, repeat=5, number=1, setup=None):
+    """多轮计时，返回每次调用耗时（毫秒）的统计值；setup 在每次调用前执行，不计入耗时"""
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if setup:
+            setup()
+        func()  # 预热
+        for _ in range(repeat):
+            elapsed = 0
+            for _ in range(number):
+                if setup:
+                    setup()
+                start = time.perf_counter()
+                func()
+                elapsed += time.perf_counter() - start
+            samples.append(elapsed * 1000 / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "max_ms": round(max(samples), 4),
+        "repeat": repeat,
+        "number": number
+    }
+
+
+def result(suite, name, scale, stats, **extra):
+    """构造一条基准结果记录"""
+    record = {
+        "suite": suite,
+        "name": name,
+        "n_regular": scale[0],
+        "n_dynamic": scale[1],
+        **stats
+    }
+    record.update(extra)
+    return record
@@ -0,0 +1,54 @@
+"""比较两次基准测试结果，发现性能回退
+
+    python -m benchmarks.compare base.json new.json --threshold 0.15
+
+任一用例的中位耗时增幅超过阈值时以非零状态码退出，便于在CI中使用。
+"""
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    return {
+        (r["suite"], r["name"], r["n_regular"], r["n_dynamic"]): r
+        for r in report["results"]
+    }
+
+
+def compare(base, new, threshold, metric='median_ms'):
+    """返回 (对比行列表, 是否存在回退)"""
+    rows = []
+    regressed = False
+    for key in sorted(set(base) & set(new)):
+        if metric not in base[key] or metric not in new[key]:
+            continue
+        before, after = base[key][metric], new[key][metric]
+        change = (after - before) / before if before else 0.0
+        is_regression = change > threshold
+        regressed = regressed or is_regression
+        rows.append((key, before, after, change, is_regression))
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='比较两份基准测试JSON结果')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.15, help='允许的相对增幅，默认0.15（15%%）')
+    parser.add_argument('--metric', default='median_ms')
+    args = parser.parse_args(argv)
+
+    rows, regressed = compare(load_results(args.base), load_results(args.new), args.threshold, args.metric)
+    for (suite, name, n_regular, n_dynamic), before, after, change, is_regression in rows:
+        flag = '  <-- 回退' if is_regression else ''
+        print(f"{suite:10} {name:40} {n_regular:>5}x{n_dynamic:<6} "
+              f"{before:10.3f} -> {after:10.3f} ms ({change:+.1%}){flag}")
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
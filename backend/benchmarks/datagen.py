@@ -0,0 +1,116 @@
+"""合成数据生成器
+
+按固定随机种子生成可复现的用户任务数据：常规任务混合每日、每周和单次任务，
+动态任务包含不同的截止时间、优先级、耗时和标签。
+"""
+import random
+from datetime import datetime, timedelta
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+REGULAR_TITLES = ['高等数学', '大学英语', '数据结构', '组会', '健身', '社团活动', '实验课', '答疑']
+DYNAMIC_TITLES = ['完成作业', '复习考试', '阅读论文', '写实验报告', '准备演讲', '整理笔记', '代码评审', '提交申请']
+LOCATIONS = ['教学楼A101', '图书馆', '实验室302', '线上', None]
+TAGS = ['assignment', 'exam', 'meeting', 'urgent', 'reading', 'project', 'personal', 'review']
+
+# 常规任务重复类型分布：(重复规则, 权重)
+REPEAT_MIX = [('daily', 0.15), ('weekly', 0.6), ('once', 0.25)]
+
+
+def _pick_repeat(rng):
+    value = rng.random()
+    cumulative = 0.0
+    for rule, weight in REPEAT_MIX:
+        cumulative += weight
+        if value < cumulative:
+            return rule
+    return REPEAT_MIX[-1][0]
+
+
+def generate_regular_tasks(rng, count, base_date, start_id=1):
+    """生成常规任务字典列表（字段与调度器Task模型一致）"""
+    tasks = []
+    for i in range(count):
+        repeat_rule = _pick_repeat(rng)
+        day = base_date + timedelta(days=rng.randint(-14, 14))
+        start = day.replace(hour=rng.randint(8, 20), minute=rng.choice([0, 15, 30, 45]), second=0, microsecond=0)
+        end = start + timedelta(minutes=rng.choice([30, 45, 60, 90, 120]))
+        tasks.append({
+            "id": start_id + i,
+            "title": f"{rng.choice(REGULAR_TITLES)} {i}",
+            "type": "regular",
+            "start_time": start.strftime(TIME_FORMAT),
+            "end_time": end.strftime(TIME_FORMAT),
+            "location": rng.choice(LOCATIONS),
+            "repeat_rule": repeat_rule,
+            "completed": False,
+            "created_at": (base_date - timedelta(days=rng.randint(0, 60))).strftime(TIME_FORMAT)
+        })
+    return tasks
+
+
+def generate_dynamic_tasks(rng, count, base_date, start_id=1):
+    """生成动态任务字典列表，约30%已完成，约15%没有截止时间"""
+    tasks = []
+    for i in range(count):
+        created = base_date - timedelta(days=rng.randint(0, 30), hours=rng.randint(0, 23))
+        completed = rng.random() < 0.3
+        deadline = None
+        if rng.random() >= 0.15:
+            deadline = (base_date + timedelta(days=rng.randint(-3, 21), hours=rng.randint(8, 23))).strftime(TIME_FORMAT)
+        task = {
+            "id": start_id + i,
+            "title": f"{rng.choice(DYNAMIC_TITLES)} {i}",
+            "type": "dynamic",
+            "priority": rng.choice(['high', 'medium', 'medium', 'low']),
+            "estimated_time": rng.choice([None, 15, 30, 45, 60, 90, 120, 240]),
+            "deadline": deadline,
+            "completed": completed,
+            "tags": rng.sample(TAGS, rng.randint(0, 3)) or None,
+            "created_at": created.strftime(TIME_FORMAT)
+        }
+        if completed:
+            task["completed_at"] = (created + timedelta(hours=rng.randint(1, 72))).strftime(TIME_FORMAT)
+        tasks.append(task)
+    return tasks
+
+
+def generate_user_tasks(n_regular, n_dynamic, seed=0, base_date=None):
+    """生成一个用户的 (常规任务, 动态任务) 字典列表"""
+    rng = random.Random(seed)
+    base_date = base_date or datetime(2024, 3, 4)
+    regular = generate_regular_tasks(rng, n_regular, base_date)
+    dynamic = generate_dynamic_tasks(rng, n_dynamic, base_date, start_id=n_regular + 1)
+    return regular, dynamic
+
+
+def populate_user(db, user_id, regular, dynamic):
+    """将生成的任务批量写入数据库"""
+    from models.task import RegularTask, DynamicTask, TaskType, RepeatType, PriorityType
+
+    repeat_types = {'daily': RepeatType.DAILY, 'weekly': RepeatType.WEEKLY, 'once': RepeatType.SINGLE}
+    db.session.add_all([
+        RegularTask(
+            user_id=user_id,
+            title=task["title"],
+            task_type=TaskType.COURSE,
+            location=task["location"],
+            start_time=datetime.strptime(task["start_time"], TIME_FORMAT),
+            end_time=datetime.strptime(task["end_time"], TIME_FORMAT),
+            repeat_type=repeat_types[task["repeat_rule"]]
+        )
+        for task in regular
+    ])
+    db.session.add_all([
+        DynamicTask(
+            user_id=user_id,
+            title=task["title"],
+            priority=PriorityType[task["priority"].upper()],
+            estimated_time=task["estimated_time"],
+            deadline=datetime.strptime(task["deadline"], TIME_FORMAT) if task["deadline"] else None,
+            tags=','.join(task["tags"]) if task["tags"] else None,
+            is_completed=task["completed"]
+        )
+        for task in dynamic
+    ])
+    db.session.commit()
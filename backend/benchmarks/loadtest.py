@@ -0,0 +1,326 @@
+"""整体吞吐量压测
+
+在gunicorn下启动真实应用（SQLite或本地Postgres），OpenAI接口指向本地替身，
+按真实流量比例（登录、任务列表、创建任务、日程生成、周计划、AI建议）施加闭环负载，
+逐级提高并发得到每种worker配置的饱和曲线以及p50/p95/p99延迟。
+
+在 backend 目录下运行:
+    python -m benchmarks.loadtest --workers sync:2 --workers gthread:2x8 --workers asgi:2x16 \\
+        --concurrency 1,4,16,64 --duration 20 --llm-latency-ms 800 --output load.json
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.datagen import generate_user_tasks
+from benchmarks.stub_llm import start_stub_server
+
+# 流量比例：(操作名, 权重)
+TRAFFIC_MIX = [
+    ('login', 5),
+    ('list_tasks', 30),
+    ('create_task', 15),
+    ('generate_schedule', 20),
+    ('weekly_schedule', 10),
+    ('recommendations', 20),
+]
+PASSWORD = 'load-password'
+
+
+def parse_worker_config(value):
+    """解析 "sync:4"、"gthread:4x8" 或 "asgi:4x16" 形式的worker配置"""
+    worker_class, _, size = value.partition(':')
+    workers, _, threads = (size or '1').partition('x')
+    return {"spec": value, "worker_class": worker_class, "workers": int(workers), "threads": int(threads or 1)}
+
+
+def percentile(sorted_values, pct):
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies):
+    values = sorted(round(value, 3) for value in latencies)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else None
+    }
+
+
+def is_success(status):
+    return 200 <= status < 300 or status == 304
+
+
+def status_counts(statuses):
+    """失败请求按原因计数：rate_limited 为429，busy 为503，errors 为其余失败（含连接错误）"""
+    rate_limited = sum(status == 429 for status in statuses)
+    busy = sum(status == 503 for status in statuses)
+    failed = sum(not is_success(status) for status in statuses)
+    return {"rate_limited": rate_limited, "busy": busy, "errors": failed - rate_limited - busy}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class ApiClient:
+    """基于http.client的长连接客户端，开销低于requests，避免客户端成为瓶颈"""
+
+    def __init__(self, port, token=None):
+        self.port = port
+        self.token = token
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+
+    def request(self, method, path, payload=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        body = json.dumps(payload) if payload is not None else None
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+            raise
+        return response.status, data
+
+
+class Server:
+    """在子进程中运行gunicorn"""
+
+    def __init__(self, config, database_url, llm_base_url):
+        self.config = config
+        self.port = free_port()
+        env = dict(os.environ,
+                   DATABASE_URL=database_url,
+                   OPENAI_API_KEY='stub',
+                   OPENAI_API_BASE=llm_base_url,
+                   # 压测用户少、请求密集，按用户限流会让大部分请求直接返回429
+                   RATE_LIMIT_ENABLED='false')
+        # asgi 表示ASGI模式（asgi.py，需要安装uvicorn），--threads 对应 ASGI_THREADS
+        asgi = config["worker_class"] == 'asgi'
+        if asgi:
+            env['ASGI_THREADS'] = str(config["threads"])
+        command = [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f"127.0.0.1:{self.port}",
+            '--workers', str(config["workers"]),
+            '--worker-class', 'uvicorn.workers.UvicornWorker' if asgi else config["worker_class"],
+            '--threads', str(config["threads"]),
+            '--timeout', '120',
+            '--log-level', 'warning',
+            'asgi:application' if asgi else 'main:app'
+        ]
+        self.process = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.dirname(__file__)))
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn 启动失败，退出码 {self.process.returncode}")
+            try:
+                status, _ = ApiClient(self.port).request('POST', '/api/auth/login', {})
+                if status == 400:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError('gunicorn 启动超时')
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def seed_users(port, n_users, n_regular, n_dynamic, prefix):
+    """通过HTTP注册用户并写入任务，返回 [(email, token)]"""
+    users = []
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(n_users):
+        email = f"{prefix}{i}@load.local"
+        client = ApiClient(port)
+        client.request('POST', '/api/auth/register', {"username": f"{prefix}{i}", "email": email, "password": PASSWORD})
+        _, data = client.request('POST', '/api/auth/login', {"email": email, "password": PASSWORD})
+        client.token = json.loads(data)["access_token"]
+
+        regular, dynamic = generate_user_tasks(n_regular, n_dynamic, seed=i, base_date=today)
+        repeat_types = {'daily': 'daily', 'weekly': 'weekly', 'once': 'single'}
+        for task in regular:
+            client.request('POST', '/api/tasks/regular', {
+                "title": task["title"], "task_type": "course", "location": task["location"],
+                "start_time": task["start_time"], "end_time": task["end_time"],
+                "repeat_type": repeat_types[task["repeat_rule"]]
+            })
+        client.request('POST', '/api/tasks/dynamic/batch', [
+            {key: value for key, value in {
+                "title": task["title"], "priority": task["priority"],
+                "estimated_time": task["estimated_time"], "deadline": task["deadline"],
+                "tags": ','.join(task["tags"]) if task["tags"] else None
+            }.items() if value is not None}
+            for task in dynamic
+        ])
+        users.append((email, client.token))
+    return users
+
+
+def run_operation(client, op, email, rng):
+    today = datetime.now().strftime('%Y-%m-%d')
+    if op == 'login':
+        return client.request('POST', '/api/auth/login', {"email": email, "password": PASSWORD})
+    if op == 'list_tasks':
+        path = '/api/tasks/dynamic' if rng.random() < 0.6 else '/api/tasks/regular'
+        return client.request('GET', path)
+    if op == 'create_task':
+        deadline = (datetime.now() + timedelta(days=rng.randint(0, 10))).strftime('%Y-%m-%dT%H:%M:%S')
+        return client.request('POST', '/api/tasks/dynamic', {
+            "title": "压测任务", "priority": rng.choice(['high', 'medium', 'low']),
+            "estimated_time": rng.choice([30, 60, 90]), "deadline": deadline
+        })
+    if op == 'generate_schedule':
+        return client.request('POST', '/api/ai/generate-schedule', {"date": today})
+    if op == 'weekly_schedule':
+        return client.request('POST', '/api/ai/get-weekly-schedule', {"start_date": today})
+    if op == 'recommendations':
+        return client.request('POST', '/api/ai/get-recommendations', {"date": today})
+    raise ValueError(op)
+
+
+def run_level(port, users, concurrency, duration, seed):
+    """以固定并发运行闭环负载，返回该并发级别的统计"""
+    ops = [op for op, _ in TRAFFIC_MIX]
+    weights = [weight for _, weight in TRAFFIC_MIX]
+    records = []
+    records_lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        email, token = users[index % len(users)]
+        client = ApiClient(port, token)
+        local = []
+        while time.monotonic() < stop_at:
+            op = rng.choices(ops, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, _ = run_operation(client, op, email, rng)
+            except (http.client.HTTPException, OSError):
+                status = 0
+            local.append((op, (time.perf_counter() - start) * 1000, status))
+        with records_lock:
+            records.extend(local)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    # 只有成功的请求计入吞吐量和延迟；被限流（429）和并发上限拒绝（503）的请求单独计数
+    ok = [r for r in records if is_success(r[2])]
+    level = {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(records),
+        **status_counts([r[2] for r in records]),
+        "rps": round(len(ok) / elapsed, 2),
+        **latency_summary([r[1] for r in ok]),
+        "by_operation": {}
+    }
+    for op in ops:
+        level["by_operation"][op] = {
+            **latency_summary([r[1] for r in ok if r[0] == op]),
+            **status_counts([r[2] for r in records if r[0] == op])
+        }
+    return level
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gunicorn下的整体吞吐量压测')
+    parser.add_argument('--workers', action='append', type=parse_worker_config,
+                        help='worker配置，如 sync:4 或 gthread:2x8（可重复）')
+    parser.add_argument('--concurrency', default='1,4,16,32', help='并发级别列表，逗号分隔')
+    parser.add_argument('--duration', type=float, default=15, help='每个并发级别的持续秒数')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--regular', type=int, default=20, help='每个用户的常规任务数')
+    parser.add_argument('--dynamic', type=int, default=60, help='每个用户的动态任务数')
+    parser.add_argument('--llm-latency-ms', type=float, default=800)
+    parser.add_argument('--llm-jitter-ms', type=float, default=100)
+    parser.add_argument('--database-url', help='默认为每个配置新建临时SQLite；也可指定本地Postgres')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON报告输出路径')
+    args = parser.parse_args(argv)
+
+    configs = args.workers or [parse_worker_config('sync:2'), parse_worker_config('gthread:2x8')]
+    levels = [int(c) for c in args.concurrency.split(',')]
+    llm_server, llm_base_url = start_stub_server(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "traffic_mix": dict(TRAFFIC_MIX),
+            "llm_latency_ms": args.llm_latency_ms,
+            "users": args.users,
+            "tasks_per_user": {"regular": args.regular, "dynamic": args.dynamic}
+        },
+        "configurations": []
+    }
+
+    try:
+        for config in configs:
+            database_url = args.database_url or \
+                'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='load-'), 'load.db')
+            server = Server(config, database_url, llm_base_url)
+            try:
+                server.wait_ready()
+                prefix = f"load_{config['worker_class']}_{config['workers']}x{config['threads']}_"
+                users = seed_users(server.port, args.users, args.regular, args.dynamic, prefix)
+                curve = []
+                for concurrency in levels:
+                    level = run_level(server.port, users, concurrency, args.duration, args.seed)
+                    curve.append(level)
+                    print(f"{config['spec']:>14} c={concurrency:<4} rps={level['rps']:<8} "
+                          f"p50={level['p50_ms'] or 0:.1f}ms p95={level['p95_ms'] or 0:.1f}ms "
+                          f"p99={level['p99_ms'] or 0:.1f}ms errors={level['errors']} "
+                          f"rate_limited={level['rate_limited']} busy={level['busy']}", file=sys.stderr)
+                report["configurations"].append({**config, "saturation_curve": curve})
+            finally:
+                server.stop()
+    finally:
+        llm_server.shutdown()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
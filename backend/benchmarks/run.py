@@ -0,0 +1,88 @@
+"""基准测试入口
+
+在 backend 目录下运行:
+    python -m benchmarks.run --suite scheduler --suite api --output bench.json
+    python -m benchmarks.compare base.json bench.json
+
+startup 测试集基于 python -X importtime 统计worker启动耗时；
+database 测试集比较不同数据库设置下的吞吐量（BENCH_DATABASE_URL 指定Postgres时比较连接池大小）；
+login 测试集比较不同密码哈希参数下每核的登录吞吐量；
+memory 测试集统计 10k 个动态任务时每个任务、时间槽和日程项占用的字节数；
+async 测试集比较同步worker与ASGI模式（asgi.py）同时挂起长轮询和AI建议请求的数量；
+cache 测试集比较增加worker和节点时，只用进程内缓存与使用共享缓存存储的命中率和现场计算次数。
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks import (bench_scheduler, bench_api, bench_startup, bench_database, bench_login, bench_memory,
+                        bench_async, bench_cache)
+from benchmarks.common import DEFAULT_SCALES, parse_scales
+
+SUITES = {
+    bench_scheduler.SUITE: bench_scheduler.run,
+    bench_api.SUITE: bench_api.run,
+    bench_startup.SUITE: bench_startup.run,
+    bench_database.SUITE: bench_database.run,
+    bench_login.SUITE: bench_login.run,
+    bench_memory.SUITE: bench_memory.run,
+    bench_async.SUITE: bench_async.run,
+    bench_cache.SUITE: bench_cache.run,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='运行调度器与API基准测试')
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES), help='要运行的测试集（可重复，默认全部）')
+    parser.add_argument('--scales', type=parse_scales, default=DEFAULT_SCALES,
+                        help='规模列表，格式为 常规数x动态数，逗号分隔，例如 10x20,200x1000')
+    parser.add_argument('--repeat', type=int, default=5, help='每个用例的计时轮数')
+    parser.add_argument('--seed', type=int, default=0, help='数据生成随机种子')
+    parser.add_argument('--output', help='JSON结果输出路径（默认输出到标准输出）')
+    args = parser.parse_args(argv)
+
+    # 基准测试期间只输出WARNING及以上的日志，避免I/O干扰计时（create_app 按 LOG_LEVEL 配置根日志器）
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    logging.getLogger().setLevel(os.environ['LOG_LEVEL'])
+
+    results = []
+    for suite in args.suite or list(SUITES):
+        print(f"运行测试集: {suite}", file=sys.stderr)
+        results.extend(SUITES[suite](args.scales, repeat=args.repeat, seed=args.seed))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"结果已写入 {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
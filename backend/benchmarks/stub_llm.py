@@ -0,0 +1,90 @@
+"""本地OpenAI接口替身
+
+模拟 /v1/chat/completions，可配置响应延迟，用于压测时评估阻塞的
+get_ai_recommendations 对worker容量的影响。应用通过环境变量指向它:
+
+    OPENAI_API_KEY=stub OPENAI_API_BASE=http://127.0.0.1:8900/v1
+
+单独运行:
+    python -m benchmarks.stub_llm --port 8900 --latency-ms 800 --jitter-ms 200
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_CONTENT = "1. 当前日程安排合理。\n2. 建议在高优先级任务之间安排休息。\n3. 尽早处理临近截止的任务。"
+
+
+def make_handler(latency_ms, jitter_ms):
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                return
+
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+            time.sleep(delay)
+            self._send(200, {
+                "id": f"chatcmpl-stub-{time.monotonic_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": STUB_CONTENT},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+
+        def _send(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubLLMHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    # 并发压测时同时建立大量连接，默认的监听队列（5）会导致连接被拒绝
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start_stub_server(port=0, latency_ms=500, jitter_ms=0):
+    """在后台线程中启动替身服务，返回 (server, base_url)"""
+    server = StubServer(('127.0.0.1', port), make_handler(latency_ms, jitter_ms))
+    threading.Thread(target=server.serve_forever, name='stub-llm', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地OpenAI接口替身')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=500)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    args = parser.parse_args(argv)
+
+    server = StubServer(('127.0.0.1', args.port), make_handler(args.latency_ms, args.jitter_ms))
+    print(f"OpenAI替身已启动: http://127.0.0.1:{args.port}/v1 (延迟 {args.latency_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
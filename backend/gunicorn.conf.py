@@ -0,0 +1,23 @@
+# gunicorn配置（在backend目录下启动时自动加载）
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+# ASGI模式使用 uvicorn.workers.UvicornWorker 并以 asgi:application 启动，见 asgi.py
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+# 预加载模式：主进程创建应用后再fork，worker以写时复制方式共享已加载的模块
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # 预加载时在主进程中提前导入AI依赖，避免每个worker首次请求时各自导入
+    if os.getenv('PRELOAD_AI_MODULES', 'true').lower() == 'true':
+        import services.ai_scheduler  # noqa: F401
+    # 冻结已有对象，GC不再改写它们的对象头，fork后的内存页得以保持共享
+    gc.freeze()
@@ -1,4 +1,13 @@
-from backend.models.user import User
-from backend.models.task import RegularTask, DynamicTask, TaskType, RepeatType, PriorityType
+from models.user import User
+from models.task import RegularTask, DynamicTask, TaskType, RepeatType, PriorityType
+from models.schedule_plan import SchedulePlan
+from models.task_change import TaskChange
+from models.archive import ArchivedRegularTask, ArchivedDynamicTask
+from models.calendar_token import CalendarToken
+from models.availability import AvailabilityProfile
+from models.cache_entry import CacheEntry
+from models.free_busy_share import FreeBusyShare
 
-__all__ = ['User', 'RegularTask', 'DynamicTask', 'TaskType', 'RepeatType', 'PriorityType']
\ No newline at end of file
+__all__ = ['User', 'RegularTask', 'DynamicTask', 'TaskType', 'RepeatType', 'PriorityType', 'SchedulePlan',
+           'TaskChange', 'ArchivedRegularTask', 'ArchivedDynamicTask', 'CalendarToken',
+           'AvailabilityProfile', 'CacheEntry', 'FreeBusyShare']
@@ -0,0 +1,43 @@
+from app import db
+from datetime import datetime
+from sqlalchemy import Enum
+from models.task import TaskType, RepeatType, PriorityType
+
+class ArchivedRegularTask(db.Model):
+    """已归档的过期单次常规任务，按结束时间所在月份分区（archive_month）"""
+    __tablename__ = 'archived_regular_task'
+    __table_args__ = (db.Index('ix_archived_regular_task_user_month', 'user_id', 'archive_month'),)
+
+    archive_id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, nullable=False)  # 原任务ID
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    task_type = db.Column(Enum(TaskType))
+    location = db.Column(db.String(200))
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    repeat_type = db.Column(Enum(RepeatType))
+    repeat_details = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime)
+    archive_month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ArchivedDynamicTask(db.Model):
+    """已归档的已完成动态任务，按完成时间所在月份分区（archive_month）"""
+    __tablename__ = 'archived_dynamic_task'
+    __table_args__ = (db.Index('ix_archived_dynamic_task_user_month', 'user_id', 'archive_month'),)
+
+    archive_id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, nullable=False)  # 原任务ID
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    priority = db.Column(Enum(PriorityType))
+    estimated_time = db.Column(db.Integer)
+    deadline = db.Column(db.DateTime)
+    tags = db.Column(db.String(500))
+    is_completed = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archive_month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
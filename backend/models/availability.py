@@ -0,0 +1,12 @@
+from app import db
+from datetime import datetime
+
+class AvailabilityProfile(db.Model):
+    """用户的可安排时间：每周各天的可用时间块（位图）、不可用日期和最短时间槽"""
+    __tablename__ = 'availability_profile'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    weekly_mask = db.Column(db.LargeBinary, nullable=False)  # 周一到周日，每天96个15分钟时间块，每块1位
+    blackout_dates = db.Column(db.Text, nullable=False, default='')  # 逗号分隔的ISO日期
+    min_duration = db.Column(db.Integer, nullable=False, default=30)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,9 @@
+from app import db
+
+class CacheEntry(db.Model):
+    """共享缓存条目（CACHE_STORAGE_URL=database 时使用，见 utils/cache.DatabaseCacheStore）"""
+    __tablename__ = 'cache_entry'
+
+    key = db.Column(db.String(255), primary_key=True)
+    value = db.Column(db.LargeBinary, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,11 @@
+from app import db
+from datetime import datetime
+
+class CalendarToken(db.Model):
+    """日历订阅令牌，只保存令牌的SHA-256摘要"""
+    __tablename__ = 'calendar_token'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True, nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,9 @@
+from app import db
+from datetime import datetime
+
+class FreeBusyShare(db.Model):
+    """同意在多人共同空闲时间查找中公开忙闲状态的用户（只公开是否空闲，不含任务内容）"""
+    __tablename__ = 'free_busy_share'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,14 @@
+from app import db
+from datetime import datetime
+
+class SchedulePlan(db.Model):
+    """预先计算的每日日程（压缩存储），用户任务变化时删除；data_version 为计算所依据的用户数据版本"""
+    __tablename__ = 'schedule_plan'
+    __table_args__ = (db.UniqueConstraint('user_id', 'plan_date'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    plan_date = db.Column(db.Date, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib压缩的JSON
+    data_version = db.Column(db.String(40), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from backend.app import db
+from app import db
 from datetime import datetime
 from enum import Enum as PyEnum
 from sqlalchemy import Enum
@@ -32,6 +32,9 @@ class RegularTask(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class DynamicTask(db.Model):
+    # 即将到期的任务查询按 (用户, 是否完成, 截止时间) 范围扫描
+    __table_args__ = (db.Index('ix_dynamic_task_user_completed_deadline', 'user_id', 'is_completed', 'deadline'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
@@ -0,0 +1,15 @@
+from app import db
+from datetime import datetime
+
+class TaskChange(db.Model):
+    """任务变更日志：seq 按用户单调递增，删除记为墓碑（deleted=True）"""
+    __tablename__ = 'task_change'
+    __table_args__ = (db.UniqueConstraint('user_id', 'seq'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    task_kind = db.Column(db.String(10), nullable=False)  # regular / dynamic
+    task_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,5 +1,6 @@
-from backend.app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app import db
+from werkzeug.security import check_password_hash
+from services.passwords import hash_password
 from datetime import datetime
 
 class User(db.Model):
@@ -14,7 +15,7 @@ class User(db.Model):
     dynamic_tasks = db.relationship('DynamicTask', backref='user', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
\ No newline at end of file
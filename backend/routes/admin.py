@@ -0,0 +1,62 @@
+import os
+import re
+from flask import Blueprint, request, jsonify, current_app, send_file
+from utils.auth import admin_required
+from utils.profiler import sampler, new_profile_id, profile_path
+
+bp = Blueprint('admin', __name__)
+
+PROFILE_ID_PATTERN = re.compile(r'^(sampler|cprofile)-\d+-\d+$')
+
+
+@bp.route('/profile', methods=['POST'])
+@admin_required
+def start_profile():
+    """在当前worker中启动统计式调用栈采样"""
+    if not current_app.config.get('PROFILER_ENABLED'):
+        return jsonify({"msg": "性能分析未启用"}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get('seconds', request.args.get('seconds', 10)))
+    except (TypeError, ValueError):
+        return jsonify({"msg": "采样时长无效"}), 400
+
+    max_seconds = current_app.config['PROFILER_MAX_SECONDS']
+    if seconds <= 0 or seconds > max_seconds:
+        return jsonify({"msg": f"采样时长必须在0到{max_seconds}秒之间"}), 400
+
+    profile_id = new_profile_id('sampler')
+    if not sampler.start(seconds, profile_path(current_app, profile_id, '.collapsed')):
+        return jsonify({"msg": "当前worker已有采样在进行中"}), 409
+
+    return jsonify({
+        "msg": "采样已开始",
+        "profile_id": profile_id,
+        "worker_pid": os.getpid(),
+        "seconds": seconds
+    }), 202
+
+
+@bp.route('/profile/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile(profile_id):
+    """下载采样结果（collapsed调用栈）或单请求cProfile结果"""
+    if not current_app.config.get('PROFILER_ENABLED'):
+        return jsonify({"msg": "性能分析未启用"}), 404
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return jsonify({"msg": "无效的分析ID"}), 400
+
+    if profile_id.startswith('sampler-'):
+        path = profile_path(current_app, profile_id, '.collapsed')
+        mimetype = 'text/plain'
+    else:
+        path = profile_path(current_app, profile_id, '.prof')
+        mimetype = 'application/octet-stream'
+
+    if not os.path.exists(path):
+        # 结果文件在采样结束后才会写出
+        return jsonify({"msg": "分析结果尚未生成或不存在"}), 404
+
+    return send_file(os.path.abspath(path), mimetype=mimetype,
+                     as_attachment=True, download_name=os.path.basename(path))
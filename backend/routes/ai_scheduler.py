@@ -1,39 +1,41 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 from typing import List
 
-from models.task import RegularTask, DynamicTask
-from models.user import User
-from services.ai_scheduler import scheduler, Task as SchedulerTask
+from services.task_loader import load_user_tasks
+from services.plan_cache import get_schedules
+from services.simulation import parse_variants, simulate
+from services.group_availability import (find_group_slots, unshared_users, is_sharing_free_busy,
+                                         set_free_busy_sharing, ORDERS)
+from services.availability import (get_availability, parse_profile, save_availability, delete_availability,
+                                   availability_to_dict)
+from utils.database import route_reads_to_replica
+from utils.rate_limit import rate_limit, llm_admission
 
 # 创建蓝图
-ai_scheduler_bp = Blueprint('ai_scheduler', __name__)
+bp = Blueprint('ai_scheduler', __name__)
 
-def convert_to_scheduler_task(task, task_type):
-    """将数据库模型转换为调度器任务模型"""
-    task_dict = {
-        "id": task.id,
-        "title": task.title,
-        "type": task_type,
-        "completed": getattr(task, 'completed', False)
-    }
-    
-    if task_type == "dynamic":
-        task_dict["priority"] = task.priority
-        task_dict["estimated_time"] = task.estimated_time
-        task_dict["deadline"] = task.deadline
-        task_dict["tags"] = task.tags
-    else:  # regular
-        task_dict["start_time"] = task.start_time
-        task_dict["end_time"] = task.end_time
-        task_dict["location"] = task.location
-        task_dict["repeat_rule"] = task.repeat_rule
-    
-    return SchedulerTask(**task_dict)
+# 工作模式分析的天数
+PATTERN_DAYS = 14
+
+# 调度器依赖openai、pydantic、pytz，导入开销较大，在首次访问 /api/ai 时才加载
+scheduler = None
 
-@ai_scheduler_bp.route('/generate-schedule', methods=['POST'])
+@bp.before_request
+def load_scheduler():
+    """延迟导入调度器服务，并将本蓝图的只读查询路由到副本"""
+    global scheduler
+    # 修改配置（可用性、公开忙闲状态）时需要读到主库中的最新记录，副本滞后会把已有记录当作不存在
+    if request.method not in ('PUT', 'DELETE'):
+        route_reads_to_replica()
+    if scheduler is None:
+        from services.ai_scheduler import scheduler as scheduler_instance
+        scheduler = scheduler_instance
+
+@bp.route('/generate-schedule', methods=['POST'])
 @jwt_required()
+@rate_limit('ai_schedule')
 def generate_schedule():
     """生成每日日程表"""
     try:
@@ -46,46 +48,20 @@ def generate_schedule():
         
         # 验证日期格式
         try:
-            datetime.strptime(date, '%Y-%m-%d')
+            day = datetime.strptime(date, '%Y-%m-%d').date()
         except ValueError:
             return jsonify({"error": "日期格式无效，请使用YYYY-MM-DD格式"}), 400
         
-        # 获取用户的所有任务
-        user = User.query.get(user_id)
-        if not user:
+        # 依次使用缓存（各worker和节点共享）、预计算的日程，都未命中时加载当天的任务现场生成
+        plans = get_schedules(user_id, [day])
+        if plans is None:
             return jsonify({"error": "用户不存在"}), 404
-        
-        # 转换任务格式
-        regular_tasks = [
-            convert_to_scheduler_task(task, "regular") 
-            for task in RegularTask.query.filter_by(user_id=user_id).all()
-        ]
-        
-        dynamic_tasks = [
-            convert_to_scheduler_task(task, "dynamic") 
-            for task in DynamicTask.query.filter_by(user_id=user_id).all()
-        ]
-        
-        # 生成日程
-        schedule = scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks, date)
-        
-        # 转换为JSON可序列化的格式
-        schedule_data = [
-            {
-                "task_id": item.task_id,
-                "title": item.title,
-                "start_time": item.start_time,
-                "end_time": item.end_time,
-                "priority_score": item.priority_score,
-                "confidence": item.confidence
-            }
-            for item in schedule
-        ]
+        schedule = plans[day]
         
         return jsonify({
             "success": True,
             "date": date,
-            "schedule": schedule_data,
+            "schedule": schedule,
             "total_tasks": len(schedule)
         })
         
@@ -95,55 +71,26 @@ def generate_schedule():
             "error": str(e)
         }), 500
 
-@ai_scheduler_bp.route('/get-recommendations', methods=['POST'])
+@bp.route('/get-recommendations', methods=['POST'])
 @jwt_required()
+@rate_limit('ai_llm')
+@llm_admission
 async def get_recommendations():
     """获取AI日程优化建议"""
     try:
         # 获取用户ID
         user_id = get_jwt_identity()
         
-        # 获取请求参数
-        data = request.get_json()
-        date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
-        
-        # 验证日期格式
-        try:
-            datetime.strptime(date, '%Y-%m-%d')
-        except ValueError:
-            return jsonify({"error": "日期格式无效，请使用YYYY-MM-DD格式"}), 400
-        
-        # 获取用户的所有任务
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "用户不存在"}), 404
-        
-        # 转换任务格式
-        regular_tasks = [
-            convert_to_scheduler_task(task, "regular") 
-            for task in RegularTask.query.filter_by(user_id=user_id).all()
-        ]
-        
-        dynamic_tasks = [
-            convert_to_scheduler_task(task, "dynamic") 
-            for task in DynamicTask.query.filter_by(user_id=user_id).all()
-        ]
-        
-        # 生成日程
-        schedule = scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks, date)
-        
-        # 获取所有任务
-        all_tasks = regular_tasks + dynamic_tasks
+        # 校验参数并生成当天日程
+        error, prepared = prepare_recommendations(user_id, request.get_json())
+        if error is not None:
+            return error
+        date, schedule, all_tasks = prepared
         
         # 获取AI建议
         recommendations = await scheduler.get_ai_recommendations(schedule, all_tasks, date)
         
-        return jsonify({
-            "success": True,
-            "date": date,
-            "recommendations": recommendations.get("recommendations", ""),
-            "ai_success": recommendations.get("success", False)
-        })
+        return jsonify(recommendations_to_dict(date, recommendations))
         
     except Exception as e:
         return jsonify({
@@ -151,7 +98,36 @@ async def get_recommendations():
             "error": str(e)
         }), 500
 
-@ai_scheduler_bp.route('/analyze-work-patterns', methods=['GET'])
+def prepare_recommendations(user_id, data):
+    """校验参数并生成当天日程，返回 (错误响应, (日期, 日程, 全部任务))，两者只有一个不为None"""
+    date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
+    
+    # 验证日期格式
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        return (jsonify({"error": "日期格式无效，请使用YYYY-MM-DD格式"}), 400), None
+    
+    # 加载调度所需的任务（当天的常规任务和未完成的动态任务）
+    task_data = load_user_tasks(user_id, window_start=day, window_end=day)
+    if task_data is None:
+        return (jsonify({"error": "用户不存在"}), 404), None
+    regular_tasks, dynamic_tasks = task_data
+    
+    # 生成日程
+    schedule = scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks, date,
+                                                 get_availability(user_id))
+    return None, (date, schedule, regular_tasks + dynamic_tasks)
+
+def recommendations_to_dict(date, recommendations):
+    return {
+        "success": True,
+        "date": date,
+        "recommendations": recommendations.get("recommendations", ""),
+        "ai_success": recommendations.get("success", False)
+    }
+
+@bp.route('/analyze-work-patterns', methods=['GET'])
 @jwt_required()
 def analyze_work_patterns():
     """分析用户工作模式"""
@@ -159,26 +135,16 @@ def analyze_work_patterns():
         # 获取用户ID
         user_id = get_jwt_identity()
         
-        # 获取用户的所有任务
-        user = User.query.get(user_id)
-        if not user:
+        # 加载调度所需的任务（分析周期内创建的任务，多取一天以覆盖时区差异）
+        task_data = load_user_tasks(user_id, created_since=datetime.now() - timedelta(days=PATTERN_DAYS + 1))
+        if task_data is None:
             return jsonify({"error": "用户不存在"}), 404
-        
-        # 转换任务格式
-        regular_tasks = [
-            convert_to_scheduler_task(task, "regular") 
-            for task in RegularTask.query.filter_by(user_id=user_id).all()
-        ]
-        
-        dynamic_tasks = [
-            convert_to_scheduler_task(task, "dynamic") 
-            for task in DynamicTask.query.filter_by(user_id=user_id).all()
-        ]
+        regular_tasks, dynamic_tasks = task_data
         
         all_tasks = regular_tasks + dynamic_tasks
         
         # 分析工作模式
-        patterns = scheduler.analyze_work_patterns(all_tasks, days=14)  # 分析最近14天
+        patterns = scheduler.analyze_work_patterns(all_tasks, days=PATTERN_DAYS)
         
         return jsonify({
             "success": True,
@@ -191,8 +157,9 @@ def analyze_work_patterns():
             "error": str(e)
         }), 500
 
-@ai_scheduler_bp.route('/get-weekly-schedule', methods=['POST'])
+@bp.route('/get-weekly-schedule', methods=['POST'])
 @jwt_required()
+@rate_limit('ai_schedule')
 def get_weekly_schedule():
     """获取周计划"""
     try:
@@ -209,23 +176,12 @@ def get_weekly_schedule():
         except ValueError:
             return jsonify({"error": "日期格式无效，请使用YYYY-MM-DD格式"}), 400
         
-        # 获取用户的所有任务
-        user = User.query.get(user_id)
-        if not user:
+        # 依次使用缓存（各worker和节点共享）、预计算的日程，有未命中的日期时才加载本周的任务现场生成
+        plans = get_schedules(user_id, [(start_date + timedelta(days=i)).date() for i in range(7)])
+        if plans is None:
             return jsonify({"error": "用户不存在"}), 404
         
-        # 转换任务格式
-        regular_tasks = [
-            convert_to_scheduler_task(task, "regular") 
-            for task in RegularTask.query.filter_by(user_id=user_id).all()
-        ]
-        
-        dynamic_tasks = [
-            convert_to_scheduler_task(task, "dynamic") 
-            for task in DynamicTask.query.filter_by(user_id=user_id).all()
-        ]
-        
-        # 生成一周的日程
+        # 组装一周的日程
         weekly_schedule = {}
         total_tasks = 0
         
@@ -233,23 +189,10 @@ def get_weekly_schedule():
             current_date = start_date + timedelta(days=i)
             date_str = current_date.strftime('%Y-%m-%d')
             
-            schedule = scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks, date_str)
+            schedule = plans[current_date.date()]
             total_tasks += len(schedule)
             
-            # 转换为JSON可序列化的格式
-            schedule_data = [
-                {
-                    "task_id": item.task_id,
-                    "title": item.title,
-                    "start_time": item.start_time,
-                    "end_time": item.end_time,
-                    "priority_score": item.priority_score,
-                    "confidence": item.confidence
-                }
-                for item in schedule
-            ]
-            
-            weekly_schedule[date_str] = schedule_data
+            weekly_schedule[date_str] = schedule
         
         return jsonify({
             "success": True,
@@ -264,3 +207,178 @@ def get_weekly_schedule():
             "success": False,
             "error": str(e)
         }), 500
+
+@bp.route('/simulate', methods=['POST'])
+@jwt_required()
+@rate_limit('ai_schedule')
+def simulate_schedules():
+    """在一次请求中评估多个假设方案（修改任务属性或工作时间），返回各方案与基线的比较"""
+    try:
+        # 获取用户ID
+        user_id = get_jwt_identity()
+        
+        # 获取请求参数
+        data = request.get_json() or {}
+        start_date_str = data.get('start_date', datetime.now().strftime('%Y-%m-%d'))
+        
+        # 验证日期格式和参数
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({"success": False, "error": "日期格式无效，请使用YYYY-MM-DD格式"}), 400
+        days = data.get('days', 1)
+        max_days = current_app.config['SIMULATE_MAX_DAYS']
+        if not isinstance(days, int) or not 1 <= days <= max_days:
+            return jsonify({"success": False, "error": f"days 必须在1到{max_days}之间"}), 400
+        try:
+            variants = parse_variants(data.get('variants'), current_app.config['SIMULATE_MAX_VARIANTS'])
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        # 所有方案共用一次加载的任务
+        end_date = start_date + timedelta(days=days - 1)
+        task_data = load_user_tasks(user_id, window_start=start_date.date(), window_end=end_date.date())
+        if task_data is None:
+            return jsonify({"error": "用户不存在"}), 404
+        regular_tasks, dynamic_tasks = task_data
+        
+        dates = [(start_date + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        try:
+            result = simulate(regular_tasks, dynamic_tasks, dates, variants, get_availability(user_id),
+                              include_schedule=bool(data.get('include_schedule')))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        return jsonify({
+            "success": True,
+            "start_date": start_date_str,
+            "end_date": end_date.strftime('%Y-%m-%d'),
+            **result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@bp.route('/availability', methods=['GET'])
+@jwt_required()
+def get_availability_profile():
+    """获取用户的可安排时间配置"""
+    return jsonify({
+        "success": True,
+        "availability": availability_to_dict(get_availability(get_jwt_identity()))
+    })
+
+@bp.route('/availability', methods=['PUT'])
+@jwt_required()
+def update_availability_profile():
+    """设置每周各天的可安排时间、休息时间、不可用日期和最短时间槽"""
+    user_id = get_jwt_identity()
+    try:
+        availability = parse_profile(request.get_json() or {})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    save_availability(user_id, availability)
+    return jsonify({
+        "success": True,
+        "availability": availability_to_dict(availability)
+    })
+
+@bp.route('/availability', methods=['DELETE'])
+@jwt_required()
+def reset_availability_profile():
+    """删除可安排时间配置，恢复默认工作时间"""
+    user_id = get_jwt_identity()
+    delete_availability(user_id)
+    return jsonify({
+        "success": True,
+        "availability": availability_to_dict(get_availability(user_id))
+    })
+
+@bp.route('/free-busy-sharing', methods=['GET'])
+@jwt_required()
+def get_free_busy_sharing():
+    """是否允许其他用户在共同空闲时间查找中查询自己的忙闲状态"""
+    return jsonify({"success": True, "sharing": is_sharing_free_busy(get_jwt_identity())})
+
+@bp.route('/free-busy-sharing', methods=['PUT'])
+@jwt_required()
+def enable_free_busy_sharing():
+    """同意公开忙闲状态（只公开是否空闲，不含任务内容）"""
+    set_free_busy_sharing(get_jwt_identity(), True)
+    return jsonify({"success": True, "sharing": True})
+
+@bp.route('/free-busy-sharing', methods=['DELETE'])
+@jwt_required()
+def disable_free_busy_sharing():
+    """取消公开忙闲状态"""
+    set_free_busy_sharing(get_jwt_identity(), False)
+    return jsonify({"success": True, "sharing": False})
+
+@bp.route('/group-slots', methods=['POST'])
+@jwt_required()
+@rate_limit('ai_schedule')
+def find_group_meeting_slots():
+    """查找一组用户（包含当前用户）的共同空闲时间段，用于安排会议"""
+    try:
+        # 获取用户ID
+        user_id = get_jwt_identity()
+        
+        # 获取请求参数
+        data = request.get_json() or {}
+        start_date_str = data.get('start_date', datetime.now().strftime('%Y-%m-%d'))
+        
+        # 验证日期格式和参数
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({"success": False, "error": "日期格式无效，请使用YYYY-MM-DD格式"}), 400
+        
+        config = current_app.config
+        user_ids = data.get('user_ids')
+        if not isinstance(user_ids, list) or not all(isinstance(value, int) and not isinstance(value, bool)
+                                                     for value in user_ids):
+            return jsonify({"success": False, "error": "user_ids 必须是用户ID列表"}), 400
+        user_ids = sorted(set(user_ids) | {user_id})
+        if len(user_ids) > config['GROUP_MAX_USERS']:
+            return jsonify({"success": False, "error": f"成员数量不能超过 {config['GROUP_MAX_USERS']}"}), 400
+        
+        days = data.get('days', 7)
+        duration = data.get('duration', 60)
+        top_n = data.get('top_n', 10)
+        order = data.get('order', 'earliest')
+        limits = [('days', days, config['GROUP_MAX_DAYS']), ('duration', duration, 24 * 60),
+                  ('top_n', top_n, config['GROUP_MAX_SLOTS'])]
+        for name, value, maximum in limits:
+            if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= maximum:
+                return jsonify({"success": False, "error": f"{name} 必须在1到{maximum}之间"}), 400
+        if order not in ORDERS:
+            return jsonify({"success": False, "error": "order 必须是 " + "/".join(ORDERS)}), 400
+        
+        # 不区分用户不存在和未公开，避免借此探测用户ID
+        if unshared_users(user_id, user_ids):
+            return jsonify({"success": False, "error": "部分成员不存在或未公开忙闲状态"}), 403
+        
+        slots = find_group_slots(user_ids, start_date.date(), days, duration, top_n, order,
+                                 use_availability=data.get('use_availability', True) is not False)
+        
+        return jsonify({
+            "success": True,
+            "start_date": start_date_str,
+            "end_date": (start_date + timedelta(days=days - 1)).strftime('%Y-%m-%d'),
+            "member_count": len(user_ids),
+            "slots": [{
+                "start": slot.start.strftime('%Y-%m-%dT%H:%M:%S'),
+                "end": slot.end.strftime('%Y-%m-%dT%H:%M:%S'),
+                "duration": int((slot.end - slot.start).total_seconds() // 60)
+            } for slot in slots]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
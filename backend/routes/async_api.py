@@ -0,0 +1,153 @@
+"""ASGI模式下原生处理的路由（入口见 asgi.py）
+
+AI建议和任务变更长轮询的大部分时间都在等待：前者等待大模型接口，后者等待其他请求提交变更。
+这里它们作为协程在事件循环中等待，一个worker可以同时挂起数千个请求；大模型调用使用异步HTTP客户端
+（openai的aiohttp实现），长轮询由 ChangeNotifier.wait_async 唤醒。JWT校验、限流、加载任务等同步步骤
+调用Flask路由中的同一套函数，在线程池中执行，响应内容与同步模式一致。
+"""
+import asyncio
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from routes import ai_scheduler, tasks
+from services.change_feed import notifier, get_changes
+from utils.asgi import AsgiApp
+from utils.rate_limit import check_rate_limit, llm_busy_response
+
+# 大模型调用共用的aiohttp会话（复用连接）：{事件循环: 会话}，在事件循环中首次使用时创建
+_http_sessions = {}
+
+
+def _authorize(route_class):
+    """校验JWT并按路由类别限流，返回用户ID"""
+    verify_jwt_in_request()
+    rejected = check_rate_limit(route_class)
+    if rejected is not None:
+        return current_app.make_response(rejected)
+    return get_jwt_identity()
+
+
+def _prepare_recommendations(user_id):
+    ai_scheduler.load_scheduler()
+    try:
+        error, prepared = ai_scheduler.prepare_recommendations(user_id, request.get_json())
+    except Exception as e:
+        return current_app.make_response((jsonify({"success": False, "error": str(e)}), 500))
+    if error is not None:
+        return current_app.make_response(error)
+    return prepared
+
+
+def _recommendations_response(date, recommendations):
+    return jsonify(ai_scheduler.recommendations_to_dict(date, recommendations))
+
+
+async def _llm_session():
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    session = _http_sessions.get(loop)
+    if session is None or session.closed:
+        # 并发数由 ASGI_LLM_MAX_CONCURRENCY 限制，连接池本身不再设上限（aiohttp默认100）
+        session = _http_sessions[loop] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    return session
+
+
+async def close_llm_session():
+    """关闭当前事件循环的aiohttp会话（ASGI lifespan关闭时调用）"""
+    session = _http_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def get_recommendations(req):
+    """POST /api/ai/get-recommendations：等待大模型响应期间不占用线程"""
+    response, user_id = await req.call(_authorize, 'ai_llm')
+    if response is not None:
+        return await req.send(response)
+
+    slots = req.app.extensions['llm_async_limiter']
+    if slots.locked():
+        response, _ = await req.call(llm_busy_response)
+        return await req.send(response)
+    async with slots:
+        # 配置Redis时还需取得全局并发上限的租约（见 utils/rate_limit.RedisConcurrencyLimiter）
+        limiter = req.app.extensions['llm_limiter']
+        loop = asyncio.get_running_loop()
+        lease = await loop.run_in_executor(req.asgi.executor, limiter.acquire) if limiter.shared else True
+        if lease is None:
+            response, _ = await req.call(llm_busy_response)
+            return await req.send(response)
+        try:
+            response, prepared = await req.call(_prepare_recommendations, user_id)
+            if response is not None:
+                return await req.send(response)
+            date, schedule, all_tasks = prepared
+
+            import openai
+
+            openai.aiosession.set(await _llm_session())
+            recommendations = await ai_scheduler.scheduler.get_ai_recommendations(schedule, all_tasks, date)
+        finally:
+            if limiter.shared:
+                await loop.run_in_executor(req.asgi.executor, limiter.release, lease)
+
+    response, _ = await req.call(_recommendations_response, date, recommendations)
+    await req.send(response)
+
+
+def _long_poll_args():
+    """长轮询的参数 (用户ID, since, limit, wait, 轮询间隔)；不是长轮询请求（快照、SSE、wait=0）时返回None"""
+    verify_jwt_in_request()
+    args = tasks.parse_change_args()
+    if args is None:
+        return current_app.make_response((jsonify({"msg": "参数无效"}), 400))
+    since, wait, limit = args
+    if since is None or wait <= 0 or request.accept_mimetypes.best == 'text/event-stream':
+        return None
+    return get_jwt_identity(), since, limit, wait, current_app.config['CHANGES_POLL_INTERVAL']
+
+
+def _fetch_changes(user_id, since, limit, final):
+    """查询游标之后的变更，有变更或已到等待时限时返回响应"""
+    tasks.use_replica_for_reads()
+    changes = get_changes(user_id, since, limit)
+    if changes.cursor != since or final:
+        return current_app.make_response((jsonify(tasks.change_set_to_dict(changes)), 200))
+    return None
+
+
+async def get_task_changes(req):
+    """GET /api/tasks/changes?since=..&wait=..：长轮询在事件循环中等待，其他形式转交Flask"""
+    response, args = await req.call(_long_poll_args)
+    if response is not None:
+        return await req.send(response)
+    if args is None:
+        return await req.forward()
+
+    user_id, since, limit, wait, poll_interval = args
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        seen_version = notifier.version(user_id)
+        remaining = deadline - loop.time()
+        response, _ = await req.call(_fetch_changes, user_id, since, limit, remaining <= 0)
+        if response is not None:
+            return await req.send(response)
+        # 本进程的提交立即唤醒，其他worker的提交由轮询间隔兜底
+        await notifier.wait_async(user_id, seen_version, min(poll_interval, remaining))
+
+
+ROUTES = {
+    ('POST', '/api/ai/get-recommendations'): get_recommendations,
+    ('GET', '/api/tasks/changes'): get_task_changes,
+}
+
+
+def create_asgi_app(app):
+    """以ASGI方式运行的应用：ROUTES 中的路由原生处理，其余请求交给Flask"""
+    app.extensions['llm_async_limiter'] = asyncio.Semaphore(app.config['ASGI_LLM_MAX_CONCURRENCY'])
+    asgi_app = AsgiApp(app, ROUTES, app.config['ASGI_THREADS'])
+    asgi_app.shutdown_hooks.append(close_llm_session)
+    return asgi_app
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
+from sqlalchemy import or_
 from models.user import User
+from services.user_cache import get_login_user
+from services.passwords import verify_password, needs_rehash, PasswordVerifierBusy
+from services.plan_cache import warm_user_plans
 from app import db
 
 bp = Blueprint('auth', __name__)
@@ -14,12 +18,13 @@ def register():
     if not data or not 'username' in data or not 'email' in data or not 'password' in data:
         return jsonify({"msg": "缺少必要的注册信息"}), 400
     
-    # 检查用户名是否已存在
-    if User.query.filter_by(username=data['username']).first():
+    # 一次查询同时检查用户名和邮箱是否已存在
+    existing = User.query.with_entities(User.username, User.email).filter(
+        or_(User.username == data['username'], User.email == data['email'])
+    ).limit(2).all()
+    if any(row.username == data['username'] for row in existing):
         return jsonify({"msg": "用户名已存在"}), 400
-    
-    # 检查邮箱是否已存在
-    if User.query.filter_by(email=data['email']).first():
+    if existing:
         return jsonify({"msg": "邮箱已被注册"}), 400
     
     # 创建新用户
@@ -37,6 +42,16 @@ def register():
         db.session.rollback()
         return jsonify({"msg": "注册失败", "error": str(e)}), 500
 
+def rehash_password(user_id, password):
+    """使用当前哈希参数重新生成密码哈希，失败不影响本次登录"""
+    try:
+        db_user = User.query.get(user_id)
+        if db_user:
+            db_user.set_password(password)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+
 @bp.route('/login', methods=['POST'])
 def login():
     """用户登录"""
@@ -46,16 +61,29 @@ def login():
     if not data or not 'email' in data or not 'password' in data:
         return jsonify({"msg": "缺少必要的登录信息"}), 400
     
-    # 查找用户
-    user = User.query.filter_by(email=data['email']).first()
+    # 查找用户（密码哈希总是从数据库读取）
+    user = get_login_user(data['email'])
     
-    # 验证用户和密码
-    if not user or not user.check_password(data['password']):
+    # 验证用户和密码（在校验线程池中执行，繁忙时返回503）
+    if not user:
+        return jsonify({"msg": "邮箱或密码错误"}), 401
+    try:
+        password_valid = verify_password(user.password_hash, data['password'])
+    except PasswordVerifierBusy:
+        return jsonify({"msg": "登录请求过多，请稍后重试"}), 503, {"Retry-After": "1"}
+    if not password_valid:
         return jsonify({"msg": "邮箱或密码错误"}), 401
     
+    # 哈希参数已调整时透明地重新哈希
+    if needs_rehash(user.password_hash):
+        rehash_password(user.id, data['password'])
+    
     # 创建访问令牌
     access_token = create_access_token(identity=user.id)
     
+    # 在后台预热本周的日程，登录后首次查看日程时直接命中
+    warm_user_plans(user.id)
+    
     return jsonify({
         "access_token": access_token,
         "user": {
@@ -0,0 +1,48 @@
+from flask import Blueprint, Response, request, jsonify, current_app, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.calendar_feed import issue_token, revoke_token, resolve_token, feed_etag, get_feed
+from services.change_feed import data_version
+from utils.database import route_reads_to_replica
+from datetime import date
+
+bp = Blueprint('calendar', __name__)
+
+@bp.route('/<token>.ics', methods=['GET'])
+def get_calendar_feed(token):
+    """日历客户端订阅的ICS源（令牌即凭据，无需JWT）"""
+    route_reads_to_replica()
+    user_id = resolve_token(token)
+    if user_id is None:
+        return jsonify({"msg": "订阅链接无效"}), 404
+
+    # 只查数据版本即可判断客户端的缓存是否仍然有效
+    version = data_version(user_id)
+    etag = feed_etag(user_id, version, date.today())
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        feed = get_feed(user_id, version, current_app.config)
+        response = Response(feed.body, mimetype='text/calendar')
+        response.headers['Content-Disposition'] = 'inline; filename="tasks.ics"'
+        response.last_modified = feed.last_modified
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['CALENDAR_MAX_AGE']
+    return response
+
+@bp.route('/token', methods=['POST'])
+@jwt_required()
+def create_calendar_token():
+    """生成新的订阅链接，之前的链接随之失效"""
+    token = issue_token(get_jwt_identity())
+    return jsonify({
+        "token": token,
+        "url": url_for('calendar.get_calendar_feed', token=token, _external=True)
+    }), 201
+
+@bp.route('/token', methods=['DELETE'])
+@jwt_required()
+def delete_calendar_token():
+    """停用订阅链接"""
+    revoke_token(get_jwt_identity())
+    return jsonify({"msg": "订阅链接已停用"}), 200
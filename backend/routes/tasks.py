@@ -1,11 +1,53 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.task import RegularTask, DynamicTask, TaskType, RepeatType, PriorityType
 from app import db
-from datetime import datetime
+from services.change_feed import get_changes, get_snapshot, wait_for_changes
+from services.archive import get_history
+from services.conflicts import find_task_conflicts, find_all_conflicts
+from services import task_io
+from services.deadlines import bucket_for
+from utils.database import route_reads_to_replica
+from datetime import datetime, timedelta
+import re
+import sqlalchemy as sa
+import time
 
 bp = Blueprint('tasks', __name__)
 
+@bp.before_request
+def use_replica_for_reads():
+    """GET请求只读，查询发送到只读副本"""
+    if request.method == 'GET':
+        route_reads_to_replica()
+
+def regular_task_to_dict(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'task_type': task.task_type,
+        'location': task.location,
+        'start_time': task.start_time,
+        'end_time': task.end_time,
+        'repeat_type': task.repeat_type,
+        'repeat_details': task.repeat_details,
+        'created_at': task.created_at
+    }
+
+def dynamic_task_to_dict(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'priority': task.priority,
+        'estimated_time': task.estimated_time,
+        'deadline': task.deadline,
+        'tags': task.tags,
+        'is_completed': task.is_completed,
+        'created_at': task.created_at,
+        'updated_at': task.updated_at
+    }
+
 # 常规任务相关路由
 @bp.route('/regular', methods=['POST'])
 @jwt_required()
@@ -27,9 +69,13 @@ def create_regular_task():
         )
         
         db.session.add(task)
+        db.session.flush()
+        
+        # 检测与已有常规任务的时间冲突（不阻止创建，在响应中返回）
+        conflicts = find_task_conflicts(user_id, task)
         db.session.commit()
         
-        return jsonify({"msg": "常规任务创建成功", "task_id": task.id}), 201
+        return jsonify({"msg": "常规任务创建成功", "task_id": task.id, "conflicts": conflicts}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "创建任务失败", "error": str(e)}), 400
@@ -51,21 +97,10 @@ def get_regular_tasks():
     if end_date:
         query = query.filter(RegularTask.end_time <= datetime.fromisoformat(end_date))
     
-    tasks = query.all()
+    # 与增量同步（/changes）的全量结果使用相同排序
+    tasks = query.order_by(RegularTask.start_time, RegularTask.id).all()
     
-    result = []
-    for task in tasks:
-        result.append({
-            'id': task.id,
-            'title': task.title,
-            'task_type': task.task_type.value,
-            'location': task.location,
-            'start_time': task.start_time.isoformat(),
-            'end_time': task.end_time.isoformat(),
-            'repeat_type': task.repeat_type.value,
-            'repeat_details': task.repeat_details,
-            'created_at': task.created_at.isoformat()
-        })
+    result = [regular_task_to_dict(task) for task in tasks]
     
     return jsonify(result), 200
 
@@ -96,8 +131,9 @@ def update_regular_task(task_id):
         if 'repeat_details' in data:
             task.repeat_details = data['repeat_details']
         
+        conflicts = find_task_conflicts(user_id, task)
         db.session.commit()
-        return jsonify({"msg": "任务更新成功"}), 200
+        return jsonify({"msg": "任务更新成功", "conflicts": conflicts}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "更新任务失败", "error": str(e)}), 400
@@ -120,6 +156,29 @@ def delete_regular_task(task_id):
         db.session.rollback()
         return jsonify({"msg": "删除任务失败", "error": str(e)}), 400
 
+@bp.route('/conflicts', methods=['POST'])
+@jwt_required()
+def check_conflicts():
+    """一次找出日历中全部时间重叠的常规任务（start_date 默认今天，days 默认 CONFLICT_HORIZON_DAYS）"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    route_reads_to_replica()
+    
+    try:
+        start_day = datetime.strptime(data['start_date'], '%Y-%m-%d').date() if data.get('start_date') else datetime.now().date()
+        days = int(data.get('days', current_app.config['CONFLICT_HORIZON_DAYS']))
+    except (TypeError, ValueError):
+        return jsonify({"msg": "参数无效"}), 400
+    if days <= 0 or days > current_app.config['CONFLICT_MAX_DAYS']:
+        return jsonify({"msg": f"days 必须在1到{current_app.config['CONFLICT_MAX_DAYS']}之间"}), 400
+    
+    conflicts = find_all_conflicts(user_id, start_day, days)
+    return jsonify({
+        "start_date": start_day.isoformat(),
+        "days": days,
+        "conflicts": conflicts
+    }), 200
+
 # 动态任务相关路由
 @bp.route('/dynamic', methods=['POST'])
 @jwt_required()
@@ -167,7 +226,8 @@ def get_dynamic_tasks():
     
     # 排序
     if sort_by == 'deadline':
-        query = query.order_by(DynamicTask.deadline.asc() if DynamicTask.deadline is not None else db.nullslast)
+        # 没有截止时间的任务排在最后
+        query = query.order_by(DynamicTask.deadline.asc().nullslast(), DynamicTask.id)
     elif sort_by == 'priority':
         query = query.order_by(DynamicTask.priority)
     elif sort_by == 'created_at':
@@ -175,20 +235,48 @@ def get_dynamic_tasks():
     
     tasks = query.all()
     
+    result = [dynamic_task_to_dict(task) for task in tasks]
+    
+    return jsonify(result), 200
+
+WITHIN_PATTERN = re.compile(r'^(\d+)([hd]?)$')
+
+@bp.route('/dynamic/due', methods=['GET'])
+@jwt_required()
+def get_due_dynamic_tasks():
+    """获取即将到期（含已过期）的未完成动态任务，按截止时间排序
+
+    within 为时间范围，如 24h、3d（不带单位时为天数），默认7d；每个任务附带到期档位 due_bucket。
+    """
+    user_id = get_jwt_identity()
+    
+    match = WITHIN_PATTERN.match(request.args.get('within', '7d'))
+    if not match:
+        return jsonify({"msg": "within 格式无效，例如 24h 或 3d"}), 400
+    within = timedelta(hours=int(match.group(1))) if match.group(2) == 'h' else timedelta(days=int(match.group(1)))
+    if within > timedelta(days=current_app.config['DUE_MAX_DAYS']):
+        return jsonify({"msg": f"within 不能超过{current_app.config['DUE_MAX_DAYS']}天"}), 400
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({"msg": "limit 无效"}), 400
+    if not 1 <= limit <= current_app.config['DUE_MAX_LIMIT']:
+        return jsonify({"msg": f"limit 必须在1到{current_app.config['DUE_MAX_LIMIT']}之间"}), 400
+    
+    # 按 (user_id, is_completed, deadline) 索引范围扫描，不读取没有截止时间或较晚到期的任务
+    now = datetime.now()
+    tasks = DynamicTask.query.filter(
+        DynamicTask.user_id == user_id,
+        DynamicTask.is_completed == sa.false(),
+        DynamicTask.deadline <= now + within
+    ).order_by(DynamicTask.deadline, DynamicTask.id).limit(limit).all()
+    
+    today = datetime.combine(now.date(), datetime.min.time())
     result = []
     for task in tasks:
-        result.append({
-            'id': task.id,
-            'title': task.title,
-            'description': task.description,
-            'priority': task.priority.value,
-            'estimated_time': task.estimated_time,
-            'deadline': task.deadline.isoformat() if task.deadline else None,
-            'tags': task.tags,
-            'is_completed': task.is_completed,
-            'created_at': task.created_at.isoformat(),
-            'updated_at': task.updated_at.isoformat()
-        })
+        item = dynamic_task_to_dict(task)
+        item['due_bucket'] = 'overdue' if task.deadline < now else (bucket_for(task.deadline, today) or 'later')
+        result.append(item)
     
     return jsonify(result), 200
 
@@ -292,4 +380,175 @@ def batch_create_dynamic_tasks():
         return jsonify({"msg": "批量创建成功", "created_ids": created_tasks}), 201
     except Exception as e:
         db.session.rollback()
-        return jsonify({"msg": "批量创建失败", "error": str(e)}), 400
\ No newline at end of file
+        return jsonify({"msg": "批量创建失败", "error": str(e)}), 400
+
+# 增量同步
+def change_set_to_dict(changes, full=False):
+    return {
+        'cursor': changes.cursor,
+        'has_more': changes.has_more,
+        'full': full,
+        'regular': {
+            'updated': [regular_task_to_dict(task) for task in changes.regular],
+            'deleted': changes.deleted_regular
+        },
+        'dynamic': {
+            'updated': [dynamic_task_to_dict(task) for task in changes.dynamic],
+            'deleted': changes.deleted_dynamic
+        }
+    }
+
+def parse_change_args():
+    """解析增量同步的 (since, wait, limit) 参数，无效时返回None"""
+    config = current_app.config
+    since = request.args.get('since') or request.headers.get('Last-Event-ID')
+    try:
+        since = int(since) if since is not None else None
+        wait = min(float(request.args.get('wait', 0)), config['CHANGES_MAX_WAIT'])
+        limit = min(int(request.args.get('limit', config['CHANGES_PAGE_SIZE'])), config['CHANGES_PAGE_SIZE'])
+    except ValueError:
+        return None
+    if limit <= 0:
+        return None
+    return since, wait, limit
+
+@bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_task_changes():
+    """获取游标之后新增、修改和删除的任务
+    
+    不带 since 时返回全部任务（full=true）及当前游标；wait>0 时长轮询，没有变更时最多等待wait秒；
+    Accept: text/event-stream 时以SSE持续推送，断线重连时从 Last-Event-ID 继续。
+    """
+    user_id = get_jwt_identity()
+    config = current_app.config
+    
+    args = parse_change_args()
+    if args is None:
+        return jsonify({"msg": "参数无效"}), 400
+    since, wait, limit = args
+    
+    if request.accept_mimetypes.best == 'text/event-stream':
+        return stream_task_changes(user_id, since, limit)
+    
+    if since is None:
+        return jsonify(change_set_to_dict(get_snapshot(user_id), full=True)), 200
+    if wait > 0:
+        changes = wait_for_changes(user_id, since, limit, wait, config['CHANGES_POLL_INTERVAL'])
+    else:
+        changes = get_changes(user_id, since, limit)
+    return jsonify(change_set_to_dict(changes)), 200
+
+def stream_task_changes(user_id, since, limit):
+    """以SSE推送变更；连接保持 CHANGES_STREAM_SECONDS 后关闭，由客户端自动重连"""
+    config = current_app.config
+    
+    def events():
+        cursor = since
+        deadline = time.monotonic() + config['CHANGES_STREAM_SECONDS']
+        yield f"retry: {config['CHANGES_STREAM_RETRY_MS']}\n\n"
+        if cursor is None:
+            changes = get_snapshot(user_id)
+            cursor = changes.cursor
+            yield f"id: {cursor}\ndata: {current_app.json.dumps(change_set_to_dict(changes, full=True))}\n\n"
+        while time.monotonic() < deadline:
+            wait = min(config['CHANGES_MAX_WAIT'], deadline - time.monotonic())
+            changes = wait_for_changes(user_id, cursor, limit, wait, config['CHANGES_POLL_INTERVAL'])
+            db.session.close()
+            if changes.cursor == cursor:
+                # 心跳，避免代理关闭空闲连接
+                yield ": keepalive\n\n"
+                continue
+            cursor = changes.cursor
+            yield f"id: {cursor}\ndata: {current_app.json.dumps(change_set_to_dict(changes))}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# 归档任务
+@bp.route('/history', methods=['GET'])
+@jwt_required()
+def get_task_history():
+    """获取已归档的任务（type: regular/dynamic，start_month/end_month: YYYY-MM）"""
+    user_id = get_jwt_identity()
+    
+    kind = request.args.get('type', 'dynamic')
+    if kind not in ('regular', 'dynamic'):
+        return jsonify({"msg": "type参数无效"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 100)), current_app.config['ARCHIVE_PAGE_SIZE'])
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"msg": "参数无效"}), 400
+    
+    tasks = get_history(user_id, kind, request.args.get('start_month'), request.args.get('end_month'), limit, offset)
+    to_dict = regular_task_to_dict if kind == 'regular' else dynamic_task_to_dict
+    result = [{**to_dict(task), 'archived_at': task.archived_at} for task in tasks]
+    
+    return jsonify(result), 200
+
+# 批量导入导出
+def _requested_format(filename=None):
+    fmt = request.args.get('format')
+    if not fmt and filename and '.' in filename:
+        fmt = filename.rsplit('.', 1)[1]
+    if not fmt and 'parquet' in (request.mimetype or ''):
+        fmt = 'parquet'
+    return (fmt or 'csv').lower()
+
+@bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_tasks():
+    """从CSV或Parquet文件批量导入任务（type: regular/dynamic，dry_run=true 时只校验）
+    
+    文件可以放在multipart的file字段中，也可以直接作为请求体。
+    """
+    user_id = get_jwt_identity()
+    config = current_app.config
+    
+    kind = request.args.get('type', 'regular')
+    if kind not in task_io.MODELS:
+        return jsonify({"msg": "type参数无效"}), 400
+    if request.content_length and request.content_length > config['IMPORT_MAX_BYTES']:
+        return jsonify({"msg": "文件过大"}), 413
+    
+    upload = request.files.get('file')
+    fmt = _requested_format(upload.filename if upload else None)
+    if fmt not in task_io.FORMATS:
+        return jsonify({"msg": "仅支持 csv 或 parquet 格式"}), 400
+    if fmt == 'parquet' and not task_io.parquet_available():
+        return jsonify({"msg": "服务器未安装pyarrow，不支持Parquet"}), 415
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    
+    fileobj = upload.stream if upload else task_io.spool(request.stream, config['IMPORT_SPOOL_BYTES'])
+    try:
+        result = task_io.import_tasks(user_id, kind, fileobj, fmt, dry_run, config)
+    except Exception as e:
+        return jsonify({"msg": "导入失败，无法读取文件", "error": str(e)}), 400
+    
+    return jsonify(result.to_dict()), (400 if result.error_count else 200)
+
+@bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_tasks():
+    """导出任务为CSV（流式）或Parquet（type: regular/dynamic，format: csv/parquet）"""
+    user_id = get_jwt_identity()
+    config = current_app.config
+    
+    kind = request.args.get('type', 'regular')
+    if kind not in task_io.MODELS:
+        return jsonify({"msg": "type参数无效"}), 400
+    fmt = _requested_format()
+    if fmt not in task_io.FORMATS:
+        return jsonify({"msg": "仅支持 csv 或 parquet 格式"}), 400
+    
+    filename = f"tasks-{kind}.{fmt}"
+    if fmt == 'parquet':
+        if not task_io.parquet_available():
+            return jsonify({"msg": "服务器未安装pyarrow，不支持Parquet"}), 415
+        buffer = task_io.export_parquet(user_id, kind, config['EXPORT_CHUNK_SIZE'], config['IMPORT_SPOOL_BYTES'])
+        return send_file(buffer, mimetype='application/vnd.apache.parquet', as_attachment=True, download_name=filename)
+    
+    return Response(stream_with_context(task_io.export_csv(user_id, kind, config['EXPORT_CHUNK_SIZE'])),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
@@ -2,22 +2,27 @@ import os
 import json
 import openai
 import logging
+import math
+from array import array
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import pytz
 
+from services.deadlines import DeadlineIndex
+
 # 加载环境变量
 load_dotenv()
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# 日志输出由应用统一配置（utils/log.py）
 logger = logging.getLogger(__name__)
 
 # 配置OpenAI API
 openai.api_key = os.getenv('OPENAI_API_KEY')
+# 可指向兼容OpenAI的代理或本地替身（压测时使用）
+if os.getenv('OPENAI_API_BASE'):
+    openai.api_base = os.getenv('OPENAI_API_BASE')
 
 # 时区设置
 DEFAULT_TIMEZONE = pytz.timezone('Asia/Shanghai')
@@ -37,13 +42,116 @@ class Task(BaseModel):
     created_at: Optional[str] = Field(None, description="任务创建时间")
     completed_at: Optional[str] = Field(None, description="任务完成时间")
 
-class ScheduleItem(BaseModel):
-    task_id: int
-    title: str
-    start_time: str
-    end_time: str
-    priority_score: float
-    confidence: float
+class ScheduleItem:
+    """日程项
+
+    一周、多方案的日程会产生大量日程项，因此使用 __slots__ 记录而不是pydantic模型；
+    字段及其类型与原模型一致，dict() 兼容原有的调用方式。
+    """
+
+    __slots__ = ('task_id', 'title', 'start_time', 'end_time', 'priority_score', 'confidence')
+
+    def __init__(self, task_id: int, title: str, start_time: str, end_time: str,
+                 priority_score: float, confidence: float):
+        self.task_id = int(task_id)
+        self.title = title
+        self.start_time = start_time
+        self.end_time = end_time
+        self.priority_score = float(priority_score)
+        self.confidence = float(confidence)
+
+    def dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other):
+        if not isinstance(other, ScheduleItem):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"ScheduleItem({', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)})"
+
+
+class FreeSlots:
+    """一天内的可用时间槽：开始、结束为距当天零点的分钟数，分别存放在两个整数数组中"""
+
+    __slots__ = ('day', 'starts', 'ends')
+
+    def __init__(self, day: datetime):
+        self.day = day
+        self.starts = array('i')
+        self.ends = array('i')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, start: int, end: int):
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """原有的字典形式：{"start", "end", "duration", "available_for"}"""
+        return [{
+            "start": _format_offset(self.day, start),
+            "end": _format_offset(self.day, end),
+            "duration": float(end - start),
+            "available_for": "dynamic_tasks"
+        } for start, end in zip(self.starts, self.ends)]
+
+
+class _SlotTree:
+    """时间槽剩余时长的最大值线段树（数组存储），用于 O(log n) 的首次适配"""
+
+    __slots__ = ('size', 'tree')
+
+    def __init__(self, durations):
+        size = 1
+        while size < len(durations):
+            size *= 2
+        tree = array('i', bytes(2 * size * array('i').itemsize))
+        tree[size:size + len(durations)] = array('i', durations)
+        for i in range(size - 1, 0, -1):
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+        self.size = size
+        self.tree = tree
+
+    def first_fit(self, duration: int) -> int:
+        """剩余时长不小于 duration 的第一个时间槽的下标，没有时返回-1"""
+        tree = self.tree
+        if tree[1] < duration:
+            return -1
+        i = 1
+        while i < self.size:
+            i = 2 * i if tree[2 * i] >= duration else 2 * i + 1
+        return i - self.size
+
+    def update(self, index: int, duration: int):
+        tree = self.tree
+        i = index + self.size
+        tree[i] = duration
+        i //= 2
+        while i:
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+            i //= 2
+
+
+def _format_offset(day: datetime, minutes: int) -> str:
+    return (day + timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _busy_interval(task: Task) -> Optional[tuple]:
+    """常规任务投影到当天的忙碌区间 (开始分钟, 结束分钟)，时间无效时返回None"""
+    if not (task.start_time and task.end_time):
+        return None
+    try:
+        start = datetime.fromisoformat(task.start_time)
+        end = datetime.fromisoformat(task.end_time)
+    except ValueError as e:
+        logger.warning("无效的时间格式: 任务'%s', 错误: %s", task.title, e)
+        return None
+    offset = start.hour * 60 + start.minute
+    # 不足一分钟的部分向外取整，忙碌区间只会变大
+    return offset, offset + math.ceil((end - start).total_seconds() / 60 + start.second / 60)
 
 class AIScheduler:
     def __init__(self):
@@ -56,15 +164,11 @@ class AIScheduler:
         self.temperature = 0.3
         self.timeout = 10  # API调用超时时间（秒）
         
-    def calculate_priority_score(self, task: Task, date: str) -> float:
-        """计算任务优先级分数"""
+    def calculate_priority_score(self, task: Task, date: str, deadline_bonus: Optional[float] = None) -> float:
+        """计算任务优先级分数（deadline_bonus 为 DeadlineIndex 预先分档得到的截止时间加分）"""
         try:
             score = 0.0
             
-            # 解析日期并添加时区
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            date_obj = DEFAULT_TIMEZONE.localize(date_obj)
-            
             # 已完成任务分数为0
             if task.completed:
                 return 0.0
@@ -83,8 +187,14 @@ class AIScheduler:
                 score += 80
             
             # 截止时间权重
-            if task.deadline:
+            if deadline_bonus is not None:
+                score += deadline_bonus
+            elif task.deadline:
                 try:
+                    # 解析日期并添加时区
+                    date_obj = datetime.strptime(date, "%Y-%m-%d")
+                    date_obj = DEFAULT_TIMEZONE.localize(date_obj)
+                    
                     # 处理不同格式的截止时间
                     if 'T' in task.deadline:
                         deadline_obj = datetime.strptime(task.deadline, "%Y-%m-%dT%H:%M:%S")
@@ -106,7 +216,7 @@ class AIScheduler:
                     elif days_until_deadline <= 7:
                         score += 20   # 一周内到期
                 except ValueError as e:
-                    logger.warning(f"无效的截止时间格式: {task.deadline}, 错误: {e}")
+                    logger.warning("无效的截止时间格式: %s, 错误: %s", task.deadline, e)
             
             # 任务耗时权重
             if task.estimated_time:
@@ -126,85 +236,68 @@ class AIScheduler:
                         score += 15
                         break
             
-            logger.debug(f"任务 '{task.title}' 优先级分数: {score:.2f}")
             return score
         except Exception as e:
-            logger.error(f"计算任务优先级失败: {e}")
+            logger.error("计算任务优先级失败: %s", e)
             return 0.0
     
+    def free_slots(self, regular_tasks: List[Task], date: str,
+                   min_duration: int = 30,
+                   working_hours_start: int = 9,
+                   working_hours_end: int = 22,
+                   availability=None) -> "FreeSlots":
+        """找出指定日期的可用时间槽，以距当天零点的分钟数表示
+
+        availability（services.availability.Availability）给出时，按用户当天的可用时间窗口、
+        不可用日期和最短时间槽计算，忽略固定的工作时间参数。重复任务按其时刻投影到当天。
+        """
+        day = datetime.strptime(date, "%Y-%m-%d")
+        slots = FreeSlots(day)
+
+        # 当天的可用时间窗口（分钟偏移）
+        if availability is not None:
+            if day.date() in availability.blackout_dates:
+                return slots
+            windows = availability.windows[day.weekday()]
+            min_duration = availability.min_duration
+        else:
+            windows = ((working_hours_start * 60, working_hours_end * 60),)
+
+        # 当天常规任务的忙碌区间（分钟偏移），按开始时间排序
+        busy = []
+        for task in regular_tasks:
+            if task.type == "regular" and not task.completed and self._is_task_on_date(task, date):
+                interval = _busy_interval(task)
+                if interval is not None:
+                    busy.append(interval)
+        busy.sort()
+
+        for window_start, window_end in windows:
+            current = window_start
+            # 检查每个常规任务之间的空隙（空隙不超出工作时间）
+            for start, end in busy:
+                if start >= window_end:
+                    break
+                if start - current >= min_duration:
+                    slots.append(current, start)
+                current = max(current, end)
+            # 检查最后一个任务到工作结束时间的空隙
+            if window_end - current >= min_duration:
+                slots.append(current, window_end)
+        return slots
+
     def find_available_time_slots(self, regular_tasks: List[Task], date: str, 
                                 min_duration: int = 30, 
                                 working_hours_start: int = 9, 
-                                working_hours_end: int = 22) -> List[Dict[str, Any]]:
-        """找出指定日期的可用时间槽"""
+                                working_hours_end: int = 22,
+                                availability=None) -> List[Dict[str, Any]]:
+        """找出指定日期的可用时间槽（字典形式，参数同 free_slots）"""
         try:
-            # 解析日期并添加时区
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            date_obj = DEFAULT_TIMEZONE.localize(date_obj)
-            
-            # 获取当天的常规任务
-            day_tasks = []
-            for task in regular_tasks:
-                if task.type == "regular" and not task.completed and self._is_task_on_date(task, date):
-                    if task.start_time and task.end_time:
-                        try:
-                            start_dt = datetime.strptime(task.start_time, "%Y-%m-%dT%H:%M:%S")
-                            end_dt = datetime.strptime(task.end_time, "%Y-%m-%dT%H:%M:%S")
-                            
-                            # 添加时区信息
-                            if start_dt.tzinfo is None:
-                                start_dt = DEFAULT_TIMEZONE.localize(start_dt)
-                            if end_dt.tzinfo is None:
-                                end_dt = DEFAULT_TIMEZONE.localize(end_dt)
-                            
-                            day_tasks.append({
-                                "start": start_dt,
-                                "end": end_dt,
-                                "title": task.title,
-                                "id": task.id
-                            })
-                        except ValueError as e:
-                            logger.warning(f"无效的时间格式: 任务'{task.title}', 错误: {e}")
-            
-            # 按开始时间排序
-            day_tasks.sort(key=lambda x: x["start"])
-            
-            # 定义工作时间范围
-            work_start = DEFAULT_TIMEZONE.localize(datetime(date_obj.year, date_obj.month, date_obj.day, working_hours_start, 0))
-            work_end = DEFAULT_TIMEZONE.localize(datetime(date_obj.year, date_obj.month, date_obj.day, working_hours_end, 0))
-            
-            available_slots = []
-            current_time = work_start
-            
-            # 检查每个常规任务之间的空隙
-            for task in day_tasks:
-                if task["start"] > current_time:
-                    # 计算空隙持续时间（分钟）
-                    gap_duration = (task["start"] - current_time).total_seconds() / 60
-                    if gap_duration >= min_duration:
-                        available_slots.append({
-                            "start": current_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                            "end": task["start"].strftime("%Y-%m-%dT%H:%M:%S"),
-                            "duration": gap_duration,
-                            "available_for": "dynamic_tasks"
-                        })
-                current_time = max(current_time, task["end"])
-            
-            # 检查最后一个任务到工作结束时间的空隙
-            if work_end > current_time:
-                gap_duration = (work_end - current_time).total_seconds() / 60
-                if gap_duration >= min_duration:
-                    available_slots.append({
-                        "start": current_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                        "end": work_end.strftime("%Y-%m-%dT%H:%M:%S"),
-                        "duration": gap_duration,
-                        "available_for": "dynamic_tasks"
-                    })
-            
-            logger.info(f"为日期 {date} 找到 {len(available_slots)} 个可用时间槽")
+            available_slots = self.free_slots(regular_tasks, date, min_duration, working_hours_start,
+                                              working_hours_end, availability).to_dicts()
             return available_slots
         except Exception as e:
-            logger.error(f"查找可用时间槽失败: {e}")
+            logger.error("查找可用时间槽失败: %s", e)
             return []
     
     def _is_task_on_date(self, task: Task, date: str) -> bool:
@@ -222,25 +315,41 @@ class AIScheduler:
         
         return False
     
-    def generate_daily_schedule(self, regular_tasks: List[Task], 
-                              dynamic_tasks: List[Task], 
-                              date: str) -> List[ScheduleItem]:
-        """生成每日日程表"""
+    def score_tasks(self, dynamic_tasks: List[Task], date: str,
+                    deadlines: Optional[DeadlineIndex] = None) -> List[tuple]:
+        """计算未完成动态任务的优先级分数，按分数从高到低排序
+
+        deadlines 为这组任务的截止时间索引，生成多天日程时传入同一个索引以免重复解析。
+        """
         # 过滤出未完成的动态任务
         pending_dynamic_tasks = [task for task in dynamic_tasks 
                                 if not task.completed and task.type == "dynamic"]
         
-        # 计算优先级分数
-        tasks_with_score = [(task, self.calculate_priority_score(task, date)) 
+        # 计算优先级分数（截止时间加分由索引按档位一次得到）
+        if deadlines is None:
+            deadlines = DeadlineIndex(pending_dynamic_tasks)
+        bonuses = deadlines.bonuses(date)
+        tasks_with_score = [(task, self.calculate_priority_score(task, date, bonuses.get(task.id, 0))) 
                           for task in pending_dynamic_tasks]
         
         # 按优先级排序
         tasks_with_score.sort(key=lambda x: x[1], reverse=True)
-        
-        # 找出可用时间槽
-        available_slots = self.find_available_time_slots(regular_tasks, date)
-        
-        # 安排任务
+        if logger.isEnabledFor(logging.DEBUG):
+            # 每次打分只记一条汇总，未开启DEBUG时不遍历任务
+            logger.debug("日期 %s 共 %d 个待安排任务，最高分: %s", date, len(tasks_with_score),
+                         [(task.id, round(score, 2)) for task, score in tasks_with_score[:5]])
+        return tasks_with_score
+    
+    def place_tasks(self, tasks_with_score: List[tuple], 
+                    available_slots: "FreeSlots") -> List[ScheduleItem]:
+        """按分数顺序将动态任务放入第一个足够长的时间槽（不修改传入的时间槽）
+
+        各时间槽的剩余时长保存在线段树中，每个任务 O(log n) 找到第一个放得下的时间槽。
+        """
+        starts = array('i', available_slots.starts)
+        ends = available_slots.ends
+        remaining = _SlotTree([end - start for start, end in zip(starts, ends)])
+        day = available_slots.day
         schedule = []
         
         for task, score in tasks_with_score:
@@ -248,55 +357,65 @@ class AIScheduler:
             if not task.estimated_time:
                 continue
             
-            # 尝试找到合适的时间槽
-            for slot_idx, slot in enumerate(available_slots):
-                slot_duration = slot["duration"]
-                
-                # 检查是否能放入此时间槽
-                if slot_duration >= task.estimated_time:
-                    # 安排任务在时间槽的开始
-                    start_time = datetime.strptime(slot["start"], "%Y-%m-%dT%H:%M:%S")
-                    end_time = start_time + timedelta(minutes=task.estimated_time)
-                    
-                    # 添加到日程
-                    schedule.append(ScheduleItem(
-                        task_id=task.id,
-                        title=task.title,
-                        start_time=start_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                        end_time=end_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                        priority_score=score,
-                        confidence=min(1.0, score / 300)  # 归一化置信度
-                    ))
-                    
-                    # 更新可用时间槽
-                    if end_time < datetime.strptime(slot["end"], "%Y-%m-%dT%H:%M:%S"):
-                        # 时间槽分割为两部分
-                        new_slot = {
-                            "start": end_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                            "end": slot["end"],
-                            "duration": slot_duration - task.estimated_time
-                        }
-                        available_slots[slot_idx] = new_slot
-                    else:
-                        # 时间槽完全占用，移除
-                        available_slots.pop(slot_idx)
-                    
-                    break
-        
-        # 合并常规任务到最终日程
-        all_tasks = schedule.copy()
+            slot_idx = remaining.first_fit(task.estimated_time)
+            if slot_idx < 0:
+                continue
+            
+            # 安排任务在时间槽的开始，时间槽剩余部分从任务结束时开始
+            start = starts[slot_idx]
+            end = start + task.estimated_time
+            starts[slot_idx] = end
+            remaining.update(slot_idx, ends[slot_idx] - end)
+            
+            schedule.append(ScheduleItem(
+                task_id=task.id,
+                title=task.title,
+                start_time=_format_offset(day, start),
+                end_time=_format_offset(day, end),
+                priority_score=score,
+                confidence=min(1.0, score / 300)  # 归一化置信度
+            ))
         
-        # 添加常规任务
+        return schedule
+    
+    def regular_schedule_items(self, regular_tasks: List[Task], date: str) -> List[ScheduleItem]:
+        """当天发生的常规任务（重复任务的时刻投影到当天）"""
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        items = []
         for task in regular_tasks:
-            if self._is_task_on_date(task, date) and task.start_time and task.end_time:
-                all_tasks.append(ScheduleItem(
-                    task_id=task.id,
-                    title=task.title,
-                    start_time=task.start_time,
-                    end_time=task.end_time,
-                    priority_score=1000,  # 常规任务优先级最高
-                    confidence=1.0
-                ))
+            if not (self._is_task_on_date(task, date) and task.start_time and task.end_time):
+                continue
+            try:
+                start = datetime.fromisoformat(task.start_time)
+                end = datetime.fromisoformat(task.end_time)
+            except ValueError:
+                continue
+            projected = datetime.combine(day, start.time())
+            items.append(ScheduleItem(
+                task_id=task.id,
+                title=task.title,
+                start_time=projected.strftime("%Y-%m-%dT%H:%M:%S"),
+                end_time=(projected + (end - start)).strftime("%Y-%m-%dT%H:%M:%S"),
+                priority_score=1000,  # 常规任务优先级最高
+                confidence=1.0
+            ))
+        return items
+    
+    def generate_daily_schedule(self, regular_tasks: List[Task], 
+                              dynamic_tasks: List[Task], 
+                              date: str, availability=None,
+                              deadlines: Optional[DeadlineIndex] = None) -> List[ScheduleItem]:
+        """生成每日日程表（availability 为用户的可用性配置，省略时使用默认工作时间）"""
+        tasks_with_score = self.score_tasks(dynamic_tasks, date, deadlines)
+        
+        # 找出可用时间槽
+        available_slots = self.free_slots(regular_tasks, date, availability=availability)
+        
+        # 安排任务
+        schedule = self.place_tasks(tasks_with_score, available_slots)
+        
+        # 合并常规任务到最终日程
+        all_tasks = schedule + self.regular_schedule_items(regular_tasks, date)
         
         # 按开始时间排序
         all_tasks.sort(key=lambda x: x.start_time)
@@ -361,9 +480,9 @@ class AIScheduler:
             回答请保持简洁明了，建议要具体可行。
             """
             
-            # 调用OpenAI API，添加超时处理
+            # 调用OpenAI API，添加超时处理（异步客户端，等待响应期间不占用线程）
             try:
-                response = openai.ChatCompletion.create(
+                response = await openai.ChatCompletion.acreate(
                     model=self.model,
                     messages=[
                         {"role": "system", "content": "你是一位专业的日程规划和时间管理专家。请直接提供建议，不要添加额外的开场白和结束语。"},
@@ -371,13 +490,14 @@ class AIScheduler:
                     ],
                     temperature=self.temperature,
                     max_tokens=800,
-                    timeout=self.timeout
+                    timeout=self.timeout,
+                    request_timeout=self.timeout
                 )
                 
                 # 解析响应
                 recommendations = response.choices[0].message.content.strip()
                 
-                logger.info(f"成功获取AI日程建议")
+                logger.info("成功获取AI日程建议")
                 return {
                     "success": True,
                     "recommendations": recommendations,
@@ -385,7 +505,7 @@ class AIScheduler:
                 }
                 
             except (openai.error.OpenAIError, TimeoutError) as api_error:
-                logger.error(f"OpenAI API调用失败: {api_error}")
+                logger.error("OpenAI API调用失败: %s", api_error)
                 return {
                     "success": False,
                     "error": str(api_error),
@@ -394,7 +514,7 @@ class AIScheduler:
                 }
                 
         except Exception as e:
-            logger.error(f"获取AI建议过程中发生错误: {e}")
+            logger.error("获取AI建议过程中发生错误: %s", e)
             return {
                 "success": False,
                 "error": str(e),
@@ -475,7 +595,7 @@ class AIScheduler:
                             hours_taken = (completed_dt - created_dt).total_seconds() / 3600
                             completion_times.append(hours_taken)
                     except Exception as e:
-                        logger.warning(f"解析任务时间失败: {e}")
+                        logger.warning("解析任务时间失败: %s", e)
             
             if completion_times:
                 avg_time = sum(completion_times) / len(completion_times)
@@ -503,7 +623,7 @@ class AIScheduler:
                         weekday_cn = weekday_map.get(weekday, weekday)
                         stats["weekly_pattern"][weekday_cn] = stats["weekly_pattern"].get(weekday_cn, 0) + 1
                     except Exception as e:
-                        logger.warning(f"解析任务时间失败: {e}")
+                        logger.warning("解析任务时间失败: %s", e)
             
             # 生成洞察
             if stats["completion_rate"] >= 80:
@@ -526,10 +646,10 @@ class AIScheduler:
             stats["suggestions"].append("建议定期回顾任务完成情况，调整工作计划")
             stats["suggestions"].append("在任务之间安排适当休息，保持长期工作效率")
             
-            logger.info(f"完成工作模式分析，分析了{len(recent_tasks)}个任务")
+            logger.info("完成工作模式分析，分析了%d个任务", len(recent_tasks))
             return stats
         except Exception as e:
-            logger.error(f"分析工作模式失败: {e}")
+            logger.error("分析工作模式失败: %s", e)
             return {
                 "error": str(e),
                 "message": "工作模式分析失败，请稍后重试",
@@ -0,0 +1,97 @@
+"""任务归档
+
+已完成超过 ARCHIVE_AFTER_DAYS 天的动态任务和已结束超过该天数的单次常规任务移入归档表，
+热表只保留仍可能参与调度的任务。归档表按完成/结束时间所在月份（archive_month）分区，
+历史查询按 (user_id, archive_month) 索引读取。归档会为每个任务写入删除墓碑，增量同步的客户端随之移除。
+
+    cd backend && PYTHONPATH=. flask --app main archive-tasks --days 30
+"""
+import logging
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app import db
+from models.archive import ArchivedRegularTask, ArchivedDynamicTask
+from models.task import RegularTask, DynamicTask, RepeatType
+from services.change_feed import record_changes
+
+logger = logging.getLogger(__name__)
+
+# 任务类别 -> (热表模型, 归档模型, 归档条件使用的时间列)
+ARCHIVE_KINDS = {
+    'regular': (RegularTask, ArchivedRegularTask, RegularTask.end_time),
+    'dynamic': (DynamicTask, ArchivedDynamicTask, DynamicTask.updated_at),
+}
+
+
+def _archive_criteria(kind, cutoff):
+    if kind == 'regular':
+        return sa.and_(RegularTask.repeat_type == RepeatType.SINGLE, RegularTask.end_time < cutoff)
+    return sa.and_(DynamicTask.is_completed.is_(True), DynamicTask.updated_at < cutoff)
+
+
+def _archive_batch(kind, cutoff, batch_size):
+    """归档一批任务并提交，返回归档的数量"""
+    model, archive_model, time_column = ARCHIVE_KINDS[kind]
+    columns = [column.key for column in model.__table__.columns]
+    rows = db.session.execute(
+        sa.select(*model.__table__.columns)
+        .where(_archive_criteria(kind, cutoff))
+        .order_by(model.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    db.session.execute(sa.insert(archive_model), [
+        {**{column: getattr(row, column) for column in columns},
+         "archive_month": getattr(row, time_column.key).strftime('%Y-%m'),
+         "archived_at": now}
+        for row in rows
+    ])
+    db.session.execute(sa.delete(model).where(model.id.in_([row.id for row in rows])))
+    record_changes(db.session, [(row.user_id, kind, row.id, True) for row in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def archive_tasks(days, batch_size=None):
+    """归档超过days天的任务，返回 {任务类别: 归档数量}"""
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    counts = {}
+    for kind in ARCHIVE_KINDS:
+        counts[kind] = 0
+        while True:
+            archived = _archive_batch(kind, cutoff, batch_size)
+            counts[kind] += archived
+            if archived < batch_size:
+                break
+    logger.info("任务归档完成: %s", counts)
+    return counts
+
+
+def get_history(user_id, kind, start_month=None, end_month=None, limit=100, offset=0):
+    """读取归档任务，按归档月份和任务ID倒序；月份格式为YYYY-MM"""
+    archive_model = ARCHIVE_KINDS[kind][1]
+    query = archive_model.query.filter(archive_model.user_id == user_id)
+    if start_month:
+        query = query.filter(archive_model.archive_month >= start_month)
+    if end_month:
+        query = query.filter(archive_model.archive_month <= end_month)
+    return query.order_by(archive_model.archive_month.desc(), archive_model.id.desc()) \
+        .offset(offset).limit(limit).all()
+
+
+@click.command('archive-tasks')
+@with_appcontext
+@click.option('--days', default=None, type=int, help='归档超过该天数的任务（默认 ARCHIVE_AFTER_DAYS）')
+def archive_tasks_command(days):
+    """将已完成和已过期的任务移入归档表"""
+    counts = archive_tasks(days or current_app.config['ARCHIVE_AFTER_DAYS'])
+    click.echo(f"已归档 {counts['regular']} 个常规任务、{counts['dynamic']} 个动态任务")
@@ -0,0 +1,224 @@
+"""用户可安排时间（可用性配置）
+
+每周七天各96个15分钟时间块存为一个84字节的位图，午休等休息时间即为未置位的时间块；
+另有不可用日期（整天不安排）和最短时间槽。读取时位图一次性展开为每天的可用时间窗口
+（分钟偏移的区间列表），按用户缓存，调度器查找空闲时间时直接使用，与固定工作时间的开销相同。
+没有配置的用户使用默认的 9:00-22:00、最短30分钟。
+"""
+from collections import namedtuple
+from datetime import date
+
+from sqlalchemy import event
+
+from app import db
+from models.availability import AvailabilityProfile
+from utils.cache import LRUCache
+
+BLOCK_MINUTES = 15
+BLOCKS_PER_DAY = 24 * 60 // BLOCK_MINUTES
+WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MAX_BLACKOUT_DATES = 366
+
+# windows: 周一到周日，每天的可用时间窗口 ((开始分钟, 结束分钟), ...)
+Availability = namedtuple('Availability', ['windows', 'blackout_dates', 'min_duration'])
+
+DEFAULT_AVAILABILITY = Availability((((9 * 60, 22 * 60),),) * 7, frozenset(), 30)
+
+# 导出单例实例（容量和TTL在 init_availability 中按配置设置）
+availability_cache = LRUCache(maxsize=10000, ttl=300)
+
+
+def init_availability(app):
+    availability_cache.maxsize = app.config['AVAILABILITY_CACHE_SIZE']
+    availability_cache.ttl = app.config['AVAILABILITY_CACHE_TTL']
+
+
+def encode_mask(windows):
+    """每天的可用时间窗口 -> 位图（时间块内任一分钟可用即视为可用）"""
+    mask = 0
+    for day, day_windows in enumerate(windows):
+        for start, end in day_windows:
+            first = start // BLOCK_MINUTES
+            last = -(-end // BLOCK_MINUTES)
+            mask |= ((1 << (last - first)) - 1) << (day * BLOCKS_PER_DAY + first)
+    return mask.to_bytes(7 * BLOCKS_PER_DAY // 8, 'little')
+
+
+def decode_mask(payload):
+    """位图 -> 每天的可用时间窗口（连续置位的时间块合并为一个窗口）"""
+    mask = int.from_bytes(payload, 'little')
+    windows = []
+    for day in range(7):
+        bits = (mask >> (day * BLOCKS_PER_DAY)) & ((1 << BLOCKS_PER_DAY) - 1)
+        day_windows = []
+        block = 0
+        while bits:
+            # 跳过未置位的时间块，再取出一段连续置位的时间块
+            skip = (bits & -bits).bit_length() - 1
+            bits >>= skip
+            block += skip
+            run = (~bits & (bits + 1)).bit_length() - 1
+            day_windows.append((block * BLOCK_MINUTES, (block + run) * BLOCK_MINUTES))
+            bits >>= run
+            block += run
+        windows.append(tuple(day_windows))
+    return tuple(windows)
+
+
+def _to_availability(profile):
+    blackout = frozenset(date.fromisoformat(value) for value in profile.blackout_dates.split(',') if value)
+    return Availability(decode_mask(profile.weekly_mask), blackout, profile.min_duration)
+
+
+def get_availability(user_id, refresh=False):
+    """返回用户的可用性配置（优先使用缓存），没有配置时返回默认值
+
+    其他worker修改的配置在本进程缓存过期前不可见，计算结果要写入共享缓存时传 refresh=True 重新加载。
+    """
+    user_id = int(user_id)
+    availability = None if refresh else availability_cache.get(user_id)
+    if availability is None:
+        profile = db.session.get(AvailabilityProfile, user_id)
+        availability = _to_availability(profile) if profile else DEFAULT_AVAILABILITY
+        availability_cache.set(user_id, availability)
+    return availability
+
+
+def get_availabilities(user_ids):
+    """批量获取多个用户的可用性配置，缓存未命中的用户用一次查询加载，返回 {用户ID: Availability}"""
+    result = {}
+    missing = []
+    for user_id in user_ids:
+        availability = availability_cache.get(user_id)
+        if availability is None:
+            missing.append(user_id)
+        else:
+            result[user_id] = availability
+    if missing:
+        profiles = {profile.user_id: profile for profile in
+                    AvailabilityProfile.query.filter(AvailabilityProfile.user_id.in_(missing))}
+        for user_id in missing:
+            profile = profiles.get(user_id)
+            result[user_id] = _to_availability(profile) if profile else DEFAULT_AVAILABILITY
+            availability_cache.set(user_id, result[user_id])
+    return result
+
+
+def _parse_minute(value, allow_end_of_day=False):
+    try:
+        hours, minutes = (int(part) for part in value.split(':'))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"无效的时间: {value}，请使用HH:MM格式")
+    total = hours * 60 + minutes
+    if not 0 <= minutes < 60 or not 0 <= total <= (24 * 60 if allow_end_of_day else 24 * 60 - 1):
+        raise ValueError(f"无效的时间: {value}")
+    if total % BLOCK_MINUTES:
+        raise ValueError(f"时间必须是{BLOCK_MINUTES}分钟的整数倍: {value}")
+    return total
+
+
+def _parse_range(item):
+    if not isinstance(item, (list, tuple)) or len(item) != 2:
+        raise ValueError("时间段必须是 [开始, 结束] 形式")
+    start, end = _parse_minute(item[0]), _parse_minute(item[1], allow_end_of_day=True)
+    if end <= start:
+        raise ValueError(f"结束时间必须晚于开始时间: {item[0]}-{item[1]}")
+    return start, end
+
+
+def _parse_days(days):
+    if days is None:
+        return range(7)
+    if not isinstance(days, list):
+        raise ValueError("休息时间的 days 必须是星期的列表")
+    try:
+        return [WEEKDAY_NAMES.index(day) for day in days]
+    except ValueError:
+        raise ValueError("星期必须是 " + "/".join(WEEKDAY_NAMES))
+
+
+def parse_profile(data):
+    """校验请求中的可用性配置，返回 Availability；格式错误时抛出 ValueError
+
+    weekly_hours: {"mon": [["09:00", "12:00"], ["13:00", "22:00"]], ...}，未给出的星期使用默认时间，空列表表示全天不可用
+    breaks: [{"start": "12:00", "end": "13:00", "days": ["mon", ...]}]，days 省略时每天都休息
+    """
+    if not isinstance(data, dict):
+        raise ValueError("可用性配置必须是对象")
+    weekly_hours = data.get('weekly_hours') or {}
+    if not isinstance(weekly_hours, dict):
+        raise ValueError("weekly_hours 必须是以星期为键的对象")
+    unknown = set(weekly_hours) - set(WEEKDAY_NAMES)
+    if unknown:
+        raise ValueError("星期必须是 " + "/".join(WEEKDAY_NAMES))
+    if not all(isinstance(ranges, list) for ranges in weekly_hours.values()):
+        raise ValueError("weekly_hours 中每天的可用时间必须是时间段列表")
+    windows = [[_parse_range(item) for item in weekly_hours[name]] if name in weekly_hours
+               else list(DEFAULT_AVAILABILITY.windows[day])
+               for day, name in enumerate(WEEKDAY_NAMES)]
+
+    # 经位图合并重叠的时间段，再去掉休息时间
+    mask = int.from_bytes(encode_mask(windows), 'little')
+    breaks = data.get('breaks') or []
+    if not isinstance(breaks, list):
+        raise ValueError("breaks 必须是休息时间的列表")
+    for item in breaks:
+        if not isinstance(item, dict):
+            raise ValueError("休息时间必须是对象")
+        start, end = _parse_range([item.get('start'), item.get('end')])
+        for day in _parse_days(item.get('days')):
+            first = day * BLOCKS_PER_DAY + start // BLOCK_MINUTES
+            mask &= ~(((1 << ((end - start) // BLOCK_MINUTES)) - 1) << first)
+
+    blackout = data.get('blackout_dates') or []
+    if not isinstance(blackout, list) or len(blackout) > MAX_BLACKOUT_DATES:
+        raise ValueError(f"blackout_dates 必须是不超过{MAX_BLACKOUT_DATES}个日期的列表")
+    try:
+        blackout_dates = frozenset(date.fromisoformat(value) for value in blackout)
+    except (TypeError, ValueError):
+        raise ValueError("blackout_dates 中的日期必须是YYYY-MM-DD格式")
+
+    min_duration = data.get('min_duration', DEFAULT_AVAILABILITY.min_duration)
+    if not isinstance(min_duration, int) or isinstance(min_duration, bool) or not 1 <= min_duration <= 24 * 60:
+        raise ValueError("min_duration 必须是1到1440之间的整数")
+
+    payload = mask.to_bytes(7 * BLOCKS_PER_DAY // 8, 'little')
+    return Availability(decode_mask(payload), blackout_dates, min_duration)
+
+
+def save_availability(user_id, availability):
+    """保存用户的可用性配置（已预计算的日程随之失效）"""
+    profile = db.session.get(AvailabilityProfile, user_id) or AvailabilityProfile(user_id=user_id)
+    profile.weekly_mask = encode_mask(availability.windows)
+    profile.blackout_dates = ','.join(sorted(value.isoformat() for value in availability.blackout_dates))
+    profile.min_duration = availability.min_duration
+    db.session.add(profile)
+    db.session.commit()
+
+
+def delete_availability(user_id):
+    """删除用户的可用性配置，恢复默认值"""
+    profile = db.session.get(AvailabilityProfile, user_id)
+    if profile:
+        db.session.delete(profile)
+        db.session.commit()
+
+
+def availability_to_dict(availability):
+    def fmt(minutes):
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    return {
+        "weekly_hours": {name: [[fmt(start), fmt(end)] for start, end in availability.windows[day]]
+                         for day, name in enumerate(WEEKDAY_NAMES)},
+        "blackout_dates": sorted(value.isoformat() for value in availability.blackout_dates),
+        "min_duration": availability.min_duration,
+        "block_minutes": BLOCK_MINUTES,
+    }
+
+
+@event.listens_for(AvailabilityProfile, 'after_insert')
+@event.listens_for(AvailabilityProfile, 'after_update')
+@event.listens_for(AvailabilityProfile, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    availability_cache.delete(target.user_id)
@@ -0,0 +1,207 @@
+"""iCalendar订阅源
+
+常规任务按重复规则输出为带RRULE的事件（不展开），并附上未来 CALENDAR_PLAN_DAYS 天日程中安排的动态任务。
+用户的数据版本取自任务变更日志的最新序号和可用性配置的修改时间（一次查询）：渲染结果按 (用户, 版本, 当天日期)
+缓存在两级缓存中（进程内和共享存储，各worker和节点共用），ETag由版本生成，日历客户端的条件请求在渲染之前即可返回304。
+"""
+import hashlib
+import json
+import secrets
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app import db
+from models.calendar_token import CalendarToken
+from models.task import RegularTask, RepeatType
+from services.ai_scheduler import DEFAULT_TIMEZONE
+from services.plan_cache import get_schedules
+from services.shared_cache import configure_cache
+from utils.cache import TieredCache
+
+PRODID = '-//AITaskSystem//Task Calendar//ZH'
+# 日程中常规任务的优先级分数固定为1000（见 AIScheduler.generate_daily_schedule），据此区分动态任务
+REGULAR_PRIORITY_SCORE = 1000
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+RenderedFeed = namedtuple('RenderedFeed', ['body', 'etag', 'last_modified'])
+
+
+def _encode_feed(feed):
+    return json.dumps([feed.body.decode('utf-8'), feed.etag, feed.last_modified.isoformat()]).encode('utf-8')
+
+
+def _decode_feed(payload):
+    body, etag, last_modified = json.loads(payload)
+    return RenderedFeed(body.encode('utf-8'), etag, datetime.fromisoformat(last_modified))
+
+
+# 导出单例实例（容量和共享存储在 init_calendar_feed 中按配置设置）
+feed_cache = TieredCache('ics', _encode_feed, _decode_feed)
+
+
+def init_calendar_feed(app):
+    configure_cache(app, feed_cache, app.config['CALENDAR_CACHE_SIZE'])
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue_token(user_id):
+    """生成新的订阅令牌（旧令牌随之失效），返回令牌明文"""
+    token = secrets.token_urlsafe(32)
+    revoke_token(user_id)
+    db.session.add(CalendarToken(user_id=user_id, token_hash=_hash_token(token)))
+    db.session.commit()
+    return token
+
+
+def revoke_token(user_id):
+    """删除用户的订阅令牌，所有worker中立即失效"""
+    existing = CalendarToken.query.filter_by(user_id=user_id).first()
+    if existing:
+        db.session.delete(existing)
+        db.session.commit()
+
+
+def resolve_token(token):
+    """返回令牌对应的用户ID，无效时返回None
+
+    不缓存：进程内缓存无法在其他worker中失效，轮换或撤销后的令牌会继续可用；按唯一索引查询一次的开销可以忽略。
+    """
+    return db.session.execute(
+        sa.select(CalendarToken.user_id).where(CalendarToken.token_hash == _hash_token(token))
+    ).scalar()
+
+
+def feed_etag(user_id, version, today):
+    # 数据版本只在同一用户内递增，不同用户可能相同，ETag需包含用户ID
+    return f"ics-{user_id}-{version}-{today:%Y%m%d}"
+
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """按RFC 5545将超过75字节的行折叠（不拆开多字节字符）"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts, current, size, limit = [], [], 0, 75
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > limit:
+            parts.append(''.join(current))
+            current, size, limit = [], 0, 74  # 续行以一个空格开头
+        current.append(char)
+        size += char_size
+    parts.append(''.join(current))
+    return '\r\n '.join(parts)
+
+
+def _local(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def _utc(value):
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _vtimezone(tz):
+    """时区定义（只使用当前偏移；有夏令时的时区由客户端按TZID识别）"""
+    tz_name = tz.zone
+    offset = datetime.now(tz).utcoffset()
+    minutes = int(offset.total_seconds() // 60)
+    sign = '+' if minutes >= 0 else '-'
+    tzoffset = f"{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}"
+    return [
+        'BEGIN:VTIMEZONE', f'TZID:{tz_name}',
+        'BEGIN:STANDARD', 'DTSTART:19700101T000000',
+        f'TZOFFSETFROM:{tzoffset}', f'TZOFFSETTO:{tzoffset}',
+        'END:STANDARD', 'END:VTIMEZONE',
+    ]
+
+
+def _regular_event(task, tz_name, stamp):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:regular-{task.id}@aitasksystem',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART;TZID={tz_name}:{_local(task.start_time)}',
+        f'DTEND;TZID={tz_name}:{_local(task.end_time)}',
+        f'SUMMARY:{_escape(task.title)}',
+    ]
+    if task.repeat_type == RepeatType.DAILY:
+        lines.append('RRULE:FREQ=DAILY')
+    elif task.repeat_type == RepeatType.WEEKLY:
+        lines.append(f'RRULE:FREQ=WEEKLY;BYDAY={WEEKDAYS[task.start_time.weekday()]}')
+    if task.location:
+        lines.append(f'LOCATION:{_escape(task.location)}')
+    if task.task_type:
+        lines.append(f'CATEGORIES:{task.task_type.value}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _planned_event(day, item, tz_name, stamp):
+    start = datetime.strptime(item['start_time'], '%Y-%m-%dT%H:%M:%S')
+    end = datetime.strptime(item['end_time'], '%Y-%m-%dT%H:%M:%S')
+    return [
+        'BEGIN:VEVENT',
+        f"UID:dynamic-{item['task_id']}-{day:%Y%m%d}@aitasksystem",
+        f'DTSTAMP:{stamp}',
+        f'DTSTART;TZID={tz_name}:{_local(start)}',
+        f'DTEND;TZID={tz_name}:{_local(end)}',
+        f"SUMMARY:{_escape(item['title'])}",
+        f"DESCRIPTION:{_escape('AI安排，优先级分数 %.0f' % item['priority_score'])}",
+        'CATEGORIES:dynamic',
+        'END:VEVENT',
+    ]
+
+
+def _planned_items(user_id, days):
+    """未来几天日程中的动态任务，优先使用缓存和预计算的日程"""
+    dates = [date.today() + timedelta(days=i) for i in range(days)]
+    plans = get_schedules(user_id, dates) or {}
+    for day in dates:
+        for item in plans.get(day, []):
+            if item['priority_score'] != REGULAR_PRIORITY_SCORE:
+                yield day, item
+
+
+def render_feed(user_id, config):
+    # 与调度器使用同一时区
+    tz_name = DEFAULT_TIMEZONE.zone
+    stamp = _utc(datetime.now(timezone.utc))
+    lines = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{_escape(config['CALENDAR_NAME'])}", f'X-WR-TIMEZONE:{tz_name}',
+        *_vtimezone(DEFAULT_TIMEZONE),
+    ]
+    tasks = RegularTask.query.with_entities(
+        RegularTask.id, RegularTask.title, RegularTask.task_type, RegularTask.location,
+        RegularTask.start_time, RegularTask.end_time, RegularTask.repeat_type
+    ).filter(RegularTask.user_id == user_id).order_by(RegularTask.id)
+    for task in tasks:
+        lines += _regular_event(task, tz_name, stamp)
+    for day, item in _planned_items(user_id, config['CALENDAR_PLAN_DAYS']):
+        lines += _planned_event(day, item, tz_name, stamp)
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode('utf-8')
+
+
+def get_feed(user_id, version, config):
+    """返回渲染好的订阅源，相同数据版本在同一天内只渲染一次"""
+    today = date.today()
+    key = (user_id, version, today)
+    feed = feed_cache.get(key)
+    if feed is None:
+        # 日程随日期变化，渲染时间即为该内容的修改时间
+        last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        feed = RenderedFeed(render_feed(user_id, config), feed_etag(user_id, version, today), last_modified)
+        feed_cache.set(key, feed)
+    return feed
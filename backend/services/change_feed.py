@@ -0,0 +1,242 @@
+"""任务变更订阅
+
+每次flush时把新增、修改和删除的任务记入 task_change 表，序号（seq）按用户单调递增：
+分配序号前锁定用户行，同一用户的写事务按序号顺序提交，因此客户端按序号推进游标不会漏掉变更。
+删除记为墓碑，compact-task-changes 命令只清理被同一任务更新的记录取代的旧记录，墓碑一直保留，
+任意旧游标都能得到正确的增量。
+
+提交后通知本进程中等待的长轮询/SSE请求（包括ASGI模式下在事件循环中等待的请求），
+其他worker的提交由轮询间隔兜底。
+
+data_version 由最新序号和可用性配置的修改时间组成，是各worker和节点一致的用户数据版本，
+共享缓存（日程、日历订阅）以它作为键的一部分，数据变化后旧条目自然失效。
+"""
+import asyncio
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.orm import aliased
+
+from app import db
+from models.availability import AvailabilityProfile
+from models.task import RegularTask, DynamicTask
+from models.task_change import TaskChange
+from models.user import User
+
+_EPOCH = datetime(1970, 1, 1)
+
+TASK_KINDS = {
+    RegularTask: 'regular',
+    DynamicTask: 'dynamic',
+}
+
+ChangeSet = namedtuple('ChangeSet', ['cursor', 'has_more', 'regular', 'dynamic',
+                                     'deleted_regular', 'deleted_dynamic'])
+
+
+class ChangeNotifier:
+    """按用户记录本进程内已提交的变更次数，等待方在次数变化时被唤醒
+
+    线程中的等待方使用条件变量；协程中的等待方登记一个future，提交所在的线程
+    通过 call_soon_threadsafe 在其事件循环中唤醒它。
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = {}
+        self._futures = {}
+
+    def version(self, user_id):
+        with self._condition:
+            return self._versions.get(user_id, 0)
+
+    def notify(self, user_ids):
+        with self._condition:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+                for future in self._futures.get(user_id, ()):
+                    future.get_loop().call_soon_threadsafe(_wake, future)
+            self._condition.notify_all()
+
+    def wait(self, user_id, seen_version, timeout):
+        """等待用户有新的提交或超时，返回是否有新提交"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._versions.get(user_id, 0) != seen_version, timeout)
+
+    async def wait_async(self, user_id, seen_version, timeout):
+        """在事件循环中等待用户有新的提交或超时，不占用线程，返回是否有新提交"""
+        future = asyncio.get_running_loop().create_future()
+        with self._condition:
+            if self._versions.get(user_id, 0) != seen_version:
+                return True
+            self._futures.setdefault(user_id, set()).add(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._condition:
+                waiting = self._futures.get(user_id)
+                if waiting is not None:
+                    waiting.discard(future)
+                    if not waiting:
+                        del self._futures[user_id]
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+# 导出单例实例
+notifier = ChangeNotifier()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_changes(session, flush_context):
+    changes = []
+    for obj in session.new:
+        if type(obj) in TASK_KINDS:
+            changes.append((obj.user_id, TASK_KINDS[type(obj)], obj.id, False))
+    for obj in session.dirty:
+        if type(obj) in TASK_KINDS and session.is_modified(obj):
+            changes.append((obj.user_id, TASK_KINDS[type(obj)], obj.id, False))
+    for obj in session.deleted:
+        if type(obj) in TASK_KINDS:
+            changes.append((obj.user_id, TASK_KINDS[type(obj)], obj.id, True))
+    record_changes(session, changes)
+
+
+def record_changes(session, changes):
+    """写入变更记录，changes 为 (user_id, 任务类别, 任务ID, 是否删除) 列表；批量删除等绕过ORM的操作需手动调用"""
+    if not changes:
+        return
+
+    user_ids = {change[0] for change in changes}
+    # 行锁使同一用户的并发事务依次分配序号（SQLite的写事务本身是串行的，忽略FOR UPDATE）
+    session.execute(sa.select(User.id).where(User.id.in_(user_ids)).with_for_update())
+    next_seq = dict(session.execute(
+        sa.select(TaskChange.user_id, sa.func.max(TaskChange.seq))
+        .where(TaskChange.user_id.in_(user_ids))
+        .group_by(TaskChange.user_id)
+    ).all())
+    rows = []
+    for user_id, kind, task_id, deleted in changes:
+        next_seq[user_id] = (next_seq.get(user_id) or 0) + 1
+        rows.append({"user_id": user_id, "seq": next_seq[user_id], "task_kind": kind,
+                     "task_id": task_id, "deleted": deleted})
+    session.execute(sa.insert(TaskChange), rows)
+    session.info.setdefault('changed_users', set()).update(user_ids)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_waiters(session):
+    user_ids = session.info.pop('changed_users', None)
+    if user_ids:
+        notifier.notify(user_ids)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop('changed_users', None)
+
+
+def current_cursor(user_id):
+    return db.session.execute(
+        sa.select(sa.func.coalesce(sa.func.max(TaskChange.seq), 0)).where(TaskChange.user_id == user_id)
+    ).scalar()
+
+
+def data_version(user_id):
+    """用户数据的版本 "任务变更最新序号.可用性配置修改时间（微秒）"，一次查询得到，任务或可用性配置变化时改变"""
+    cursor, availability_updated = db.session.execute(sa.select(
+        sa.select(sa.func.coalesce(sa.func.max(TaskChange.seq), 0))
+        .where(TaskChange.user_id == user_id).scalar_subquery(),
+        sa.select(AvailabilityProfile.updated_at)
+        .where(AvailabilityProfile.user_id == user_id).scalar_subquery()
+    )).one()
+    stamp = (availability_updated - _EPOCH) // timedelta(microseconds=1) if availability_updated else 0
+    return f"{cursor}.{stamp}"
+
+
+def get_changes(user_id, since, limit):
+    """返回游标之后的变更；同一任务多次变更只返回最终状态"""
+    entries = db.session.execute(
+        sa.select(TaskChange.seq, TaskChange.task_kind, TaskChange.task_id, TaskChange.deleted)
+        .where(TaskChange.user_id == user_id, TaskChange.seq > since)
+        .order_by(TaskChange.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for entry in entries:
+        latest[(entry.task_kind, entry.task_id)] = entry.deleted
+    updated = {'regular': [], 'dynamic': []}
+    deleted = {'regular': [], 'dynamic': []}
+    for (kind, task_id), is_deleted in latest.items():
+        (deleted if is_deleted else updated)[kind].append(task_id)
+
+    # 任务在本页之后被删除时查不到，墓碑会在后续页中返回
+    regular = RegularTask.query.filter(RegularTask.user_id == user_id,
+                                       RegularTask.id.in_(updated['regular'])).all() if updated['regular'] else []
+    dynamic = DynamicTask.query.filter(DynamicTask.user_id == user_id,
+                                       DynamicTask.id.in_(updated['dynamic'])).all() if updated['dynamic'] else []
+    cursor = entries[-1].seq if entries else since
+    return ChangeSet(cursor, has_more, regular, dynamic, deleted['regular'], deleted['dynamic'])
+
+
+def get_snapshot(user_id):
+    """没有游标时返回全部任务和当前游标（先取游标，之后的变更在下次请求中返回）
+
+    排序与任务列表接口的默认排序一致：常规任务按开始时间，动态任务按截止时间（没有截止时间的在最后）。
+    """
+    cursor = current_cursor(user_id)
+    return ChangeSet(cursor, False,
+                     RegularTask.query.filter_by(user_id=user_id)
+                     .order_by(RegularTask.start_time, RegularTask.id).all(),
+                     DynamicTask.query.filter_by(user_id=user_id)
+                     .order_by(DynamicTask.deadline.asc().nullslast(), DynamicTask.id).all(),
+                     [], [])
+
+
+def wait_for_changes(user_id, since, limit, timeout, poll_interval):
+    """长轮询：有变更或超时时返回；等待期间不占用数据库连接"""
+    deadline = time.monotonic() + timeout
+    while True:
+        seen_version = notifier.version(user_id)
+        changes = get_changes(user_id, since, limit)
+        remaining = deadline - time.monotonic()
+        if changes.cursor != since or remaining <= 0:
+            return changes
+        db.session.close()
+        notifier.wait(user_id, seen_version, min(poll_interval, remaining))
+
+
+def compact_changes():
+    """删除已被同一任务更新的记录取代的旧记录，返回删除的行数"""
+    newer = aliased(TaskChange)
+    superseded = sa.exists().where(
+        newer.user_id == TaskChange.user_id,
+        newer.task_kind == TaskChange.task_kind,
+        newer.task_id == TaskChange.task_id,
+        newer.seq > TaskChange.seq
+    )
+    result = db.session.execute(sa.delete(TaskChange).where(superseded))
+    db.session.commit()
+    return result.rowcount
+
+
+@click.command('compact-task-changes')
+@with_appcontext
+def compact_changes_command():
+    """清理任务变更日志中被取代的旧记录"""
+    click.echo(f"已清理 {compact_changes()} 条变更记录")
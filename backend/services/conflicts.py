@@ -0,0 +1,130 @@
+"""常规任务时间冲突检测
+
+常规任务在检测窗口内展开为具体的发生区间：单次任务发生在开始日期，每日任务从开始日期起每天发生，
+每周任务从开始日期起每周同一天发生；跨越午夜的任务按实际时长延续到次日。
+展开后的区间按开始时间排序，单个任务的检测用二分查找（IntervalIndex），整个日历的检测用一次扫描线。
+"""
+import heapq
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import db
+from models.task import RegularTask, RepeatType
+
+Occurrence = namedtuple('Occurrence', ['start', 'end', 'task_id'])
+TaskTimes = namedtuple('TaskTimes', ['id', 'title', 'start_time', 'end_time', 'repeat_type'])
+
+
+def expand_occurrences(task, window_start, window_end):
+    """生成任务在 [window_start, window_end)（datetime）内发生的区间"""
+    duration = task.end_time - task.start_time
+    if duration <= timedelta(0):
+        return
+    if task.repeat_type == RepeatType.DAILY:
+        step = timedelta(days=1)
+    elif task.repeat_type == RepeatType.WEEKLY:
+        step = timedelta(days=7)
+    else:
+        if task.start_time < window_end and task.start_time + duration > window_start:
+            yield Occurrence(task.start_time, task.start_time + duration, task.id)
+        return
+
+    # 从窗口开始前最近的一次发生开始（跨越午夜的区间可能延续到窗口内）
+    start = task.start_time
+    if start + duration <= window_start:
+        skipped = (window_start - duration - start) // step + 1
+        start += step * skipped
+    while start < window_end:
+        yield Occurrence(start, start + duration, task.id)
+        start += step
+
+
+class IntervalIndex:
+    """按开始时间排序的区间索引；区间时长有上限，因此重叠查询只需检查一段连续的区间"""
+
+    def __init__(self, occurrences):
+        self.occurrences = sorted(occurrences)
+        self._starts = [occurrence.start for occurrence in self.occurrences]
+        self._max_duration = max((o.end - o.start for o in self.occurrences), default=timedelta(0))
+
+    def overlapping(self, start, end):
+        """返回与 [start, end) 重叠的区间"""
+        i = bisect_left(self._starts, start - self._max_duration)
+        stop = bisect_left(self._starts, end)
+        return [o for o in self.occurrences[i:stop] if o.end > start]
+
+
+def _load_tasks(user_id, window_start, window_end, exclude_id=None):
+    """一次查询取出窗口内可能发生的常规任务（只取时间相关的列）"""
+    query = sa.select(RegularTask.id, RegularTask.title, RegularTask.start_time,
+                      RegularTask.end_time, RegularTask.repeat_type).where(
+        RegularTask.user_id == user_id,
+        RegularTask.start_time < window_end,
+        sa.or_(
+            RegularTask.repeat_type.in_([RepeatType.DAILY, RepeatType.WEEKLY]),
+            RegularTask.start_time >= window_start - timedelta(days=1)
+        )
+    )
+    if exclude_id is not None:
+        query = query.where(RegularTask.id != exclude_id)
+    return [TaskTimes(*row) for row in db.session.execute(query)]
+
+
+def _group_dates(pairs, titles):
+    """将 (任务ID, 冲突开始时间) 按任务汇总为冲突日期列表"""
+    dates = {}
+    for task_id, start in pairs:
+        dates.setdefault(task_id, set()).add(start.date().isoformat())
+    return [{"task_id": task_id, "title": titles[task_id], "dates": sorted(task_dates)}
+            for task_id, task_dates in sorted(dates.items())]
+
+
+def _check_window(task, horizon_days):
+    """检测窗口：单次任务为其发生的时间段，重复任务为从开始日期（不早于今天）起的 horizon_days 天"""
+    if task.repeat_type in (RepeatType.DAILY, RepeatType.WEEKLY):
+        first_day = max(task.start_time.date(), date.today())
+        window_start = datetime.combine(first_day, datetime.min.time())
+        return window_start, window_start + timedelta(days=horizon_days)
+    return task.start_time, task.end_time
+
+
+def find_task_conflicts(user_id, task, horizon_days=None):
+    """返回与任务重叠的其他常规任务及冲突日期"""
+    horizon_days = horizon_days or current_app.config['CONFLICT_HORIZON_DAYS']
+    window_start, window_end = _check_window(task, horizon_days)
+    others = _load_tasks(user_id, window_start, window_end, exclude_id=task.id)
+    index = IntervalIndex(o for other in others for o in expand_occurrences(other, window_start, window_end))
+
+    titles = {other.id: other.title for other in others}
+    pairs = []
+    for occurrence in expand_occurrences(task, window_start, window_end):
+        for other in index.overlapping(occurrence.start, occurrence.end):
+            pairs.append((other.task_id, max(occurrence.start, other.start)))
+    return _group_dates(pairs, titles)
+
+
+def find_all_conflicts(user_id, start_day, days):
+    """扫描线一次找出窗口内全部重叠的任务对，返回 [{task_ids, titles, dates}]"""
+    window_start = datetime.combine(start_day, datetime.min.time())
+    window_end = window_start + timedelta(days=days)
+    tasks = _load_tasks(user_id, window_start, window_end)
+    titles = {task.id: task.title for task in tasks}
+    occurrences = sorted(o for task in tasks for o in expand_occurrences(task, window_start, window_end))
+
+    conflicts = {}
+    active = []  # (结束时间, 开始时间, 任务ID) 最小堆
+    for occurrence in occurrences:
+        while active and active[0][0] <= occurrence.start:
+            heapq.heappop(active)
+        for _, _, task_id in active:
+            if task_id != occurrence.task_id:
+                pair = tuple(sorted((task_id, occurrence.task_id)))
+                conflicts.setdefault(pair, set()).add(occurrence.start.date().isoformat())
+        heapq.heappush(active, (occurrence.end, occurrence.start, occurrence.task_id))
+
+    return [{"task_ids": list(pair), "titles": [titles[pair[0]], titles[pair[1]]], "dates": sorted(dates)}
+            for pair, dates in sorted(conflicts.items())]
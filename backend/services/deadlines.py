@@ -0,0 +1,63 @@
+"""截止时间分档索引
+
+优先级评分按截止时间距日程日期的天数分档加分（今天或已过期、明天、3天内、7天内）。
+DeadlineIndex 把一组动态任务的截止时间解析一次并排序，之后每个日期只需四次二分查找就能得到
+各档的任务，不必对每个任务、每个日期重复解析和比较；一周的日程或多个模拟方案共用同一个索引。
+"""
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+# (档位名称, 截止时间早于 日期+N天, 加分)，与 AIScheduler.calculate_priority_score 的规则一致
+DEADLINE_BUCKETS = (
+    ('today', 1, 150),     # 今天或已过期
+    ('tomorrow', 2, 100),  # 明天到期
+    ('within_3_days', 4, 50),
+    ('within_7_days', 8, 20),
+)
+
+
+def parse_deadline(value):
+    """解析调度器使用的截止时间字符串（YYYY-MM-DDTHH:MM:SS 或 YYYY-MM-DD），无效时返回None"""
+    try:
+        if 'T' in value:
+            return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def bucket_for(deadline, day):
+    """截止时间相对于 day（日期的零点）所在的档位名称，超过7天时返回None"""
+    for name, days, _ in DEADLINE_BUCKETS:
+        if deadline < day + timedelta(days=days):
+            return name
+    return None
+
+
+class DeadlineIndex:
+    """未完成且有有效截止时间的任务，按截止时间排序"""
+
+    __slots__ = ('_deadlines', '_task_ids')
+
+    def __init__(self, tasks):
+        entries = []
+        for task in tasks:
+            if task.deadline and not task.completed:
+                deadline = parse_deadline(task.deadline)
+                if deadline is not None:
+                    entries.append((deadline, task.id))
+        entries.sort()
+        self._deadlines = [deadline for deadline, _ in entries]
+        self._task_ids = [task_id for _, task_id in entries]
+
+    def bonuses(self, date):
+        """日期（YYYY-MM-DD）对应的截止时间加分 {任务ID: 加分}，不在7天内的任务不出现"""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        result = {}
+        lo = 0
+        for _, days, bonus in DEADLINE_BUCKETS:
+            hi = bisect_left(self._deadlines, day + timedelta(days=days))
+            for task_id in self._task_ids[lo:hi]:
+                result[task_id] = bonus
+            lo = hi
+        return result
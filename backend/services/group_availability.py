@@ -0,0 +1,150 @@
+"""多人共同空闲时间查找
+
+一次查询取出全部成员在窗口内可能发生的常规任务，展开为忙碌区间。每个成员的空闲时间表示为
+窗口内按分钟编号的位图（可用性配置中的可用时间去掉忙碌区间），全组的共同空闲时间即所有位图按位与，
+几百人、两周的窗口也只是几百次大整数运算。最后在结果位图中找出不短于会议时长的连续空闲段。
+
+除查询者本人外，成员必须已同意公开忙闲状态（free_busy_share 表），否则不能查询其空闲时间。
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from app import db
+from models.free_busy_share import FreeBusyShare
+from models.task import RegularTask, RepeatType
+from services.availability import get_availabilities, DEFAULT_AVAILABILITY
+from services.conflicts import TaskTimes, expand_occurrences
+
+MINUTES_PER_DAY = 24 * 60
+ORDERS = ('earliest', 'longest')
+
+Slot = namedtuple('Slot', ['start', 'end'])
+
+
+def _run_mask(offset, length):
+    return ((1 << length) - 1) << offset
+
+
+def availability_mask(availability, first_day, days):
+    """可用性配置在窗口内的可用分钟位图（第 i 位为窗口开始后的第 i 分钟）"""
+    mask = 0
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        if day in availability.blackout_dates:
+            continue
+        for start, end in availability.windows[day.weekday()]:
+            mask |= _run_mask(i * MINUTES_PER_DAY + start, end - start)
+    return mask
+
+
+def busy_mask(tasks, window_start, window_end):
+    """常规任务在窗口内的忙碌分钟位图"""
+    mask = 0
+    for task in tasks:
+        for occurrence in expand_occurrences(task, window_start, window_end):
+            start = max(occurrence.start, window_start)
+            end = min(occurrence.end, window_end)
+            offset = int((start - window_start).total_seconds() // 60)
+            mask |= _run_mask(offset, -int((start - end).total_seconds() // 60))
+    return mask
+
+
+def free_runs(mask, min_length):
+    """位图中不短于 min_length 的连续置位段，按位置顺序生成 (偏移, 长度)"""
+    position = 0
+    while mask:
+        skip = (mask & -mask).bit_length() - 1
+        mask >>= skip
+        position += skip
+        length = (~mask & (mask + 1)).bit_length() - 1
+        if length >= min_length:
+            yield position, length
+        mask >>= length
+        position += length
+
+
+def common_free_slots(members, first_day, days, duration, top_n, order='earliest', not_before=None):
+    """计算共同空闲时间段
+
+    members 为 [(常规任务列表, Availability)]；返回最多 top_n 个不短于 duration 分钟的 Slot，
+    order 为 earliest 时按开始时间，longest 时按时长从长到短。not_before 之前的时间不计入。
+    """
+    window_start = datetime.combine(first_day, datetime.min.time())
+    window_end = window_start + timedelta(days=days)
+    group = _run_mask(0, days * MINUTES_PER_DAY)
+    if not_before is not None and not_before > window_start:
+        group &= ~_run_mask(0, int((min(not_before, window_end) - window_start).total_seconds() // 60) + 1)
+
+    # 相同的可用性配置（大多数成员使用默认值）只展开一次
+    window_masks = {}
+    for tasks, availability in members:
+        if availability not in window_masks:
+            window_masks[availability] = availability_mask(availability, first_day, days)
+        group &= window_masks[availability]
+        if group:
+            group &= ~busy_mask(tasks, window_start, window_end)
+        if not group:
+            return []
+
+    runs = free_runs(group, duration)
+    if order == 'longest':
+        runs = sorted(runs, key=lambda run: (-run[1], run[0]))
+    slots = []
+    for offset, length in runs:
+        slots.append(Slot(window_start + timedelta(minutes=offset),
+                          window_start + timedelta(minutes=offset + length)))
+        if len(slots) >= top_n:
+            break
+    return slots
+
+
+def load_group_tasks(user_ids, window_start, window_end):
+    """一次查询取出全部成员窗口内可能发生的常规任务，返回 {用户ID: [TaskTimes]}"""
+    rows = db.session.execute(
+        sa.select(RegularTask.user_id, RegularTask.id, RegularTask.title, RegularTask.start_time,
+                  RegularTask.end_time, RegularTask.repeat_type).where(
+            RegularTask.user_id.in_(user_ids),
+            RegularTask.start_time < window_end,
+            sa.or_(
+                RegularTask.repeat_type.in_([RepeatType.DAILY, RepeatType.WEEKLY]),
+                RegularTask.start_time >= window_start - timedelta(days=1)
+            )
+        )
+    )
+    tasks = {user_id: [] for user_id in user_ids}
+    for row in rows:
+        tasks[row.user_id].append(TaskTimes(*row[1:]))
+    return tasks
+
+
+def unshared_users(requester_id, user_ids):
+    """除查询者外未同意公开忙闲状态（或不存在）的成员"""
+    others = set(user_ids) - {requester_id}
+    shared = set(db.session.execute(sa.select(FreeBusyShare.user_id)
+                                    .where(FreeBusyShare.user_id.in_(others))).scalars())
+    return sorted(others - shared)
+
+
+def is_sharing_free_busy(user_id):
+    return db.session.get(FreeBusyShare, user_id) is not None
+
+
+def set_free_busy_sharing(user_id, enabled):
+    """同意或取消公开忙闲状态"""
+    share = db.session.get(FreeBusyShare, user_id)
+    if enabled and share is None:
+        db.session.add(FreeBusyShare(user_id=user_id))
+    elif not enabled and share is not None:
+        db.session.delete(share)
+    db.session.commit()
+
+
+def find_group_slots(user_ids, first_day, days, duration, top_n, order='earliest', use_availability=True):
+    """查找一组用户的共同空闲时间段"""
+    window_start = datetime.combine(first_day, datetime.min.time())
+    tasks = load_group_tasks(user_ids, window_start, window_start + timedelta(days=days))
+    availabilities = get_availabilities(user_ids) if use_availability else {}
+    members = [(tasks[user_id], availabilities.get(user_id, DEFAULT_AVAILABILITY)) for user_id in user_ids]
+    return common_free_slots(members, first_day, days, duration, top_n, order, not_before=datetime.now())
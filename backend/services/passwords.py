@@ -0,0 +1,100 @@
+"""密码哈希与校验
+
+哈希参数由 PASSWORD_HASH_METHOD 配置（werkzeug方法串，如 pbkdf2:sha256:600000 或 scrypt:32768:8:1），
+参数变化后用户下次登录时透明地重新哈希。校验在有界线程池中执行（hashlib计算期间释放GIL），
+排队已满时抛出 PasswordVerifierBusy，由路由返回503。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordVerifierBusy(Exception):
+    """校验线程池排队已满或等待超时"""
+
+
+class PasswordVerifier:
+    """有界的密码校验线程池，同时在执行和排队的任务数不超过 workers + queue_limit"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self.workers = 2
+        self.queue_limit = 32
+        self.timeout = 5.0
+
+    def configure(self, workers, queue_limit, timeout):
+        with self._lock:
+            self.workers = workers
+            self.queue_limit = queue_limit
+            self.timeout = timeout
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self):
+        # 线程不会随fork复制，gunicorn worker中按进程惰性创建
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='password-verify')
+                    self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+                    self._pid = pid
+        return self._executor, self._slots
+
+    def verify(self, password_hash, password):
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            raise PasswordVerifierBusy()
+        try:
+            future = executor.submit(check_password_hash, password_hash, password)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordVerifierBusy()
+
+
+# 导出单例实例（参数在 init_passwords 中按配置设置）
+verifier = PasswordVerifier()
+_normalized_methods = {}
+
+
+def init_passwords(app):
+    verifier.configure(app.config['PASSWORD_VERIFY_WORKERS'],
+                       app.config['PASSWORD_VERIFY_QUEUE'],
+                       app.config['PASSWORD_VERIFY_TIMEOUT'])
+
+
+def hash_password(password):
+    return generate_password_hash(password,
+                                  method=current_app.config['PASSWORD_HASH_METHOD'],
+                                  salt_length=current_app.config['PASSWORD_SALT_LENGTH'])
+
+
+def verify_password(password_hash, password):
+    """在线程池中校验密码，繁忙时抛出 PasswordVerifierBusy"""
+    return verifier.verify(password_hash, password)
+
+
+def _normalized_method(method):
+    """补全方法串中的默认参数（如 pbkdf2 -> pbkdf2:sha256:600000），每个进程只计算一次"""
+    if method not in _normalized_methods:
+        _normalized_methods[method] = generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+    return _normalized_methods[method]
+
+
+def needs_rehash(password_hash):
+    """已存储的哈希参数与当前配置不一致时需要重新哈希"""
+    return password_hash.split('$', 1)[0] != _normalized_method(current_app.config['PASSWORD_HASH_METHOD'])
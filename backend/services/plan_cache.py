@@ -0,0 +1,221 @@
+"""预计算日程
+
+每日日程只取决于用户的任务、可用性配置和日期，因此可以提前计算：夜间任务为活跃用户计算未来N天的日程，
+登录时在后台为该用户预热本周的日程，AI路由命中时不再加载任务和重新计算。
+日程按 (用户, 日期) 以压缩JSON存储在 schedule_plan 表中，用户的任务或可用性配置发生变化时删除其全部日程。
+
+    cd backend && PYTHONPATH=. flask --app main precompute-plans --days 2
+
+可由cron每晚执行（如 `0 3 * * *`），不依赖外部服务。
+
+请求中用到的日程由 get_schedules 读取：先查两级缓存（进程内LRU和共享存储，键含用户数据版本），
+再查预计算的日程，仍未命中时现场计算并写入缓存，同一版本的日程在所有worker和节点中只计算一次。
+"""
+import json
+import logging
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from app import db
+from models.availability import AvailabilityProfile
+from models.schedule_plan import SchedulePlan
+from models.task import RegularTask, DynamicTask, RepeatType
+from services.availability import get_availability
+from services.change_feed import data_version
+from services.deadlines import DeadlineIndex
+from services.shared_cache import configure_cache
+from services.task_loader import load_user_tasks
+from utils.cache import LRUCache, TieredCache
+
+logger = logging.getLogger(__name__)
+
+# ScheduleItem 的字段顺序，存储时只保存值
+PLAN_FIELDS = ('task_id', 'title', 'start_time', 'end_time', 'priority_score', 'confidence')
+
+# 后台预热使用的线程池，以及最近已预热的用户（避免重复登录反复计算）
+_warm_executor = None
+_warm_lock = threading.Lock()
+_recently_warmed = LRUCache(maxsize=10000)
+
+
+def encode_plan(schedule):
+    rows = [[item[field] if isinstance(item, dict) else getattr(item, field) for field in PLAN_FIELDS]
+            for item in schedule]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_plan(payload):
+    return [dict(zip(PLAN_FIELDS, row)) for row in json.loads(zlib.decompress(payload))]
+
+
+# 导出单例实例：{(用户, 数据版本, 日期): [日程项dict]}（容量和共享存储在 init_plan_cache 中按配置设置）
+schedule_cache = TieredCache('schedule', encode_plan, decode_plan)
+
+
+def init_plan_cache(app):
+    configure_cache(app, schedule_cache, app.config['CACHE_LOCAL_SIZE'])
+
+
+def get_plans(user_id, dates, version=None):
+    """读取已预计算的日程，返回 {date: [日程项dict]}，未命中的日期不在结果中
+
+    只使用按数据版本 version（默认为当前版本）计算的日程：计算期间有任务写入时，保存的日程已经过期。
+    """
+    if version is None:
+        version = data_version(int(user_id))
+    rows = db.session.execute(
+        sa.select(SchedulePlan.plan_date, SchedulePlan.payload)
+        .where(SchedulePlan.user_id == int(user_id), SchedulePlan.plan_date.in_(list(dates)),
+               SchedulePlan.data_version == version)
+    ).all()
+    return {row.plan_date: decode_plan(row.payload) for row in rows}
+
+
+def generate_plans(user_id, dates):
+    """计算指定日期的日程（不保存），返回 {date: ScheduleItem列表}；用户不存在时返回None"""
+    from services.ai_scheduler import scheduler
+
+    dates = sorted(dates)
+    task_data = load_user_tasks(int(user_id), window_start=dates[0], window_end=dates[-1])
+    if task_data is None:
+        return None
+    regular_tasks, dynamic_tasks = task_data
+    # 结果可能写入共享缓存，可用性配置不使用本进程可能过期的缓存
+    availability = get_availability(user_id, refresh=True)
+    deadlines = DeadlineIndex(dynamic_tasks)
+    return {day: scheduler.generate_daily_schedule(regular_tasks, dynamic_tasks, day.strftime('%Y-%m-%d'),
+                                                   availability, deadlines)
+            for day in dates}
+
+
+def compute_plans(user_id, dates):
+    """计算并保存指定日期的日程，返回 {date: ScheduleItem列表}；用户不存在时返回None"""
+    # 在读取任务之前取版本：之后的写入会使版本改变，这批日程不会再被使用
+    version = data_version(int(user_id))
+    plans = generate_plans(user_id, dates)
+    if plans is not None:
+        store_plans(user_id, plans, version)
+    return plans
+
+
+def get_schedules(user_id, dates):
+    """返回指定日期的日程 {date: [日程项dict]}，依次使用两级缓存、预计算的日程和现场计算；用户不存在时返回None"""
+    user_id = int(user_id)
+    version = data_version(user_id)
+    keys = {day: (user_id, version, day) for day in dates}
+    cached = schedule_cache.get_many(list(keys.values()))
+    schedules = {day: cached[key] for day, key in keys.items() if key in cached}
+
+    missing = [day for day in dates if day not in schedules]
+    if missing:
+        found = get_plans(user_id, missing, version)
+        missing = [day for day in missing if day not in found]
+        if missing:
+            computed = generate_plans(user_id, missing)
+            if computed is None:
+                return None
+            found.update({day: [item.dict() for item in schedule] for day, schedule in computed.items()})
+        schedule_cache.set_many({keys[day]: schedule for day, schedule in found.items()})
+        schedules.update(found)
+    return schedules
+
+
+def store_plans(user_id, plans, version):
+    user_id = int(user_id)
+    db.session.execute(sa.delete(SchedulePlan).where(SchedulePlan.user_id == user_id,
+                                                      SchedulePlan.plan_date.in_(list(plans))))
+    db.session.execute(sa.insert(SchedulePlan), [
+        {"user_id": user_id, "plan_date": day, "payload": encode_plan(schedule), "data_version": version}
+        for day, schedule in plans.items()
+    ])
+    db.session.commit()
+
+
+def active_user_ids():
+    """有待安排任务的用户：存在未完成的动态任务、重复任务或今后的单次任务"""
+    today = datetime.combine(date.today(), datetime.min.time())
+    query = sa.union(
+        sa.select(DynamicTask.user_id).where(DynamicTask.is_completed.isnot(True)),
+        sa.select(RegularTask.user_id).where(sa.or_(
+            RegularTask.repeat_type.in_([RepeatType.DAILY, RepeatType.WEEKLY]),
+            RegularTask.start_time >= today
+        ))
+    )
+    return [row[0] for row in db.session.execute(query)]
+
+
+def precompute_plans(days, start=None):
+    """为所有活跃用户计算从start（默认今天）起days天的日程，返回处理的用户数"""
+    start = start or date.today()
+    dates = [start + timedelta(days=i) for i in range(days)]
+    user_ids = active_user_ids()
+    for user_id in user_ids:
+        try:
+            compute_plans(user_id, dates)
+        except Exception as e:
+            db.session.rollback()
+            logger.error("预计算用户 %s 的日程失败: %s", user_id, e)
+    # 删除已过期的日程
+    db.session.execute(sa.delete(SchedulePlan).where(SchedulePlan.plan_date < start))
+    db.session.commit()
+    return len(user_ids)
+
+
+def _warm(app, user_id, dates):
+    with app.app_context():
+        try:
+            missing = set(dates) - set(get_plans(user_id, dates))
+            if missing:
+                compute_plans(user_id, missing)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("预热用户 %s 的日程失败: %s", user_id, e)
+
+
+def warm_user_plans(user_id, days=None):
+    """在后台线程中预热用户从今天起一周的日程（登录时调用，立即返回）"""
+    app = current_app._get_current_object()
+    if not app.config['PLAN_WARM_ON_LOGIN'] or _recently_warmed.get(user_id):
+        return
+    _recently_warmed.set(user_id, True, ttl=app.config['PLAN_WARM_INTERVAL'])
+
+    global _warm_executor
+    with _warm_lock:
+        if _warm_executor is None:
+            _warm_executor = ThreadPoolExecutor(max_workers=app.config['PLAN_WARM_WORKERS'],
+                                                thread_name_prefix='plan-warm')
+    days = days or app.config['PLAN_WARM_DAYS']
+    _warm_executor.submit(_warm, app, user_id, [date.today() + timedelta(days=i) for i in range(days)])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _invalidate_plans(session, flush_context):
+    """任务或可用性配置新增、修改或删除时，删除该用户已预计算的日程"""
+    user_ids = {obj.user_id for obj in (*session.new, *session.dirty, *session.deleted)
+                if isinstance(obj, (RegularTask, DynamicTask, AvailabilityProfile)) and obj.user_id is not None}
+    invalidate_plans(session, user_ids)
+
+
+def invalidate_plans(session, user_ids):
+    """删除用户已预计算的日程；批量写入等绕过ORM flush的操作需手动调用"""
+    if user_ids:
+        session.execute(sa.delete(SchedulePlan).where(SchedulePlan.user_id.in_(user_ids)))
+        for user_id in user_ids:
+            _recently_warmed.delete(user_id)
+
+
+@click.command('precompute-plans')
+@with_appcontext
+@click.option('--days', default=None, type=int, help='预计算的天数（默认 PLAN_PRECOMPUTE_DAYS）')
+def precompute_plans_command(days):
+    """为活跃用户预计算未来几天的日程"""
+    count = precompute_plans(days or current_app.config['PLAN_PRECOMPUTE_DAYS'])
+    click.echo(f"已为 {count} 个用户预计算日程")
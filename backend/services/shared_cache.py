@@ -0,0 +1,30 @@
+"""跨worker和节点共享的缓存存储
+
+CACHE_STORAGE_URL 为 redis://... 时使用Redis（兼容Redis协议的服务均可，需要安装redis包），
+为 database 时使用应用数据库中的 cache_entry 表（SQLite只能在同一台机器的worker之间共享，多节点时使用PostgreSQL），
+为空时各缓存只有进程内的一级。存储在每个应用中只创建一次，各模块的 TieredCache 单例在其 init 函数中调用 configure_cache。
+"""
+from app import db
+from models.cache_entry import CacheEntry
+from utils.cache import DatabaseCacheStore, RedisCacheStore
+
+
+def create_store(url):
+    if not url:
+        return None
+    if url == 'database':
+        return DatabaseCacheStore(db, CacheEntry.__table__)
+    return RedisCacheStore(url)
+
+
+def get_store(app):
+    if 'cache_store' not in app.extensions:
+        app.extensions['cache_store'] = create_store(app.config['CACHE_STORAGE_URL'])
+    return app.extensions['cache_store']
+
+
+def configure_cache(app, cache, maxsize):
+    """按配置设置两级缓存的进程内容量、过期时间和共享存储"""
+    cache.local.maxsize = maxsize
+    cache.local.ttl = cache.ttl = app.config['CACHE_TTL']
+    cache.store = get_store(app)
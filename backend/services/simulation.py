@@ -0,0 +1,183 @@
+"""日程模拟（what-if）
+
+一次请求评估多个假设方案（修改动态任务的预计时间/优先级/截止时间/完成状态，或以固定的工作时间
+代替用户的可用性配置），
+与逐个调用 generate-schedule 相比：任务只加载一次；每天的可用时间槽按工作时间计算一次，各方案共享；
+优先级分数每天计算并排序一次（截止时间只解析一次），方案只对修改过的任务重新计算分数。
+每个方案逐天返回安排和未安排的任务及分数合计，并与基线（不做修改）比较。
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from services.deadlines import DeadlineIndex
+
+PRIORITIES = ('high', 'medium', 'low')
+
+# working_hours 为 (开始小时, 结束小时)，None 表示使用用户的可用性配置
+Variant = namedtuple('Variant', ['name', 'working_hours', 'overrides'])
+
+BASELINE = Variant('baseline', None, {})
+
+
+def _parse_override(item):
+    """校验单个任务的修改，返回 (任务ID, 要覆盖的字段)"""
+    if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+        raise ValueError("任务修改必须包含整数 id")
+    update = {}
+    if 'estimated_time' in item:
+        value = item['estimated_time']
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+            raise ValueError("estimated_time 必须是非负整数")
+        update['estimated_time'] = value
+    if 'priority' in item:
+        if item['priority'] not in PRIORITIES:
+            raise ValueError("priority 必须是 " + "/".join(PRIORITIES))
+        update['priority'] = item['priority']
+    if 'deadline' in item:
+        value = item['deadline']
+        if value is not None:
+            try:
+                value = datetime.fromisoformat(value).strftime("%Y-%m-%dT%H:%M:%S")
+            except (TypeError, ValueError):
+                raise ValueError("deadline 必须是ISO格式的时间")
+        update['deadline'] = value
+    if 'completed' in item:
+        if not isinstance(item['completed'], bool):
+            raise ValueError("completed 必须是 true 或 false")
+        update['completed'] = item['completed']
+    return item['id'], update
+
+
+def parse_variants(raw, max_variants):
+    """校验请求中的方案列表，格式错误时抛出 ValueError"""
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("variants 必须是非空列表")
+    if len(raw) > max_variants:
+        raise ValueError(f"方案数量不能超过 {max_variants}")
+
+    variants = []
+    for index, spec in enumerate(raw):
+        if not isinstance(spec, dict):
+            raise ValueError("每个方案必须是对象")
+        working_hours = None
+        if spec.get('working_hours'):
+            hours = spec['working_hours'] if isinstance(spec['working_hours'], dict) else {}
+            start, end = hours.get('start'), hours.get('end')
+            if not all(isinstance(value, int) and not isinstance(value, bool) for value in (start, end)) \
+                    or not 0 <= start < end <= 24:
+                raise ValueError("工作时间必须满足 0 <= start < end <= 24")
+            working_hours = (start, end)
+        overrides = dict(_parse_override(item) for item in spec.get('tasks') or [])
+        variants.append(Variant(str(spec.get('name') or f'variant-{index + 1}'), working_hours, overrides))
+    return variants
+
+
+def _apply_overrides(dynamic_tasks, overrides):
+    unknown = set(overrides) - {task.id for task in dynamic_tasks}
+    if unknown:
+        raise ValueError(f"任务不存在或已完成: {sorted(unknown)}")
+    return [task.model_copy(update=overrides[task.id]) if task.id in overrides else task for task in dynamic_tasks]
+
+
+class Simulation:
+    """一个用户在若干天内的模拟，缓存各方案共享的时间槽和优先级分数"""
+
+    def __init__(self, scheduler, regular_tasks, dynamic_tasks, dates, availability=None):
+        self.scheduler = scheduler
+        self.availability = availability
+        self.regular_tasks = regular_tasks
+        self.dynamic_tasks = dynamic_tasks
+        self.dates = dates
+        self._slots = {}
+        self._scores = {}
+        self._deadlines = DeadlineIndex(dynamic_tasks)
+
+    def _available_slots(self, date, working_hours):
+        key = (date, working_hours)
+        if key not in self._slots:
+            if working_hours is None:
+                slots = self.scheduler.free_slots(self.regular_tasks, date, availability=self.availability)
+            else:
+                slots = self.scheduler.free_slots(
+                    self.regular_tasks, date,
+                    working_hours_start=working_hours[0], working_hours_end=working_hours[1])
+            self._slots[key] = slots
+        return self._slots[key]
+
+    def _base_scores(self, date):
+        """基线的 (排好序的 (任务, 分数) 列表, {任务ID: 分数})"""
+        if date not in self._scores:
+            ranked = self.scheduler.score_tasks(self.dynamic_tasks, date, self._deadlines)
+            self._scores[date] = (ranked, {task.id: score for task, score in ranked})
+        return self._scores[date]
+
+    def _ranked_tasks(self, date, tasks, overrides):
+        ranked, scores = self._base_scores(date)
+        if not overrides:
+            return ranked
+        # 只重新计算修改过的任务；按原任务顺序稳定排序，与 score_tasks 的结果一致
+        tasks_with_score = [
+            (task, self.scheduler.calculate_priority_score(task, date) if task.id in overrides else scores[task.id])
+            for task in tasks if not task.completed and task.type == "dynamic"
+        ]
+        tasks_with_score.sort(key=lambda x: x[1], reverse=True)
+        return tasks_with_score
+
+    def run_variant(self, variant, include_schedule=False):
+        tasks = _apply_overrides(self.dynamic_tasks, variant.overrides) if variant.overrides else self.dynamic_tasks
+        days = {}
+        for date in self.dates:
+            ranked = self._ranked_tasks(date, tasks, variant.overrides)
+            placed = self.scheduler.place_tasks(ranked, self._available_slots(date, variant.working_hours))
+            placed_ids = {item.task_id for item in placed}
+            minutes = {task.id: task.estimated_time for task, _ in ranked}
+            day = {
+                "scheduled": [item.task_id for item in placed],
+                "dropped": [task.id for task, _ in ranked if task.id not in placed_ids],
+                "score_total": sum(item.priority_score for item in placed),
+                "scheduled_minutes": sum(minutes[task_id] for task_id in placed_ids),
+            }
+            if include_schedule:
+                day["schedule"] = sorted(placed + self.scheduler.regular_schedule_items(self.regular_tasks, date),
+                                         key=lambda x: x.start_time)
+            days[date] = day
+        return {
+            "name": variant.name,
+            "working_hours": ({"start": variant.working_hours[0], "end": variant.working_hours[1]}
+                              if variant.working_hours else None),
+            "days": days,
+            "scheduled_count": sum(len(day["scheduled"]) for day in days.values()),
+            "dropped_count": sum(len(day["dropped"]) for day in days.values()),
+            "score_total": sum(day["score_total"] for day in days.values()),
+        }
+
+
+def _compare(result, baseline):
+    """与基线比较：新增安排/不再安排的任务（按日期）及分数变化"""
+    added, removed = {}, {}
+    for date, day in result["days"].items():
+        base = set(baseline["days"][date]["scheduled"])
+        scheduled = set(day["scheduled"])
+        if scheduled - base:
+            added[date] = sorted(scheduled - base)
+        if base - scheduled:
+            removed[date] = sorted(base - scheduled)
+    return {
+        "newly_scheduled": added,
+        "newly_dropped": removed,
+        "score_delta": result["score_total"] - baseline["score_total"],
+    }
+
+
+def simulate(regular_tasks, dynamic_tasks, dates, variants, availability=None, include_schedule=False):
+    """评估基线和各方案，返回 {baseline, variants}；variants 中每项附带与基线的比较"""
+    from services.ai_scheduler import scheduler
+
+    simulation = Simulation(scheduler, regular_tasks, dynamic_tasks, dates, availability)
+    baseline = simulation.run_variant(BASELINE, include_schedule)
+    results = []
+    for variant in variants:
+        result = simulation.run_variant(variant, include_schedule)
+        result["comparison"] = _compare(result, baseline)
+        results.append(result)
+    return {"baseline": baseline, "variants": results}
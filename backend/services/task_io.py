@@ -0,0 +1,307 @@
+"""任务批量导入导出（CSV，安装pyarrow时支持Parquet）
+
+导入按块（IMPORT_CHUNK_SIZE 行）读取文件，每块用pandas向量化地校验和转换后批量插入，
+内存占用与文件大小无关。任一行有错误时整个导入回滚，并返回行级错误（dry_run 时只校验不写入）。
+导出按块查询并以CSV流式输出；Parquet写入临时文件（超过阈值时落盘）后发送。
+pandas和pyarrow在首次调用时才导入，不影响应用启动。
+"""
+import importlib.util
+import shutil
+import tempfile
+
+import sqlalchemy as sa
+
+from app import db
+from models.task import RegularTask, DynamicTask, TaskType, RepeatType, PriorityType
+from services.change_feed import record_changes
+from services.plan_cache import invalidate_plans
+
+FORMATS = ('csv', 'parquet')
+
+TRUE_VALUES = {'true', '1', 'yes', 'y', '是'}
+FALSE_VALUES = {'false', '0', 'no', 'n', '否'}
+
+# 导入的列：(列名, 类型, 是否必填, 参数)；text 的参数为最大长度，enum 的参数为 (枚举类, 默认值)
+IMPORT_COLUMNS = {
+    'regular': [
+        ('title', 'text', True, 200),
+        ('task_type', 'enum', False, (TaskType, TaskType.OTHER)),
+        ('location', 'text', False, 200),
+        ('start_time', 'datetime', True, None),
+        ('end_time', 'datetime', True, None),
+        ('repeat_type', 'enum', False, (RepeatType, RepeatType.SINGLE)),
+        ('repeat_details', 'text', False, 500),
+    ],
+    'dynamic': [
+        ('title', 'text', True, 200),
+        ('description', 'text', False, None),
+        ('priority', 'enum', False, (PriorityType, PriorityType.MEDIUM)),
+        ('estimated_time', 'integer', False, None),
+        ('deadline', 'datetime', False, None),
+        ('tags', 'text', False, 500),
+        ('is_completed', 'boolean', False, False),
+    ],
+}
+
+EXPORT_COLUMNS = {
+    'regular': ['id', 'title', 'task_type', 'location', 'start_time', 'end_time',
+                'repeat_type', 'repeat_details', 'created_at'],
+    'dynamic': ['id', 'title', 'description', 'priority', 'estimated_time', 'deadline',
+                'tags', 'is_completed', 'created_at', 'updated_at'],
+}
+
+INTEGER_COLUMNS = {'id', 'estimated_time'}
+
+MODELS = {
+    'regular': RegularTask,
+    'dynamic': DynamicTask,
+}
+
+
+class ImportResult:
+    def __init__(self, dry_run, max_errors):
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.total_rows = 0
+        self.valid_rows = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_errors(self, rows, column, message):
+        self.error_count += len(rows)
+        for row in rows[:max(0, self.max_errors - len(self.errors))]:
+            self.errors.append({"row": row, "column": column, "error": message})
+
+    def to_dict(self):
+        return {
+            "dry_run": self.dry_run,
+            "total_rows": self.total_rows,
+            "imported": 0 if self.dry_run or self.error_count else self.valid_rows,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def spool(stream, max_memory):
+    """将请求体复制到临时文件（小文件留在内存），供分块读取和随机访问"""
+    buffer = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    shutil.copyfileobj(stream, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _read_chunks(fileobj, fmt, chunk_size):
+    """逐块读取为所有列均为字符串的DataFrame（缺失值为空字符串）"""
+    import pandas as pd
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(fileobj).iter_batches(batch_size=chunk_size):
+            df = batch.to_pandas()
+            yield pd.DataFrame({
+                column: df[column].astype(object).where(df[column].notna(), '').map(str)
+                for column in df.columns
+            })
+    else:
+        yield from pd.read_csv(fileobj, dtype=str, keep_default_na=False, chunksize=chunk_size,
+                               encoding='utf-8-sig', skipinitialspace=True)
+
+
+def _parse_datetimes(values):
+    import pandas as pd
+
+    try:
+        parsed = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    except (TypeError, ValueError):  # pandas<2.0 不支持 format='ISO8601'
+        parsed = pd.to_datetime(values, errors='coerce')
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_localize(None)
+    return parsed
+
+
+def _python_values(series, kind):
+    """转换为写入数据库的Python对象列表，缺失值为None"""
+    import pandas as pd
+
+    missing = series.isna().tolist()
+    if kind == 'datetime':
+        return [None if m else value.to_pydatetime() for value, m in zip(series, missing)]
+    if kind == 'integer':
+        return [None if m else int(value) for value, m in zip(series, missing)]
+    if kind == 'boolean':
+        return [bool(value) for value in series]
+    return [None if m or value is pd.NA else value for value, m in zip(series, missing)]
+
+
+def _convert_column(result, values, rows, name, kind, required, param):
+    """向量化地校验一列，返回转换后的Series（无效行的值为缺失）"""
+    import pandas as pd
+
+    values = values.str.strip()
+    empty = values == ''
+    if required:
+        result.add_errors(rows[empty].tolist(), name, "不能为空")
+
+    if kind == 'text':
+        if param:
+            too_long = values.str.len() > param
+            result.add_errors(rows[too_long].tolist(), name, f"长度超过{param}")
+        return values.where(~empty, None)
+
+    if kind == 'enum':
+        enum_class, default = param
+        members = {member.value: member for member in enum_class}
+        converted = values.str.lower().map(members)
+        invalid = converted.isna() & ~empty
+        result.add_errors(rows[invalid].tolist(), name, "无效的取值，可选: " + "/".join(members))
+        return converted.where(~empty, default)
+
+    if kind == 'datetime':
+        converted = _parse_datetimes(values.where(~empty, None))
+        invalid = converted.isna() & ~empty
+        result.add_errors(rows[invalid].tolist(), name, "无效的时间格式，请使用ISO格式")
+        return converted
+
+    if kind == 'integer':
+        numbers = pd.to_numeric(values.where(~empty, None), errors='coerce')
+        invalid = ~empty & (numbers.isna() | (numbers < 0) | (numbers % 1 != 0))
+        result.add_errors(rows[invalid].tolist(), name, "必须是非负整数")
+        return numbers.where(~invalid).astype('Int64')
+
+    if kind == 'boolean':
+        lowered = values.str.lower()
+        is_true = lowered.isin(TRUE_VALUES)
+        invalid = ~empty & ~is_true & ~lowered.isin(FALSE_VALUES)
+        result.add_errors(rows[invalid].tolist(), name, "必须是 true 或 false")
+        return is_true | (empty & bool(param))
+
+    raise ValueError(f"未知的列类型: {kind}")
+
+
+def _convert_chunk(result, task_kind, df, first_row, build_records=True):
+    """校验并转换一块数据，返回可批量插入的记录列表（只校验时返回有效行数）"""
+    import pandas as pd
+
+    rows = pd.Series(range(first_row, first_row + len(df)), index=df.index)
+    error_count = result.error_count
+    columns = {}
+    for name, kind, required, param in IMPORT_COLUMNS[task_kind]:
+        values = df[name] if name in df.columns else pd.Series('', index=df.index)
+        columns[name] = (_convert_column(result, values.astype(str), rows, name, kind, required, param), kind)
+
+    if task_kind == 'regular':
+        start, end = columns['start_time'][0], columns['end_time'][0]
+        result.add_errors(rows[start.notna() & end.notna() & (end <= start)].tolist(),
+                          'end_time', "结束时间必须晚于开始时间")
+
+    if result.error_count > error_count:
+        return []
+    if not build_records:
+        return len(df)
+    names = list(columns)
+    lists = [_python_values(series, kind) for series, kind in columns.values()]
+    return [dict(zip(names, values)) for values in zip(*lists)]
+
+
+def import_tasks(user_id, task_kind, fileobj, fmt, dry_run, config):
+    """导入任务，返回 ImportResult；有错误或 dry_run 时不写入"""
+    result = ImportResult(dry_run, config['IMPORT_MAX_ERRORS'])
+    model = MODELS[task_kind]
+    required = [name for name, _, is_required, _ in IMPORT_COLUMNS[task_kind] if is_required]
+    inserted_ids = []
+
+    try:
+        for df in _read_chunks(fileobj, fmt, config['IMPORT_CHUNK_SIZE']):
+            missing = [name for name in required if name not in df.columns]
+            if missing:
+                result.add_errors([0], ','.join(missing), "缺少必需的列")
+                break
+            # 出现错误后只继续校验，不再转换和写入
+            write = not dry_run and not result.error_count
+            records = _convert_chunk(result, task_kind, df, result.total_rows + 1, build_records=write)
+            result.total_rows += len(df)
+            if result.total_rows > config['IMPORT_MAX_ROWS']:
+                result.add_errors([result.total_rows], None, f"行数超过上限 {config['IMPORT_MAX_ROWS']}")
+                break
+            if not write:
+                continue
+            result.valid_rows += len(records)
+            if records and not result.error_count:
+                for record in records:
+                    record['user_id'] = user_id
+                # 直接对表做executemany（ORM批量插入会按空值组合拆分语句）
+                table = model.__table__
+                inserted_ids += db.session.execute(sa.insert(table).returning(table.c.id), records).scalars().all()
+
+        if dry_run or result.error_count or not inserted_ids:
+            db.session.rollback()
+            return result
+        record_changes(db.session, [(user_id, task_kind, task_id, False) for task_id in inserted_ids])
+        invalidate_plans(db.session, {user_id})
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _export_frames(user_id, task_kind, chunk_size):
+    import pandas as pd
+
+    model = MODELS[task_kind]
+    columns = EXPORT_COLUMNS[task_kind]
+    result = db.session.execute(
+        sa.select(*[getattr(model, column) for column in columns])
+        .where(model.user_id == user_id)
+        .order_by(model.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for rows in result.partitions():
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        for column in df.columns:
+            if column in INTEGER_COLUMNS:
+                df[column] = df[column].astype('Int64')
+            elif df[column].dtype == object:
+                # 枚举导出为其取值，与导入格式一致
+                df[column] = df[column].map(lambda value: getattr(value, 'value', value))
+        yield df
+
+
+def export_csv(user_id, task_kind, chunk_size):
+    """逐块生成CSV文本"""
+    header = True
+    for df in _export_frames(user_id, task_kind, chunk_size):
+        yield df.to_csv(index=False, header=header, date_format='%Y-%m-%dT%H:%M:%S')
+        header = False
+    if header:
+        yield ','.join(EXPORT_COLUMNS[task_kind]) + '\n'
+
+
+def _parquet_schema(task_kind):
+    import pyarrow as pa
+
+    types = {
+        'id': pa.int64(), 'estimated_time': pa.int64(), 'is_completed': pa.bool_(),
+        'start_time': pa.timestamp('us'), 'end_time': pa.timestamp('us'), 'deadline': pa.timestamp('us'),
+        'created_at': pa.timestamp('us'), 'updated_at': pa.timestamp('us'),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in EXPORT_COLUMNS[task_kind]])
+
+
+def export_parquet(user_id, task_kind, chunk_size, max_memory):
+    """将任务逐块写入Parquet临时文件（每块一个row group），返回已定位到开头的文件对象"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(task_kind)
+    buffer = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for df in _export_frames(user_id, task_kind, chunk_size):
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,162 @@
+"""调度器数据加载
+
+AI路由需要的用户校验、常规任务和动态任务合并为一条 UNION ALL 查询，只取调度器
+用到的列和行，结果在同一请求内按参数缓存。
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from flask import g
+
+from app import db
+from models.task import RegularTask, DynamicTask, RepeatType
+from models.user import User
+from services.user_cache import get_cached_user
+
+# 数据库重复类型到调度器重复规则的映射
+REPEAT_RULES = {
+    RepeatType.DAILY: "daily",
+    RepeatType.WEEKLY: "weekly",
+    RepeatType.SINGLE: "once"
+}
+
+UserTaskData = namedtuple('UserTaskData', ['regular_tasks', 'dynamic_tasks'])
+
+# 行类型标记
+KIND_USER = 'u'
+KIND_REGULAR = 'r'
+KIND_DYNAMIC = 'd'
+
+
+def format_datetime(value):
+    """将数据库时间转换为调度器使用的字符串格式"""
+    return value.strftime("%Y-%m-%dT%H:%M:%S") if value else None
+
+
+def _null(column):
+    """与指定列同类型的NULL，使UNION各分支的结果类型一致"""
+    return sa.type_coerce(sa.null(), column.type)
+
+
+def _select(kind, id_column, title=None, start_time=None, end_time=None, location=None,
+            repeat_type=None, priority=None, estimated_time=None, deadline=None, tags=None,
+            is_completed=None, created_at=None, updated_at=None):
+    columns = {
+        "title": (title, RegularTask.title),
+        "start_time": (start_time, RegularTask.start_time),
+        "end_time": (end_time, RegularTask.end_time),
+        "location": (location, RegularTask.location),
+        "repeat_type": (repeat_type, RegularTask.repeat_type),
+        "priority": (priority, DynamicTask.priority),
+        "estimated_time": (estimated_time, DynamicTask.estimated_time),
+        "deadline": (deadline, DynamicTask.deadline),
+        "tags": (tags, DynamicTask.tags),
+        "is_completed": (is_completed, DynamicTask.is_completed),
+        "created_at": (created_at, DynamicTask.created_at),
+        "updated_at": (updated_at, DynamicTask.updated_at),
+    }
+    return sa.select(
+        sa.literal(kind).label("kind"),
+        id_column.label("id"),
+        *[(value if value is not None else _null(typed)).label(name)
+          for name, (value, typed) in columns.items()]
+    )
+
+
+def build_query(user_id, window_start=None, window_end=None, created_since=None, check_user=True):
+    """构造加载查询
+
+    指定 window_start/window_end（date）时：只取未完成的动态任务，以及每日/每周任务和
+    发生在窗口内的单次任务；指定 created_since（datetime）时：取该时间之后创建的全部任务。
+    check_user 为False时（用户已在缓存中）不再查询user表。
+    """
+    regular_part = _select(
+        KIND_REGULAR, RegularTask.id,
+        title=RegularTask.title,
+        start_time=RegularTask.start_time,
+        end_time=RegularTask.end_time,
+        location=RegularTask.location,
+        repeat_type=RegularTask.repeat_type,
+        created_at=RegularTask.created_at
+    ).where(RegularTask.user_id == user_id)
+
+    dynamic_part = _select(
+        KIND_DYNAMIC, DynamicTask.id,
+        title=DynamicTask.title,
+        priority=DynamicTask.priority,
+        estimated_time=DynamicTask.estimated_time,
+        deadline=DynamicTask.deadline,
+        tags=DynamicTask.tags,
+        is_completed=DynamicTask.is_completed,
+        created_at=DynamicTask.created_at,
+        updated_at=DynamicTask.updated_at
+    ).where(DynamicTask.user_id == user_id)
+
+    if window_start is not None:
+        window_begin = datetime.combine(window_start, datetime.min.time())
+        window_stop = datetime.combine(window_end + timedelta(days=1), datetime.min.time())
+        regular_part = regular_part.where(sa.or_(
+            RegularTask.repeat_type.in_([RepeatType.DAILY, RepeatType.WEEKLY]),
+            sa.and_(RegularTask.start_time >= window_begin, RegularTask.start_time < window_stop)
+        ))
+        dynamic_part = dynamic_part.where(DynamicTask.is_completed.isnot(True))
+
+    if created_since is not None:
+        regular_part = regular_part.where(RegularTask.created_at >= created_since)
+        dynamic_part = dynamic_part.where(DynamicTask.created_at >= created_since)
+
+    if not check_user:
+        return sa.union_all(regular_part, dynamic_part)
+    user_part = _select(KIND_USER, User.id).where(User.id == user_id)
+    return sa.union_all(user_part, regular_part, dynamic_part)
+
+
+def _to_scheduler_tasks(rows, user_found):
+    from services.ai_scheduler import Task
+
+    regular_tasks, dynamic_tasks = [], []
+    for row in rows:
+        if row.kind == KIND_USER:
+            user_found = True
+        elif row.kind == KIND_REGULAR:
+            regular_tasks.append(Task(
+                id=row.id,
+                title=row.title,
+                type="regular",
+                start_time=format_datetime(row.start_time),
+                end_time=format_datetime(row.end_time),
+                location=row.location,
+                repeat_rule=REPEAT_RULES.get(row.repeat_type, "once"),
+                created_at=format_datetime(row.created_at)
+            ))
+        else:
+            completed = bool(row.is_completed)
+            dynamic_tasks.append(Task(
+                id=row.id,
+                title=row.title,
+                type="dynamic",
+                priority=row.priority.value if row.priority else None,
+                estimated_time=row.estimated_time,
+                deadline=format_datetime(row.deadline),
+                tags=[tag.strip() for tag in row.tags.split(',') if tag.strip()] if row.tags else None,
+                completed=completed,
+                created_at=format_datetime(row.created_at),
+                # 动态任务完成时会刷新updated_at，以此作为完成时间
+                completed_at=format_datetime(row.updated_at) if completed else None
+            ))
+
+    if not user_found:
+        return None
+    return UserTaskData(regular_tasks, dynamic_tasks)
+
+
+def load_user_tasks(user_id, window_start=None, window_end=None, created_since=None):
+    """加载调度器所需的用户任务，用户不存在时返回None；同一请求内相同参数只查询一次"""
+    cache = g.setdefault('user_task_data', {})
+    key = (user_id, window_start, window_end, created_since)
+    if key not in cache:
+        user_cached = get_cached_user(user_id) is not None
+        query = build_query(user_id, window_start, window_end, created_since, check_user=not user_cached)
+        cache[key] = _to_scheduler_tasks(db.session.execute(query).all(), user_cached)
+    return cache[key]
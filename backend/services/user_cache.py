@@ -0,0 +1,62 @@
+"""已认证用户缓存
+
+按用户ID缓存用户的基本信息，AI路由在缓存命中时不再查询user表。
+密码哈希不缓存：登录时总是从数据库读取，修改密码、重新哈希或删除账号后在所有worker中立即生效
+（登录本身受密码哈希计算的开销限制，多一次按邮箱的索引查询可以忽略）。
+本进程内对User的修改和删除会立即失效对应条目，其他worker依赖TTL过期。
+"""
+from collections import namedtuple
+
+from sqlalchemy import event
+
+from models.user import User
+from utils.cache import LRUCache
+
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'email'])
+
+# 导出单例实例（容量和TTL在 init_user_cache 中按配置设置）
+user_cache = LRUCache(maxsize=10000, ttl=60)
+
+
+def init_user_cache(app):
+    user_cache.maxsize = app.config['USER_CACHE_SIZE']
+    user_cache.ttl = app.config['USER_CACHE_TTL']
+
+
+def _remember(user):
+    cached = CachedUser(user.id, user.username, user.email)
+    user_cache.set(cached.id, cached)
+    return cached
+
+
+def get_user(user_id):
+    """按ID获取缓存的用户信息，不存在时返回None"""
+    cached = user_cache.get(int(user_id))
+    if cached is None:
+        user = User.query.with_entities(User.id, User.username, User.email).filter(User.id == int(user_id)).first()
+        cached = _remember(user) if user else None
+    return cached
+
+
+def get_cached_user(user_id):
+    """只查缓存，不访问数据库"""
+    return user_cache.get(int(user_id))
+
+
+def get_login_user(email):
+    """登录使用：从数据库读取用户信息和密码哈希并刷新缓存，不存在时返回None"""
+    user = User.query.with_entities(User.id, User.username, User.email, User.password_hash) \
+        .filter(User.email == email).first()
+    if user:
+        _remember(user)
+    return user
+
+
+def invalidate_user(user_id):
+    user_cache.delete(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target.id)
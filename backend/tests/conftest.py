@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp_path, 'test.db')}",
+        'RATE_LIMIT_ENABLED': False,
+        'PLAN_WARM_ON_LOGIN': False,
+        'LOG_CONFIGURE': False,
+    })
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """注册并登录用户，返回带JWT的请求头"""
+    def register_user(name, password='test-password'):
+        email = f"{name}@example.com"
+        client.post('/api/auth/register', json={"username": name, "email": email, "password": password})
+        token = client.post('/api/auth/login', json={"email": email, "password": password}).get_json()['access_token']
+        return {'Authorization': f"Bearer {token}"}
+    return register_user
@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture
+def profiling_app(app, tmp_path):
+    app.config.update(PROFILER_ENABLED=True, PROFILER_OUTPUT_DIR=str(tmp_path / 'profiles'))
+    return app
+
+
+def test_profiler_routes_require_admin(profiling_app, client, register):
+    admin = register('admin')
+    user = register('user')
+    profiling_app.config['ADMIN_USER_IDS'] = {1}
+
+    assert client.get('/api/admin/profile/sampler-1-1', headers=user).status_code == 403
+    assert client.get('/api/admin/profile/sampler-1-1', headers=admin).status_code == 404
+
+
+def test_profile_header_ignored_for_non_admin(profiling_app, client, register):
+    admin = register('admin')
+    user = register('user')
+    profiling_app.config['ADMIN_USER_IDS'] = {1}
+
+    response = client.get('/api/tasks/dynamic', headers={**user, 'X-Profile': 'cprofile'})
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+
+    response = client.get('/api/tasks/dynamic', headers={**admin, 'X-Profile': 'cprofile'})
+    assert response.headers['X-Profile-Id'].startswith('cprofile-')
@@ -0,0 +1,23 @@
+import sqlalchemy as sa
+
+from app import db
+from models.user import User
+from services.passwords import hash_password
+
+
+def login(client, password):
+    return client.post('/api/auth/login', json={"email": "alice@example.com", "password": password})
+
+
+def test_login_sees_password_change_from_another_worker(app, client, register):
+    register('alice', password='old-password')
+    assert login(client, 'old-password').status_code == 200
+
+    # 绕过ORM事件直接更新，相当于另一个worker修改了密码，本进程的缓存不会收到失效通知
+    with app.app_context():
+        db.session.execute(sa.update(User).where(User.email == 'alice@example.com')
+                           .values(password_hash=hash_password('new-password')))
+        db.session.commit()
+
+    assert login(client, 'old-password').status_code == 401
+    assert login(client, 'new-password').status_code == 200
@@ -0,0 +1,47 @@
+import pytest
+
+
+@pytest.mark.parametrize('payload', [
+    {"weekly_hours": {"mon": None}},
+    {"weekly_hours": {"mon": "09:00-12:00"}},
+    {"breaks": [{"start": "12:00", "end": "13:00", "days": 5}]},
+    {"breaks": {"start": "12:00", "end": "13:00"}},
+    ["mon"],
+])
+def test_malformed_profile_is_rejected_with_400(client, register, payload):
+    response = client.put('/api/ai/availability', headers=register('alice'), json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_profile_updates_read_the_primary_when_replica_lags(tmp_path):
+    import os
+    import shutil
+
+    from app import create_app, db
+
+    primary = os.path.join(tmp_path, 'primary.db')
+    replica = os.path.join(tmp_path, 'replica.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{primary}",
+        'DATABASE_REPLICA_URL': f"sqlite:///{replica}",
+        'RATE_LIMIT_ENABLED': False,
+        'PLAN_WARM_ON_LOGIN': False,
+        'LOG_CONFIGURE': False,
+    })
+    client = app.test_client()
+    client.post('/api/auth/register', json={"username": "alice", "email": "alice@example.com",
+                                            "password": "test-password"})
+    token = client.post('/api/auth/login', json={"email": "alice@example.com",
+                                                 "password": "test-password"}).get_json()['access_token']
+    headers = {'Authorization': f"Bearer {token}"}
+    # 副本停留在保存配置之前的状态
+    shutil.copyfile(primary, replica)
+
+    try:
+        assert client.put('/api/ai/availability', headers=headers, json={"min_duration": 45}).status_code == 200
+        assert client.put('/api/ai/availability', headers=headers, json={"min_duration": 60}).status_code == 200
+        assert client.delete('/api/ai/availability', headers=headers).status_code == 200
+    finally:
+        # 副本的bind记录在全局的 db 上，避免影响之后创建的应用
+        db.metadatas.pop('replica', None)
@@ -0,0 +1,55 @@
+import gzip
+
+import sqlalchemy as sa
+
+from app import db
+from models.calendar_token import CalendarToken
+
+
+def _feed_url(client, headers, title):
+    client.post('/api/tasks/regular', headers=headers, json={
+        "title": title, "start_time": "2024-03-04T09:00:00", "end_time": "2024-03-04T10:00:00",
+        "repeat_type": "weekly",
+    })
+    token = client.post('/api/calendar/token', headers=headers).get_json()['token']
+    return f"/api/calendar/{token}.ics"
+
+
+def test_feeds_with_same_data_version_do_not_share_etag_or_body(app, client, register):
+    app.config['COMPRESS_MIN_SIZE'] = 0
+    alice_url = _feed_url(client, register('alice'), "Alice的私人任务")
+    bob_url = _feed_url(client, register('bob'), "Bob的任务")
+
+    alice = client.get(alice_url, headers={'Accept-Encoding': 'gzip'})
+    bob = client.get(bob_url, headers={'Accept-Encoding': 'gzip'})
+
+    # 两个用户各有一次变更，数据版本相同
+    assert alice.headers['ETag'] != bob.headers['ETag']
+    bob_body = gzip.decompress(bob.data).decode('utf-8')
+    assert "Bob的任务" in bob_body
+    assert "Alice的私人任务" not in bob_body
+
+
+def test_compressed_feed_etag_supports_conditional_get(app, client, register):
+    app.config['COMPRESS_MIN_SIZE'] = 0
+    url = _feed_url(client, register('alice'), "任务")
+
+    first = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    again = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_revoked_token_stops_working_on_every_worker(app, client, register):
+    url = _feed_url(client, register('alice'), "任务")
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'TZID:Asia/Shanghai' in response.get_data(as_text=True)
+
+    # 直接删除令牌，相当于另一个worker处理了撤销请求
+    with app.app_context():
+        db.session.execute(sa.delete(CalendarToken))
+        db.session.commit()
+
+    assert client.get(url).status_code == 404
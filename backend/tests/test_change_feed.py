@@ -0,0 +1,80 @@
+from app import db
+from services.change_feed import compact_changes
+
+
+def create_task(client, headers, title):
+    response = client.post('/api/tasks/dynamic', headers=headers,
+                           json={"title": title, "priority": "medium", "estimated_time": 30})
+    return response.get_json()['task_id']
+
+
+def get_changes(client, headers, **params):
+    response = client.get('/api/tasks/changes', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def summarize(changes):
+    return ({task['id']: task['title'] for task in changes['dynamic']['updated']},
+            sorted(changes['dynamic']['deleted']))
+
+
+def test_old_cursor_after_compaction_gets_final_state_and_tombstones(app, client, register):
+    headers = register('alice')
+    snapshot = get_changes(client, headers)
+    assert snapshot['full'] and snapshot['cursor'] == 0
+
+    a = create_task(client, headers, "A")
+    after_a = get_changes(client, headers, since=0)['cursor']
+    b = create_task(client, headers, "B")
+    c = create_task(client, headers, "C")
+    client.put(f'/api/tasks/dynamic/{a}', headers=headers, json={"title": "A2"})
+    client.delete(f'/api/tasks/dynamic/{b}', headers=headers)
+
+    with app.app_context():
+        # A 和 B 的创建记录被后来的修改和删除取代
+        assert compact_changes() == 2
+        db.session.remove()
+
+    changes = get_changes(client, headers, since=0)
+    assert summarize(changes) == ({a: "A2", c: "C"}, [b])
+    assert not changes['has_more'] and not changes['full']
+
+    assert summarize(get_changes(client, headers, since=after_a)) == ({a: "A2", c: "C"}, [b])
+
+    latest = changes['cursor']
+    unchanged = get_changes(client, headers, since=latest)
+    assert unchanged['cursor'] == latest
+    assert summarize(unchanged) == ({}, [])
+
+
+def test_changes_are_paged_in_seq_order(app, client, register):
+    headers = register('alice')
+    ids = [create_task(client, headers, f"T{i}") for i in range(3)]
+    client.delete(f'/api/tasks/dynamic/{ids[1]}', headers=headers)
+
+    cursor, updated, deleted, pages = 0, {}, [], 0
+    while True:
+        changes = get_changes(client, headers, since=cursor, limit=2)
+        pages += 1
+        page_updated, page_deleted = summarize(changes)
+        updated.update(page_updated)
+        deleted += page_deleted
+        cursor = changes['cursor']
+        if not changes['has_more']:
+            break
+    assert pages == 2
+    # T1 在第一页之后被删除，第一页中查不到它，墓碑在第二页返回
+    assert deleted == [ids[1]]
+    assert set(updated) == {ids[0], ids[2]}
+
+
+def test_changes_are_scoped_to_the_user(app, client, register):
+    alice = register('alice')
+    bob = register('bob')
+    create_task(client, alice, "Alice的任务")
+
+    changes = get_changes(client, bob, since=0)
+    assert changes['cursor'] == 0
+    assert summarize(changes) == ({}, [])
+    assert get_changes(client, bob)['dynamic']['updated'] == []
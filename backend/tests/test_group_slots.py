@@ -0,0 +1,19 @@
+def _group_slots(client, headers, user_ids):
+    return client.post('/api/ai/group-slots', headers=headers,
+                       json={"start_date": "2024-03-04", "user_ids": user_ids})
+
+
+def test_members_must_opt_in_and_unknown_ids_are_not_disclosed(client, register):
+    alice = register('alice')
+    bob = register('bob')
+
+    not_shared = _group_slots(client, alice, [2])
+    unknown = _group_slots(client, alice, [999])
+    assert not_shared.status_code == unknown.status_code == 403
+    assert not_shared.get_json() == unknown.get_json()
+
+    assert client.put('/api/ai/free-busy-sharing', headers=bob).get_json()['sharing'] is True
+    assert _group_slots(client, alice, [2]).status_code == 200
+
+    client.delete('/api/ai/free-busy-sharing', headers=bob)
+    assert _group_slots(client, alice, [2]).status_code == 403
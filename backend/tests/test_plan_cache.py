@@ -0,0 +1,35 @@
+from datetime import date
+
+
+def test_plans_computed_before_a_write_are_not_served(app, client, register):
+    from services.change_feed import data_version
+    from services.plan_cache import generate_plans, get_plans, store_plans
+
+    headers = register('alice')
+    client.post('/api/tasks/dynamic', headers=headers, json={"title": "旧任务", "estimated_time": 60})
+    day = date(2024, 3, 4)
+    with app.app_context():
+        # 预热时取到的版本和任务快照
+        version = data_version(1)
+        plans = generate_plans(1, [day])
+
+    # 预热期间提交的写入删除了已保存的日程
+    client.post('/api/tasks/dynamic', headers=headers, json={"title": "新任务", "estimated_time": 30})
+
+    with app.app_context():
+        store_plans(1, plans, version)
+        assert get_plans(1, [day]) == {}
+        assert get_plans(1, [day], version) != {}
+
+
+def test_stale_plan_rows_are_not_copied_into_the_shared_cache(app, client, register):
+    from services.plan_cache import get_schedules, schedule_cache, store_plans
+
+    headers = register('alice')
+    client.post('/api/tasks/dynamic', headers=headers, json={"title": "任务", "estimated_time": 60})
+    day = date(2024, 3, 4)
+    with app.app_context():
+        store_plans(1, {day: []}, 'stale')
+        schedule_cache.local.clear()
+        schedules = get_schedules(1, [day])
+    assert [item['title'] for item in schedules[day]] == ["任务"]
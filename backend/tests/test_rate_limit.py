@@ -0,0 +1,120 @@
+import os
+import types
+
+import pytest
+
+from app import create_app
+from utils import rate_limit
+from utils.rate_limit import ConcurrencyLimiter, MemoryBucketStore, RateLimiter, llm_admission, parse_rate
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的 time.monotonic"""
+    fake = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(rate_limit, 'time', types.SimpleNamespace(monotonic=lambda: fake.now))
+    return fake
+
+
+def test_parse_rate():
+    assert parse_rate('30/minute') == (30, 0.5)
+    assert parse_rate('5/10') == (5, 0.5)
+
+
+def test_bucket_refills_over_time(clock):
+    store = MemoryBucketStore()
+    capacity, rate = parse_rate('2/minute')
+
+    assert store.consume('user', capacity, rate)[0]
+    assert store.consume('user', capacity, rate)[0]
+    assert not store.consume('user', capacity, rate)[0]
+
+    clock.now += 29
+    assert not store.consume('user', capacity, rate)[0]
+    clock.now += 1
+    assert store.consume('user', capacity, rate)[0]
+
+    # 补充的令牌不超过容量
+    clock.now += 3600
+    assert store.consume('user', capacity, rate) == (True, 1)
+
+
+def test_buckets_are_per_key_and_evict_least_recently_used(clock):
+    store = MemoryBucketStore(max_keys=2)
+    store.consume('a', 1, 1)
+    assert store.consume('b', 1, 1)[0]
+    store.consume('c', 1, 1)
+    # a 已被淘汰，重新从满桶开始
+    assert store.consume('a', 1, 1)[0]
+
+
+def test_hit_returns_retry_after(clock):
+    limiter = RateLimiter(MemoryBucketStore(), {'ai': parse_rate('2/8')})
+    assert limiter.hit('ai', 1) == (True, 0)
+    assert limiter.hit('ai', 1) == (True, 0)
+    assert limiter.hit('ai', 1) == (False, 4)
+    clock.now += 1
+    assert limiter.hit('ai', 1) == (False, 3)
+    clock.now += 3
+    assert limiter.hit('ai', 1) == (True, 0)
+    # 其他用户和未配置的路由类别不受影响
+    assert limiter.hit('ai', 2) == (True, 0)
+    assert limiter.hit('other', 1) == (True, 0)
+
+
+def test_hit_allows_when_store_fails():
+    class BrokenStore:
+        def consume(self, *args):
+            raise ConnectionError('down')
+
+    assert RateLimiter(BrokenStore(), {'ai': parse_rate('1/minute')}).hit('ai', 1) == (True, 0)
+
+
+def test_route_returns_429_with_retry_after(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp_path, 'limit.db')}",
+        'RATE_LIMITS': {'ai_schedule': '1/minute'},
+        'PLAN_WARM_ON_LOGIN': False,
+        'LOG_CONFIGURE': False,
+    })
+    client = app.test_client()
+    client.post('/api/auth/register', json={"username": "alice", "email": "alice@example.com",
+                                            "password": "test-password"})
+    token = client.post('/api/auth/login', json={"email": "alice@example.com",
+                                                 "password": "test-password"}).get_json()['access_token']
+    headers = {'Authorization': f"Bearer {token}"}
+
+    assert client.post('/api/ai/generate-schedule', headers=headers, json={"date": "2024-03-04"}).status_code == 200
+    response = client.post('/api/ai/generate-schedule', headers=headers, json={"date": "2024-03-04"})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '60'
+
+
+def test_llm_admission_releases_lease_when_view_raises(app):
+    limiter = app.extensions['llm_limiter'] = ConcurrencyLimiter(1)
+
+    @llm_admission
+    def failing_view():
+        raise RuntimeError('boom')
+
+    with app.test_request_context():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                failing_view()
+    assert limiter.acquire() is True
+
+
+def test_llm_admission_rejects_when_no_slot(app):
+    limiter = app.extensions['llm_limiter'] = ConcurrencyLimiter(1)
+    lease = limiter.acquire()
+
+    @llm_admission
+    def view():
+        return 'ok'
+
+    with app.test_request_context():
+        response = view()
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(app.config['LLM_RETRY_AFTER'])
+        limiter.release(lease)
+        assert view() == 'ok'
@@ -0,0 +1,96 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.ai_scheduler import FreeSlots, ScheduleItem, Task, scheduler
+
+DAY = datetime(2024, 3, 4)
+
+
+def linear_first_fit(tasks_with_score, available_slots):
+    """线段树之前的实现：逐个扫描时间槽字典，放入第一个足够长的时间槽"""
+    available_slots = list(available_slots)
+    schedule = []
+    for task, score in tasks_with_score:
+        if not task.estimated_time:
+            continue
+        for slot_idx, slot in enumerate(available_slots):
+            if slot["duration"] >= task.estimated_time:
+                start_time = datetime.strptime(slot["start"], "%Y-%m-%dT%H:%M:%S")
+                end_time = start_time + timedelta(minutes=task.estimated_time)
+                schedule.append(ScheduleItem(task.id, task.title, start_time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                             end_time.strftime("%Y-%m-%dT%H:%M:%S"), score, min(1.0, score / 300)))
+                if end_time < datetime.strptime(slot["end"], "%Y-%m-%dT%H:%M:%S"):
+                    available_slots[slot_idx] = {"start": end_time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                                 "end": slot["end"],
+                                                 "duration": slot["duration"] - task.estimated_time}
+                else:
+                    available_slots.pop(slot_idx)
+                break
+    return schedule
+
+
+def make_slots(intervals):
+    slots = FreeSlots(DAY)
+    for start, end in intervals:
+        slots.append(start, end)
+    return slots
+
+
+def make_tasks(durations):
+    return [(Task(id=i + 1, title=f"任务{i + 1}", type='dynamic', estimated_time=duration), 300 - i)
+            for i, duration in enumerate(durations)]
+
+
+def assert_matches_linear(intervals, durations):
+    slots = make_slots(intervals)
+    tasks = make_tasks(durations)
+    expected = linear_first_fit(tasks, slots.to_dicts())
+    assert scheduler.place_tasks(tasks, slots) == expected
+    return expected
+
+
+@pytest.mark.parametrize('intervals, durations', [
+    # 恰好放满：时间槽被占满后，后续任务进入下一个时间槽
+    ([(540, 600), (660, 720)], [60, 60, 30]),
+    # 分割：剩余部分从任务结束时开始，之后的短任务仍放入同一时间槽
+    ([(540, 720)], [45, 30, 90, 15]),
+    # 剩余时长为0的时间槽不能再放任务
+    ([(540, 570), (600, 660)], [30, 15, 60]),
+    # 比所有时间槽都长的任务被跳过，不影响后面的任务
+    ([(540, 600), (660, 750)], [120, 60, 90, 30]),
+    # 没有预计时间的任务被跳过
+    ([(540, 600)], [None, 0, 30]),
+    # 没有时间槽
+    ([], [30]),
+])
+def test_place_tasks_matches_linear_first_fit(intervals, durations):
+    assert_matches_linear(intervals, durations)
+
+
+def test_place_tasks_examples():
+    schedule = assert_matches_linear([(540, 600), (660, 720)], [60, 30, 90, 30])
+    assert [(item.task_id, item.start_time, item.end_time) for item in schedule] == [
+        (1, "2024-03-04T09:00:00", "2024-03-04T10:00:00"),
+        (2, "2024-03-04T11:00:00", "2024-03-04T11:30:00"),
+        (4, "2024-03-04T11:30:00", "2024-03-04T12:00:00"),
+    ]
+
+
+def test_place_tasks_does_not_modify_slots():
+    slots = make_slots([(540, 600)])
+    scheduler.place_tasks(make_tasks([30]), slots)
+    assert list(slots.starts) == [540] and list(slots.ends) == [600]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_place_tasks_matches_linear_first_fit_random(seed):
+    rng = random.Random(seed)
+    intervals, cursor = [], 0
+    for _ in range(rng.randint(1, 12)):
+        start = cursor + rng.randint(0, 60)
+        cursor = start + rng.choice([15, 30, 45, 60, 90, 120, 180])
+        intervals.append((start, cursor))
+    durations = [rng.choice([None, 15, 30, 45, 60, 90, 120, 240]) for _ in range(rng.randint(1, 40))]
+    assert_matches_linear(intervals, durations)
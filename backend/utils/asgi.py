@@ -0,0 +1,200 @@
+"""ASGI服务模式
+
+Flask应用本身是同步的。在ASGI服务器（uvicorn）下运行时，AsgiApp 按 (方法, 路径) 把少数请求交给
+原生的协程处理函数，它们在事件循环中等待外部服务或数据变更，不占用线程；其余请求经WSGI桥接
+在线程池中交给Flask，行为与同步worker相同。
+
+处理函数中的同步步骤（JWT校验、限流、查询数据库）通过 AsgiRequest.call 在线程池中、
+以该请求的Flask请求上下文执行，错误处理器和 after_request（CORS、压缩）都沿用原有实现。
+"""
+import asyncio
+import contextvars
+import io
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.log import REQUEST_ID_HEADER
+
+_REQUEST_ID_KEY = REQUEST_ID_HEADER.lower().encode('latin-1')
+
+
+def route_path(scope):
+    """去掉挂载前缀（root_path）后的请求路径"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        return path[len(root_path):]
+    return path
+
+
+def build_environ(scope, body):
+    """由ASGI的scope和请求体构造WSGI environ"""
+    root_path = scope.get('root_path', '')
+    path = route_path(scope)
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f"HTTP_{name}"
+        value = value.decode('latin-1')
+        if key in environ:
+            # 重复的请求头按WSGI约定合并
+            value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+        environ[key] = value
+    # 请求体已完整读取（包括分块传输的请求），长度以实际读到的为准
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+def _call_in_request(app, environ, func, args):
+    """在请求上下文中执行 func；返回Flask响应时视为提前结束，返回 (响应, 返回值)"""
+    with app.request_context(environ):
+        try:
+            value = func(*args)
+        except Exception as e:
+            try:
+                rv = app.handle_user_exception(e)
+            except Exception as unhandled:
+                rv = app.handle_exception(unhandled)
+            return app.process_response(app.make_response(rv)), None
+        if isinstance(value, app.response_class):
+            return app.process_response(value), None
+        return None, value
+
+
+def _no_write(data):
+    raise RuntimeError("不支持WSGI的write()回调")
+
+
+class AsgiRequest:
+    """一次HTTP请求：原生处理函数通过它执行同步步骤、发送响应或转交Flask"""
+
+    __slots__ = ('asgi', 'scope', 'body', '_send')
+
+    def __init__(self, asgi, scope, body, send):
+        self.asgi = asgi
+        self.scope = scope
+        self.body = body
+        self._send = send
+
+    @property
+    def app(self):
+        return self.asgi.app
+
+    async def call(self, func, *args):
+        """在线程池中以本请求的Flask请求上下文执行同步函数，返回 (响应, 返回值)
+
+        func 返回Flask响应或抛出异常（如JWT校验失败，按Flask的错误处理器转换）时响应不为None。
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.asgi.executor, _call_in_request, self.app, build_environ(self.scope, self.body), func, args)
+
+    async def send(self, response):
+        """发送已经过 after_request 处理的Flask响应"""
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in response.headers.items()]
+        await self._send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        await self._send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def forward(self):
+        """把请求交给Flask（WSGI），在线程池中执行，流式响应逐块发送"""
+        loop = asyncio.get_running_loop()
+        # 同一个上下文中依次执行，stream_with_context 的生成器跨线程推进时上下文变量保持一致
+        context = contextvars.copy_context()
+
+        def run(func, *args):
+            return loop.run_in_executor(self.asgi.executor, context.run, func, *args)
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers]
+            return _no_write
+
+        iterable = await run(self.app, build_environ(self.scope, self.body), start_response)
+        try:
+            iterator = iter(iterable)
+            chunk = await run(next, iterator, None)
+            await self._send({'type': 'http.response.start', 'status': started['status'],
+                              'headers': started['headers']})
+            while chunk is not None:
+                if chunk:
+                    await self._send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await run(next, iterator, None)
+            await self._send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                await run(iterable.close)
+
+
+class AsgiApp:
+    """把Flask应用包装为ASGI应用
+
+    routes 为 {(方法, 路径): 协程处理函数}，处理函数接收 AsgiRequest；未登记的请求转交Flask。
+    threads 为同步步骤和Flask请求共用的线程数。
+    """
+
+    def __init__(self, app, routes, threads):
+        self.app = app
+        self.routes = dict(routes)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-sync')
+        self.shutdown_hooks = []
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"不支持的ASGI连接类型: {scope['type']}")
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        headers = scope.get('headers', ())
+        if not any(name == _REQUEST_ID_KEY for name, _ in headers):
+            # 同一请求的各个同步步骤分别进入请求上下文，请求ID随请求头传递，日志和响应头中保持一致
+            scope = dict(scope, headers=[*headers, (_REQUEST_ID_KEY, uuid.uuid4().hex.encode('latin-1'))])
+        request = AsgiRequest(self, scope, b''.join(chunks), send)
+
+        handler = self.routes.get((scope['method'], route_path(scope)))
+        if handler is None:
+            await request.forward()
+        else:
+            await handler(request)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for hook in self.shutdown_hooks:
+                    await hook()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -1,4 +1,4 @@
-from flask import jsonify
+from flask import current_app, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from functools import wraps
 
@@ -9,13 +9,16 @@ def jwt_error_handler(error):
         "error": "Unauthorized"
     }), error.status_code
 
+# 当前请求的用户是否为管理员（用户ID在 ADMIN_USER_IDS 中），调用前需已验证JWT
+def is_admin():
+    return get_jwt_identity() in current_app.config['ADMIN_USER_IDS']
+
 # 用于验证用户权限的装饰器
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        # 这里可以添加管理员权限检查逻辑
-        # 暂时简单返回，实际应用中需要验证用户是否为管理员
+        if not is_admin():
+            return jsonify({"msg": "需要管理员权限"}), 403
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """线程安全的进程内LRU缓存，可选TTL（秒）"""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCacheStore:
+    """Redis中的共享缓存（兼容Redis协议的服务均可），需要安装redis包"""
+
+    def __init__(self, url, prefix='cache:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items, ttl):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(self.prefix + key, value, ex=ttl)
+        pipe.execute()
+
+
+class DatabaseCacheStore:
+    """数据库表中的共享缓存（SQLite/PostgreSQL）
+
+    使用独立的连接读写，不影响请求会话中的事务；过期的行在读取时忽略，每写入 purge_every 条清理一次。
+    """
+
+    def __init__(self, db, table, purge_every=1000):
+        self.db = db
+        self.table = table
+        self.purge_every = purge_every
+        self._writes = 0
+
+    def get_many(self, keys):
+        table = self.table
+        with self.db.engine.connect() as conn:
+            rows = conn.execute(sa.select(table.c.key, table.c.value)
+                                .where(table.c.key.in_(list(keys)), table.c.expires_at > datetime.utcnow()))
+            return {row.key: row.value for row in rows}
+
+    def set_many(self, items, ttl):
+        table = self.table
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        self._writes += len(items)
+        purge, self._writes = self._writes >= self.purge_every, self._writes % self.purge_every
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(sa.delete(table).where(table.c.key.in_(list(items))))
+                conn.execute(sa.insert(table), [{"key": key, "value": value, "expires_at": expires_at}
+                                                for key, value in items.items()])
+                if purge:
+                    conn.execute(sa.delete(table).where(table.c.expires_at <= now))
+        except sa.exc.IntegrityError:
+            # 其他worker同时写入了相同的键，内容相同，保留对方的即可
+            pass
+
+
+class TieredCache:
+    """两级缓存：进程内LRU在前，各worker和节点共享的存储（RedisCacheStore / DatabaseCacheStore）在后
+
+    键为元组，共享存储中的键为 "名称:各部分"；值经 encode/decode 与bytes互相转换。
+    缓存的内容取决于用户数据时，键中应包含数据版本（见 services/change_feed.data_version），
+    数据变化后版本改变，各进程不再命中旧条目，无需跨进程删除。共享存储出错时按未命中处理。
+    """
+
+    def __init__(self, name, encode, decode, maxsize=1024, ttl=86400, store=None):
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+        self.ttl = ttl
+        self.store = store
+        self.local = LRUCache(maxsize, ttl)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _shared_key(self, key):
+        return ':'.join(map(str, (self.name, *key)))
+
+    def get_many(self, keys):
+        """返回 {键: 值}，未命中的键不在结果中"""
+        result = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                result[key] = value
+        self.local_hits += len(result)
+
+        if missing and self.store is not None:
+            shared_keys = {self._shared_key(key): key for key in missing}
+            try:
+                payloads = self.store.get_many(list(shared_keys))
+            except Exception as e:
+                logger.warning("共享缓存 %s 读取失败: %s", self.name, e)
+                payloads = {}
+            for shared_key, payload in payloads.items():
+                key = shared_keys[shared_key]
+                result[key] = value = self.decode(payload)
+                self.local.set(key, value)
+            self.shared_hits += len(payloads)
+        self.misses += len(keys) - len(result)
+        return result
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items):
+        for key, value in items.items():
+            self.local.set(key, value)
+        if items and self.store is not None:
+            try:
+                self.store.set_many({self._shared_key(key): self.encode(value) for key, value in items.items()},
+                                    self.ttl)
+            except Exception as e:
+                logger.warning("共享缓存 %s 写入失败: %s", self.name, e)
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def stats(self):
+        return {"local_hits": self.local_hits, "shared_hits": self.shared_hits, "misses": self.misses}
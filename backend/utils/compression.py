@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import re
+
+from flask import g, request
+
+from utils.cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只使用gzip
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'application/json',
+    'text/plain',
+    'text/html',
+    'text/css',
+    'text/csv',
+    'text/calendar',
+    'application/javascript',
+)
+
+
+# 压缩后的表示使用 "{原ETag}-{编码}" 作为ETag
+_ENCODING_SUFFIX = re.compile(r'-(gzip|br)(?=")')
+
+
+def _accepted_encodings(header):
+    """解析Accept-Encoding，忽略q=0的编码"""
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    """优先使用Brotli（已安装时），否则使用gzip"""
+    accepted = _accepted_encodings(accept_encoding or '')
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, app):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config['COMPRESS_BR_LEVEL'])
+    # mtime=0 使相同输入得到相同输出
+    return gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'], mtime=0)
+
+
+def init_compression(app):
+    """注册响应压缩钩子：超过最小长度且类型在白名单内的响应按客户端支持进行压缩"""
+    if not app.config.get('COMPRESS_ENABLED'):
+        return
+    cache = LRUCache(maxsize=app.config['COMPRESS_CACHE_SIZE'])
+    mimetypes = set(app.config['COMPRESS_MIMETYPES'])
+    app.extensions['compression_cache'] = cache
+
+    @app.before_request
+    def _strip_etag_encoding():
+        # 客户端回传的是压缩表示的ETag，视图按未压缩的ETag比较
+        header = request.environ.get('HTTP_IF_NONE_MATCH')
+        match = _ENCODING_SUFFIX.search(header) if header else None
+        if match:
+            g.etag_encoding = match.group(1)
+            request.environ['HTTP_IF_NONE_MATCH'] = _ENCODING_SUFFIX.sub('', header)
+
+    @app.after_request
+    def _compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if response.status_code == 304:
+            # 304中的ETag与客户端缓存的压缩表示保持一致
+            etag, weak = response.get_etag()
+            encoding = g.get('etag_encoding')
+            if etag is not None and encoding is not None:
+                response.set_etag(f"{etag}-{encoding}", weak=weak)
+            return response
+        if (response.status_code < 200 or response.status_code >= 300
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes):
+            return response
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        # 内容相同的响应复用已压缩的字节，避免热点数据重复压缩；按内容摘要查找，不依赖视图设置的ETag
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        etag, weak = response.get_etag()
+        if etag is None:
+            etag, weak = digest, False
+        cache_key = (digest, encoding)
+        compressed = cache.get(cache_key)
+        if compressed is None:
+            compressed = compress(data, encoding, app)
+            cache.set(cache_key, compressed)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # 不同编码的表示需要不同的ETag
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
@@ -0,0 +1,93 @@
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+
+
+def _is_sqlite(url):
+    return str(url).startswith('sqlite')
+
+
+def _dialect_options(app, url):
+    """按数据库方言生成引擎参数"""
+    if _is_sqlite(url):
+        # SQLite没有服务端连接池和语句超时，锁等待由PRAGMA busy_timeout控制
+        return {}
+
+    options = {
+        "pool_pre_ping": app.config['DB_POOL_PRE_PING'],
+        "pool_size": app.config['DB_POOL_SIZE'],
+        "max_overflow": app.config['DB_MAX_OVERFLOW'],
+        "pool_recycle": app.config['DB_POOL_RECYCLE'],
+        "pool_timeout": app.config['DB_POOL_TIMEOUT'],
+    }
+    statement_timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+    if str(url).startswith('postgresql') and statement_timeout:
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def configure_engines(app):
+    """根据配置生成主库与只读副本的引擎参数（需在 db.init_app 之前调用）"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **_dialect_options(app, app.config['SQLALCHEMY_DATABASE_URI']),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = {"url": replica_url, **_dialect_options(app, replica_url)}
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_database(app, db):
+    """为SQLite连接设置WAL等PRAGMA（需在 db.init_app 之后、首次连接之前调用）"""
+    if not app.config['SQLITE_TUNING']:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_pragma_listener(app.config))
+
+
+def _sqlite_pragma_listener(config):
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        "PRAGMA temp_store=MEMORY",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return _set_sqlite_pragmas
+
+
+def route_reads_to_replica():
+    """将当前请求的只读查询发送到只读副本（未配置副本时无效果）"""
+    g.use_db_replica = True
+
+
+class RoutingSession(Session):
+    """在请求声明只读时把SELECT路由到副本，写操作和flush始终使用主库"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None
+                and not self._flushing
+                and not isinstance(clause, sa.sql.dml.UpdateBase)
+                and has_app_context()
+                and g.get('use_db_replica')):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
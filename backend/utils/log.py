@@ -0,0 +1,206 @@
+"""结构化日志
+
+init_logging 为根日志器配置一条非阻塞的输出链：
+- 记录日志的线程只做过滤、取请求上下文和拼接消息，然后放入有界队列（队列满时丢弃并计数，不会阻塞请求）；
+- 后台 QueueListener 线程负责格式化（JSON或文本）和写入标准错误。
+每条日志带上请求ID（X-Request-ID，没有时生成并在响应头中返回）、用户ID和路由。
+同一条INFO/DEBUG日志（按日志器和消息模板区分）每秒最多输出 LOG_SAMPLE_BURST 次，
+被抑制的次数记在该模板下一条输出的日志上；WARNING及以上不抽样。
+
+各模块照常使用 logging.getLogger(__name__)，消息用 %s 占位参数，未输出的日志不会被格式化。
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+# 结构化输出中保留的 LogRecord 标准属性以外的字段（extra=...）
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _jwt_identity():
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        return get_jwt_identity()
+    except Exception:
+        # 未校验令牌的请求（如登录）没有身份
+        return None
+
+
+class RequestContextFilter(logging.Filter):
+    """为日志记录加上请求ID、用户ID和路由（在记录日志的线程中执行）"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id') or request.headers.get(REQUEST_ID_HEADER)
+            record.user_id = _jwt_identity()
+            record.route = request.url_rule.rule if request.url_rule else request.path
+        else:
+            record.request_id = record.user_id = record.route = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """同一日志器、同一消息模板的INFO/DEBUG日志每个时间窗口最多放行 burst 条"""
+
+    def __init__(self, burst, window=1.0, max_keys=10000):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._counters and len(self._counters) >= self.max_keys:
+                # 消息未使用占位参数时模板各不相同，计数表不能无限增长
+                self._counters.clear()
+            window_start, count, suppressed = self._counters.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                window_start, count = now, 0
+            if count >= self.burst:
+                self._counters[key] = (window_start, count, suppressed + 1)
+                return False
+            self._counters[key] = (window_start, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃日志而不是阻塞或报错；格式化留给后台线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 只在本线程拼接消息（参数可能在之后被修改），异常堆栈也需在此时取出
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        dropped = self.dropped
+        if dropped:
+            record.queue_dropped = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped -= dropped
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        record.__dict__.setdefault('request_id', None)
+        text = super().format(record)
+        if getattr(record, 'suppressed', None):
+            text += f" (此前 {record.suppressed} 条同类日志被抑制)"
+        return text
+
+
+def _assign_request_id():
+    g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    # ASGI模式下原生处理的请求不经过 before_request，请求ID由 AsgiApp 放在请求头中
+    request_id = g.get('request_id') or request.headers.get(REQUEST_ID_HEADER)
+    if request_id:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+def _start_listener(queue_handler, output):
+    global _listener
+    _listener = logging.handlers.QueueListener(queue_handler.queue, output, respect_handler_level=True)
+    _listener.queue_handler = queue_handler
+    _listener.start()
+
+
+def _restart_listener_after_fork():
+    # 预加载模式下监听线程在主进程中启动，fork出的worker中没有该线程，需要重新创建队列和线程
+    if _listener is not None:
+        queue_handler = _listener.queue_handler
+        queue_handler.queue = queue.Queue(maxsize=queue_handler.queue.maxsize)
+        _start_listener(queue_handler, *_listener.handlers)
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging(level='INFO', fmt='json', sample_burst=10, queue_size=10000, stream=None):
+    """为根日志器配置 过滤 -> 队列 -> 后台格式化输出 的日志链（每个进程只配置一次），返回队列处理器"""
+    with _listener_lock:
+        root = logging.getLogger()
+        root.setLevel(level)
+        if _listener is not None:
+            return _listener.queue_handler
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT))
+        queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        queue_handler.addFilter(SamplingFilter(sample_burst))
+        queue_handler.addFilter(RequestContextFilter())
+        root.handlers = [queue_handler]
+
+        _start_listener(queue_handler, output)
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+        return queue_handler
+
+
+def init_logging(app):
+    """按配置初始化日志，并为每个请求分配请求ID"""
+    if app.config['LOG_CONFIGURE']:
+        configure_logging(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'],
+                          app.config['LOG_SAMPLE_BURST'], app.config['LOG_QUEUE_SIZE'])
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
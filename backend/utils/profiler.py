@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request
+
+from utils.auth import is_admin
+
+# 请求头：携带 "X-Profile: cprofile" 时对单个请求进行cProfile采集
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+
+def _frame_label(frame):
+    """生成调用栈中单个帧的标签（collapsed格式中不能包含分号）"""
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+def _collapse_stack(frame, thread_name):
+    """将调用栈折叠为 root;...;leaf 形式"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def new_profile_id(kind):
+    """生成包含进程号的分析结果ID，便于在多个worker之间定位"""
+    return f"{kind}-{os.getpid()}-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+
+
+class StackSampler:
+    """低开销的统计式调用栈采样器
+
+    在当前进程中启动一个后台线程，按固定间隔读取 sys._current_frames()，
+    不使用信号，因此不会与gunicorn的信号处理冲突。每个进程同一时间只允许一次采样。
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._lock.locked()
+
+    def start(self, duration, output_path):
+        """启动后台采样，已有采样在运行时返回False"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            thread = threading.Thread(
+                target=self._run,
+                args=(duration, output_path),
+                name='stack-sampler',
+                daemon=True
+            )
+            thread.start()
+        except Exception:
+            self._lock.release()
+            raise
+        return True
+
+    def _run(self, duration, output_path):
+        try:
+            counts = self.sample(duration)
+            write_collapsed(counts, output_path)
+        finally:
+            self._lock.release()
+
+    def sample(self, duration):
+        """采样指定秒数，返回 折叠栈 -> 次数 的计数"""
+        counts = Counter()
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                counts[_collapse_stack(frame, names.get(thread_id, str(thread_id)))] += 1
+            time.sleep(self.interval)
+        return counts
+
+
+def write_collapsed(counts, output_path):
+    """以flamegraph.pl/speedscope兼容的collapsed格式写出，先写临时文件再原子替换"""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+    os.replace(tmp_path, output_path)
+
+
+def profile_path(app, profile_id, suffix):
+    return os.path.join(app.config['PROFILER_OUTPUT_DIR'], f"{profile_id}{suffix}")
+
+
+def init_profiler(app):
+    """注册按请求头触发的cProfile采集钩子（仅在PROFILER_ENABLED时生效）"""
+    sampler.interval = app.config.get('PROFILER_INTERVAL', sampler.interval)
+
+    @app.before_request
+    def _start_request_profile():
+        if not app.config.get('PROFILER_ENABLED'):
+            return
+        if request.headers.get(PROFILE_HEADER, '').lower() != 'cprofile':
+            return
+        # 与admin_required一致：只有管理员的请求才会开启采集
+        try:
+            verify_jwt_in_request()
+        except Exception:
+            return
+        if not is_admin():
+            return
+        g.request_profiler = cProfile.Profile()
+        g.request_profiler.enable()
+
+    @app.after_request
+    def _finish_request_profile(response):
+        profiler = g.pop('request_profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        profile_id = new_profile_id('cprofile')
+        output_path = profile_path(app, profile_id, '.prof')
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            profiler.dump_stats(output_path)
+            response.headers[PROFILE_ID_HEADER] = profile_id
+        except OSError as e:
+            app.logger.warning("保存请求性能分析结果失败: %s", e)
+        return response
+
+
+# 导出单例实例（每个worker进程各自一个）
+sampler = StackSampler()
@@ -0,0 +1,269 @@
+"""限流与准入控制
+
+按 JWT 身份和路由类别做令牌桶限流（超限返回429），桶状态默认保存在进程内，
+配置 RATE_LIMIT_STORAGE_URL（redis://...）后保存在Redis中，多个worker共享同一额度。
+调用大模型的请求另有并发上限，超过时立即返回503和Retry-After，而不是在worker里无限排队；
+配置Redis时该上限为所有worker和节点共享的全局上限（Redis中的租约），否则为每个worker进程的上限。
+"""
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt_identity
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+# 原子地补充并扣减令牌，时间取Redis服务端时间，避免各worker时钟不一致
+_REDIS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+# 租约为有序集合中的成员，分值为到期时间：先清理已到期的租约（持有者异常退出时不会永久占用名额），未满时加入新租约
+_REDIS_LEASE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + ttl, ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(ttl) + 1)
+return 1
+"""
+
+# Redis不可用时放行请求使用的租约
+_UNTRACKED_LEASE = object()
+
+
+def parse_rate(value):
+    """解析 '10/minute'、'100/hour' 或 '5/30'（秒）形式的限额，返回 (容量, 每秒补充的令牌数)"""
+    count, _, period = value.partition('/')
+    count = int(count)
+    seconds = PERIODS[period] if period in PERIODS else float(period or 1)
+    return count, count / seconds
+
+
+class MemoryBucketStore:
+    """进程内令牌桶，键数超过上限时淘汰最久未使用的桶"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, cost=1):
+        """扣减令牌，返回 (是否允许, 剩余令牌数)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class RedisBucketStore:
+    """Redis中的令牌桶（兼容Redis协议的服务均可），需要安装redis包"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_REDIS_SCRIPT)
+
+    def consume(self, key, capacity, rate, cost=1):
+        allowed, tokens = self._script(keys=[self.prefix + ':'.join(map(str, key))],
+                                       args=[capacity, rate, cost])
+        return bool(allowed), float(tokens)
+
+
+class ConcurrencyLimiter:
+    """进程内的并发上限，获取不到名额时调用方应直接拒绝请求"""
+
+    shared = False
+
+    def __init__(self, limit, timeout=0):
+        self.limit = limit
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        """返回租约，没有名额时返回None"""
+        if self.timeout:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        return True if acquired else None
+
+    def release(self, lease):
+        self._slots.release()
+
+
+class RedisConcurrencyLimiter:
+    """所有worker和节点共享的并发上限，名额为Redis中带到期时间的租约，需要安装redis包
+
+    lease_ttl 应大于一次调用的最长耗时，持有者异常退出时租约到期后自动释放。Redis不可用时放行。
+    """
+
+    shared = True
+
+    def __init__(self, url, limit, timeout=0, lease_ttl=60, key='llm:leases', poll_interval=0.05):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.limit = limit
+        self.timeout = timeout
+        self.lease_ttl = lease_ttl
+        self.key = key
+        self.poll_interval = poll_interval
+        self._script = self.client.register_script(_REDIS_LEASE_SCRIPT)
+
+    def _try_acquire(self, lease):
+        return self._script(keys=[self.key], args=[self.limit, self.lease_ttl, lease])
+
+    def acquire(self):
+        """返回租约，等待 timeout 秒仍没有名额时返回None"""
+        lease = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        try:
+            while not self._try_acquire(lease):
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(self.poll_interval)
+        except Exception as e:
+            logger.warning("并发租约存储不可用，本次请求放行: %s", e)
+            return _UNTRACKED_LEASE
+        return lease
+
+    def release(self, lease):
+        if lease is _UNTRACKED_LEASE:
+            return
+        try:
+            self.client.zrem(self.key, lease)
+        except Exception as e:
+            # 租约到期后自动释放
+            logger.warning("释放并发租约失败: %s", e)
+
+
+class RateLimiter:
+    def __init__(self, store, limits, enabled=True):
+        self.store = store
+        self.limits = limits
+        self.enabled = enabled
+
+    def hit(self, route_class, identity, cost=1):
+        """返回 (是否允许, 建议的重试等待秒数)；存储不可用时放行"""
+        if not self.enabled or route_class not in self.limits:
+            return True, 0
+        capacity, rate = self.limits[route_class]
+        try:
+            allowed, tokens = self.store.consume((route_class, identity), capacity, rate, cost)
+        except Exception as e:
+            logger.warning("限流存储不可用，本次请求放行: %s", e)
+            return True, 0
+        return allowed, 0 if allowed else max(1, math.ceil((cost - tokens) / rate))
+
+
+def init_rate_limit(app):
+    """按配置创建限流器和大模型并发上限，保存在 app.extensions 中"""
+    storage_url = app.config.get('RATE_LIMIT_STORAGE_URL')
+    if storage_url:
+        store = RedisBucketStore(storage_url)
+    else:
+        store = MemoryBucketStore(app.config['RATE_LIMIT_MAX_KEYS'])
+
+    limits = {route_class: parse_rate(value)
+              for route_class, value in app.config['RATE_LIMITS'].items() if value}
+    app.extensions['rate_limiter'] = RateLimiter(store, limits, app.config['RATE_LIMIT_ENABLED'])
+    if storage_url:
+        app.extensions['llm_limiter'] = RedisConcurrencyLimiter(
+            storage_url, app.config['LLM_MAX_CONCURRENCY'], app.config['LLM_ADMISSION_TIMEOUT'],
+            app.config['LLM_LEASE_TTL'])
+    else:
+        app.extensions['llm_limiter'] = ConcurrencyLimiter(app.config['LLM_MAX_CONCURRENCY'],
+                                                           app.config['LLM_ADMISSION_TIMEOUT'])
+
+
+def _reject(status, message, retry_after):
+    response = jsonify({"success": False, "error": message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def check_rate_limit(route_class):
+    """按JWT身份扣减路由类别的令牌，超限时返回429响应，否则返回None"""
+    allowed, retry_after = current_app.extensions['rate_limiter'].hit(route_class, get_jwt_identity())
+    if not allowed:
+        return _reject(429, "请求过于频繁，请稍后重试", retry_after)
+    return None
+
+
+def llm_busy_response():
+    """调用大模型的并发名额用尽时的503响应"""
+    return _reject(503, "AI服务繁忙，请稍后重试", current_app.config['LLM_RETRY_AFTER'])
+
+
+def rate_limit(route_class):
+    """按JWT身份和路由类别限流（需放在 jwt_required 之下）"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            rejected = check_rate_limit(route_class)
+            if rejected is not None:
+                return rejected
+            return current_app.ensure_sync(f)(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def llm_admission(f):
+    """限制同时调用大模型的请求数，名额用尽时返回503"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        limiter = current_app.extensions['llm_limiter']
+        lease = limiter.acquire()
+        if lease is None:
+            return llm_busy_response()
+        try:
+            return current_app.ensure_sync(f)(*args, **kwargs)
+        finally:
+            limiter.release(lease)
+    return decorated_function
@@ -0,0 +1,67 @@
+import sys
+from datetime import date, datetime
+from enum import Enum
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时回退到标准库json
+    orjson = None
+
+
+def _default(o):
+    """原生序列化日期时间、枚举、pydantic模型和 __slots__ 记录（如ScheduleItem）"""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    if hasattr(type(o), '__slots__') and hasattr(o, 'dict'):
+        return o.dict()
+    # pydantic按需导入（见routes/ai_scheduler.py），未加载时不可能出现其模型实例
+    pydantic = sys.modules.get('pydantic')
+    if pydantic is not None and isinstance(o, pydantic.BaseModel):
+        # 直接使用模型的字段字典，避免 .dict() 额外构造中间对象
+        return o.__dict__
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """可插拔的响应JSON编码器
+
+    backend 为 'auto' 时在安装了orjson的情况下使用orjson，否则使用标准库json。
+    compat 为 True 时固定使用标准库json及Flask默认参数，输出与jsonify逐字节一致。
+    """
+
+    default = staticmethod(_default)
+
+    def __init__(self, app, backend='auto', compat=False):
+        super().__init__(app)
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON_BACKEND=orjson 但未安装orjson")
+        self.use_orjson = orjson is not None and backend in ('auto', 'orjson') and not compat
+
+    def _orjson_option(self, indent=False, newline=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_option()).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # orjson直接输出bytes，省去str编码的一次拷贝
+        data = orjson.dumps(obj, default=self.default, option=self._orjson_option(indent=indent, newline=True))
+        return self._app.response_class(data, mimetype=self.mimetype)
@@ -81,6 +81,15 @@ export interface BatchCreateDynamicTasksParams {
   tasks: Omit<CreateDynamicTaskParams, 'tags'>[]
 }
 
+// 增量同步结果
+export interface TaskChanges {
+  cursor: number
+  has_more: boolean
+  full: boolean
+  regular: { updated: RegularTask[], deleted: number[] }
+  dynamic: { updated: DynamicTask[], deleted: number[] }
+}
+
 /**
  * 获取常规任务列表
  * @param filter 筛选条件
@@ -170,4 +179,14 @@ export const toggleTaskCompletion = async (id: number, completed: boolean): Prom
  */
 export const batchCreateDynamicTasks = async (tasksData: BatchCreateDynamicTasksParams): Promise<DynamicTask[]> => {
   return apiClient.post('/tasks/dynamic/batch', tasksData)
-}
\ No newline at end of file
+}
+
+/**
+ * 获取游标之后的任务变更
+ * @param since 上次返回的游标，不传时返回全部任务
+ * @param wait 没有变更时最多等待的秒数（长轮询）
+ * @returns 变更的任务和新的游标
+ */
+export const getTaskChanges = async (since?: number, wait?: number): Promise<TaskChanges> => {
+  return apiClient.get('/tasks/changes', { params: { since, wait } })
+}
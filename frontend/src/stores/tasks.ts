@@ -19,7 +19,8 @@ import {
   updateDynamicTask,
   deleteDynamicTask,
   toggleTaskCompletion,
-  batchCreateDynamicTasks
+  batchCreateDynamicTasks,
+  getTaskChanges
 } from '../services/tasks'
 
 export const useTasksStore = defineStore('tasks', () => {
@@ -28,6 +29,7 @@ export const useTasksStore = defineStore('tasks', () => {
   const dynamicTasks = ref<DynamicTask[]>([])
   const loading = ref(false)
   const error = ref<string | null>(null)
+  const changesCursor = ref<number | undefined>(undefined)
 
   // 计算属性
   const pendingTasks = computed(() => {
@@ -62,7 +64,7 @@ export const useTasksStore = defineStore('tasks', () => {
     error.value = null
     try {
       const newTask = await createRegularTask(task)
-      regularTasks.value.push(newTask)
+      await syncChanges()
       return newTask
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '添加常规任务失败'
@@ -79,10 +81,7 @@ export const useTasksStore = defineStore('tasks', () => {
     error.value = null
     try {
       const updatedTask = await updateRegularTask(id, updates)
-      const index = regularTasks.value.findIndex(task => task.id === id)
-      if (index !== -1) {
-        regularTasks.value[index] = updatedTask
-      }
+      await syncChanges()
       return updatedTask
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '更新常规任务失败'
@@ -99,10 +98,7 @@ export const useTasksStore = defineStore('tasks', () => {
     error.value = null
     try {
       await deleteRegularTask(id)
-      const index = regularTasks.value.findIndex(task => task.id === id)
-      if (index !== -1) {
-        regularTasks.value.splice(index, 1)
-      }
+      await syncChanges()
       return true
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '删除常规任务失败'
@@ -134,7 +130,7 @@ export const useTasksStore = defineStore('tasks', () => {
     error.value = null
     try {
       const newTask = await createDynamicTask(task)
-      dynamicTasks.value.push(newTask)
+      await syncChanges()
       return newTask
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '添加动态任务失败'
@@ -151,10 +147,7 @@ export const useTasksStore = defineStore('tasks', () => {
     error.value = null
     try {
       const updatedTask = await updateDynamicTask(id, updates)
-      const index = dynamicTasks.value.findIndex(task => task.id === id)
-      if (index !== -1) {
-        dynamicTasks.value[index] = updatedTask
-      }
+      await syncChanges()
       return updatedTask
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '更新动态任务失败'
@@ -171,10 +164,7 @@ export const useTasksStore = defineStore('tasks', () => {
     error.value = null
     try {
       await deleteDynamicTask(id)
-      const index = dynamicTasks.value.findIndex(task => task.id === id)
-      if (index !== -1) {
-        dynamicTasks.value.splice(index, 1)
-      }
+      await syncChanges()
       return true
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '删除动态任务失败'
@@ -191,10 +181,7 @@ export const useTasksStore = defineStore('tasks', () => {
     error.value = null
     try {
       const updatedTask = await toggleTaskCompletion(id, completed)
-      const index = dynamicTasks.value.findIndex(task => task.id === id)
-      if (index !== -1) {
-        dynamicTasks.value[index] = updatedTask
-      }
+      await syncChanges()
       return updatedTask
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '更新任务完成状态失败'
@@ -212,7 +199,7 @@ export const useTasksStore = defineStore('tasks', () => {
     try {
       // 确保参数格式正确
       const newTasks = await batchCreateDynamicTasks({ tasks })
-      dynamicTasks.value.push(...newTasks)
+      await syncChanges()
       return newTasks
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : '批量添加动态任务失败'
@@ -224,6 +211,52 @@ export const useTasksStore = defineStore('tasks', () => {
     }
   }
 
+  // 增量同步：只拉取上次同步之后变更的任务（首次同步返回全部任务）。
+  // 增删改之后调用它更新列表，而不是重新获取完整列表
+  // 合并后按列表接口的默认排序重新排序：常规任务按开始时间，动态任务按截止时间（没有截止时间的在最后），相同时按ID
+  function compareRegularTasks(a: RegularTask, b: RegularTask): number {
+    return a.start_time.localeCompare(b.start_time) || a.id - b.id
+  }
+
+  function compareDynamicTasks(a: DynamicTask, b: DynamicTask): number {
+    if (a.deadline !== b.deadline) {
+      if (!a.deadline) return 1
+      if (!b.deadline) return -1
+      return a.deadline.localeCompare(b.deadline)
+    }
+    return a.id - b.id
+  }
+
+  function applyChanges<T extends { id: number }>(list: T[], updated: T[], deleted: number[],
+                                                  compare: (a: T, b: T) => number): T[] {
+    const removed = new Set([...deleted, ...updated.map(task => task.id)])
+    return [...list.filter(task => !removed.has(task.id)), ...updated].sort(compare)
+  }
+
+  async function syncChanges(wait?: number): Promise<void> {
+    error.value = null
+    try {
+      let changes
+      do {
+        changes = await getTaskChanges(changesCursor.value, wait)
+        if (changes.full) {
+          regularTasks.value = changes.regular.updated
+          dynamicTasks.value = changes.dynamic.updated
+        } else {
+          regularTasks.value = applyChanges(regularTasks.value, changes.regular.updated, changes.regular.deleted,
+                                            compareRegularTasks)
+          dynamicTasks.value = applyChanges(dynamicTasks.value, changes.dynamic.updated, changes.dynamic.deleted,
+                                            compareDynamicTasks)
+        }
+        changesCursor.value = changes.cursor
+      } while (changes.has_more)
+    } catch (err) {
+      const errorMessage = err instanceof Error ? err.message : '同步任务失败'
+      error.value = errorMessage
+      console.error(err)
+    }
+  }
+
   return {
     // 状态
     regularTasks,
@@ -246,6 +279,7 @@ export const useTasksStore = defineStore('tasks', () => {
     updateDynamicTaskById,
     deleteDynamicTaskById,
     markTaskAsCompleted,
-    batchAddDynamicTasks
+    batchAddDynamicTasks,
+    syncChanges
   }
 })
\ No newline at end of file